@@ -0,0 +1,125 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .repositories import AnalyticsRepository
+
+
+class BasePandasView(APIView):
+    # Підкласи задають fields і fetch(); payload() спільний для sync і async (comics/async_views.py) view
+    fields = None
+
+    def query_param(self, request, name, cast=int):
+        # Необов'язковий параметр фільтра; передається в AnalyticsRepository і виконується в SQL
+        value = request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            raise ValidationError({name: f"Invalid value: {value}"})
+
+    def fetch(self, request):
+        raise NotImplementedError
+
+    def export_rows(self, rows, fields):
+        # Рядки з репозиторію вже готові до серіалізації - без проходу через DataFrame
+        if not rows:
+            return {"message": "Даних не знайдено", "data": []}
+
+        return [{field: row[field] for field in fields} for row in rows]
+
+    def export_data(self, rows, fields):
+        return Response(self.export_rows(rows, fields))
+
+    def payload(self, request):
+        return self.export_rows(self.fetch(request), self.fields)
+
+    def get(self, request):
+        return Response(self.payload(request))
+
+
+class PublisherInventoryView(BasePandasView):
+    fields = ['name', 'country', 'total_stock', 'titles_count']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_top_publishers_by_inventory(
+            min_stock=self.query_param(request, 'min_stock'),
+            sort_by=request.query_params.get('sort_by', 'stock_desc'),
+            limit=self.query_param(request, 'limit'),
+        )
+
+
+class TopAuthorsView(BasePandasView):
+    fields = ['firstname', 'lastname', 'avg_rating', 'review_count']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_highly_rated_authors(
+            min_rating=self.query_param(request, 'min_rating', float),
+            max_rating=self.query_param(request, 'max_rating', float),
+            limit=self.query_param(request, 'limit'),
+        )
+
+
+class ReleaseActivityView(BasePandasView):
+    fields = ['year', 'total_released']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_comics_release_activity()
+
+
+class PopularGenresView(BasePandasView):
+    fields = ['genrename', 'borrow_count']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_popular_genres(limit=self.query_param(request, 'limit'))
+
+
+class ActiveReadersView(BasePandasView):
+    fields = ['firstname', 'lastname', 'email', 'books_borrowed']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_active_readers(limit=self.query_param(request, 'limit'))
+
+
+class ComicReviewsView(BasePandasView):
+    fields = ['title', 'reviews_total', 'rating_avg']
+
+    def fetch(self, request):
+        return AnalyticsRepository.get_most_reviewed_comics(limit=self.query_param(request, 'limit'))
+
+
+class BasicStatsView(BasePandasView):
+    # ?source=sql (за замовчуванням) - агрегати рахує БД; ?source=columnar - NumPy по стовпцях
+    def payload(self, request):
+        source = request.query_params.get('source', 'sql')
+        if source == 'columnar':
+            stats = AnalyticsRepository.get_basic_stats_columnar()
+        elif source == 'sql':
+            stats = AnalyticsRepository.get_basic_stats()
+        else:
+            raise ValidationError({'source': f"Invalid value: {source}"})
+
+        stock_stats, ratings = stats['stock'], stats['rating']
+        if stock_stats is None or ratings is None:
+            return {"message": "Not enough data for statistics"}
+
+        rating_stats = {
+            'min_rating': int(ratings['min']),
+            'max_rating': int(ratings['max']),
+            'mean_rating': round(ratings['mean'], 2),
+            'median_rating': ratings['50%']
+        }
+
+        response_data = {
+            "general_stats": {
+                "stock_statistics": stock_stats,
+                "stock_median_explicit": stock_stats['50%'],
+                "rating_statistics": rating_stats
+            },
+            "grouped_analysis": {
+                "avg_stock_by_genre": stats['avg_stock_by_genre'],
+            }
+        }
+
+        return response_data
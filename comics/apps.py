@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ComicsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comics'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,141 @@
+import asyncio
+import importlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import dashboard_views, views
+from .cache import get_cache, may_be_stale
+from .concurrency import arun_parallel, db_sync_to_async
+from .metrics import timed
+from .repositories import AnalyticsRepository
+
+
+class AsyncAPIView(View):
+    # Нативний async view для ASGI (DRF APIView лише синхронний). Автентифікація і дозволи -
+    # ті самі класи DRF, JSON - той самий JSONRenderer, тож відповіді збігаються з синхронними.
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            # request.user може читати сесію з БД - тому в sync-потоці
+            await sync_to_async(self.check_permissions)(request)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def check_permissions(self, request):
+        for permission in (permission_class() for permission_class in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+    def handle_exception(self, request, exc):
+        response = self.json({'detail': exc.detail} if isinstance(exc.detail, str) else exc.detail,
+                             status=exc.status_code)
+        if isinstance(exc, exceptions.NotAuthenticated) and request.authenticators:
+            header = request.authenticators[0].authenticate_header(request)
+            if header:
+                response.status_code = 401
+                response['WWW-Authenticate'] = header
+        return response
+
+    @staticmethod
+    def json(data, status=200):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncRepoView(AsyncAPIView):
+    # async list/retrieve поверх налаштувань синхронного GenericRepoViewSet (repo, serializer, plan)
+    permission_classes = [AllowAny]
+    viewset = None
+
+    async def get(self, request, pk=None):
+        viewset = self.viewset
+        if pk is not None:
+            obj = await viewset.repo.aget_by_id(pk, plan=viewset.query_plan)
+            if obj is None:
+                return HttpResponse(status=404)
+            with timed('serialize'):
+                data = viewset.serializer_class(obj).data
+            return self.json(data)
+
+        # Ті самі фільтри, ?fields= і ?ordering=, що й у синхронного list
+        spec, plan, fields = viewset().get_list_query(request)
+        paginator = viewset.pagination_class()
+        objs = await paginator.apaginate(viewset.repo, request, plan=plan, spec=spec)
+        with timed('serialize'):
+            data = viewset.serializer_class(objs, many=True, fields=fields).data
+        return self.json(paginator.get_paginated_data(data))
+
+
+class AsyncAnalyticsView(AsyncAPIView):
+    # Той самий payload(), що й у синхронного BasePandasView, але без блокування event loop
+    view_class = None
+
+    async def get(self, request):
+        data = await db_sync_to_async(self.view_class().payload)(request)
+        return self.json(data)
+
+
+class AsyncAggregatedReportView(AsyncAPIView):
+
+    async def get(self, request):
+        cache = get_cache()
+        key = await sync_to_async(views.aggregated_report_key)()
+        report = await cache.aget(key)
+        if report is None:
+            # Два незалежні запити - паралельно, кожен у своєму потоці зі своїм підключенням
+            totals, active_borrowings = await asyncio.gather(
+                db_sync_to_async(AnalyticsRepository.get_table_totals)(),
+                db_sync_to_async(AnalyticsRepository.get_active_borrowings)(),
+            )
+            report = {'totals': totals, 'active_borrowings': active_borrowings}
+            if not await sync_to_async(may_be_stale)(*AnalyticsRepository.REPORT_TABLES.values()):
+                await cache.aset(key, report, getattr(settings, 'COMICS_REPORT_CACHE_TTL', 60))
+        return self.json(report)
+
+
+class AsyncDashboardPlotlyView(AsyncAPIView):
+
+    async def get(self, request):
+        filters = dashboard_views.parse_dashboard_filters(request)
+        if not dashboard_views.render_server_side(request):
+            return await sync_to_async(render)(request, 'comics/dashboard_plotly.html', {
+                'chart_sources': dashboard_views.dashboard_chart_sources(filters),
+                'filters': filters
+            })
+
+        etag, not_modified = await sync_to_async(dashboard_views.dashboard_not_modified)(request, 'plotly', filters)
+        if not_modified is not None:
+            return not_modified
+
+        # Перший імпорт pandas / plotly - у потоці, щоб не блокувати цикл подій
+        plotly_charts = await sync_to_async(importlib.import_module)('comics.plotly_charts')
+
+        with timed('charts'):
+            # Той самий обмежений пул, що й у синхронних дашбордів (COMICS_DASHBOARD_CONCURRENCY)
+            charts = await arun_parallel(plotly_charts.plotly_chart_calls(filters))
+
+        with timed('render'):
+            response = await sync_to_async(render)(request, 'comics/dashboard_plotly.html', {
+                'charts': [chart for chart in charts if chart is not None],
+                'filters': filters
+            })
+        if etag is not None:
+            response['ETag'] = etag
+        return response
@@ -1,39 +1,436 @@
+import asyncio
+import json
+import os
+import statistics
+import string
+import subprocess
+import sys
 import time
 import concurrent.futures
-from django.db import connections
+import itertools
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from . import benchmark_workers
 from .models import Comic
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 
 class DatabaseBenchmark:
+    # Одиниця роботи однакова для всіх режимів: COUNT(*) + вибірка коміксу за pk.
+    #   thread  - ThreadPoolExecutor, підключення на потік (WSGI з потоками)
+    #   process - ProcessPoolExecutor, підключення на процес (WSGI з процесами)
+    #   asyncio - async ORM (acount/aget) з обмеженням паралельності (ASGI)
+    MODES = ('thread', 'process', 'asyncio')
+    # process закриває всі підключення поточного процесу і запускає пул процесів - не всередині
+    # HTTP-запиту; з веб-сторінки - лише ці, process - через manage.py benchmark --db
+    WEB_MODES = ('thread', 'asyncio')
+
+    # Як одиниця роботи отримує підключення (поверх налаштувань DATABASES['default']):
+    #   unpooled   - CONN_MAX_AGE=0: нове підключення на кожен запит
+    #   persistent - CONN_MAX_AGE + CONN_HEALTH_CHECKS: підключення потоку живе між запитами
+    #   pool       - пул psycopg_pool (лише PostgreSQL)
+    STRATEGIES = ('unpooled', 'persistent', 'pool')
+
+    @staticmethod
+    def strategy_settings(strategy):
+        base = connections.settings[DEFAULT_DB_ALIAS]
+        options = {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}
+        if strategy == 'unpooled':
+            overrides = {'CONN_MAX_AGE': 0}
+        elif strategy == 'persistent':
+            # None - без обмеження; 0 означав би unpooled
+            overrides = {'CONN_MAX_AGE': 600 if base['CONN_MAX_AGE'] == 0 else base['CONN_MAX_AGE'],
+                         'CONN_HEALTH_CHECKS': True}
+        else:
+            # Пул не менший за найбільшу кількість потоків, інакше міряємо очікування в черзі
+            pool = {**getattr(settings, 'COMICS_DB_POOL_OPTIONS', {}), 'max_size': 32}
+            options['pool'] = pool
+            overrides = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True}
+        return {**base, **overrides, 'OPTIONS': options}
+
+    @staticmethod
+    @contextmanager
+    def strategy_alias(strategy):
+        # Окремий псевдонім БД на час заміру, щоб не чіпати підключення 'default' поточного процесу
+        alias = f'benchmark-{strategy}'
+        connections.settings[alias] = DatabaseBenchmark.strategy_settings(strategy)
+        try:
+            yield alias
+        finally:
+            DatabaseBenchmark.release(alias)
+            del connections.settings[alias]
 
     @staticmethod
-    def _single_db_request(index):
-        for conn in connections.all():
-            conn.close_if_unusable_or_obsolete()
-        _ = Comic.objects.count()
+    def release(alias):
+        conn = connections[alias]
+        conn.close()
+        if getattr(conn, 'pool', None) is not None:
+            conn.close_pool()
+        del connections[alias]
+
+    @staticmethod
+    def _single_db_request(index, comic_id=None, alias=DEFAULT_DB_ALIAS):
+        try:
+            _ = Comic.objects.using(alias).count()
+            if comic_id is not None:
+                Comic.objects.using(alias).get(pk=comic_id)
+        finally:
+            # Як request_finished: з CONN_MAX_AGE=0 закрити (або повернути в пул), інакше лишити потоку
+            connections[alias].close_if_unusable_or_obsolete()
         return index
 
     @staticmethod
-    def run_benchmark(total_requests=200, max_workers_list=[1, 2, 4, 8, 16]):
+    def _run_threads(total_requests, workers, comic_id, alias):
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(DatabaseBenchmark._single_db_request, i, comic_id, alias)
+                       for i in range(total_requests)]
+            concurrent.futures.wait(futures)
+        return time.time() - start_time
+
+    @staticmethod
+    def _run_processes(total_requests, workers, comic_id, alias):
+        # Перед fork закриваємо підключення і пул, щоб дочірні процеси не ділили сокети
+        DatabaseBenchmark.release(alias)
+        connections.close_all()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    initializer=benchmark_workers.init_process,
+                                                    initargs=(alias, connections.settings[alias])) as executor:
+            # Запуск процесів і підключення до БД не входять у виміряний час
+            list(executor.map(benchmark_workers.ready, range(workers)))
+            start_time = time.time()
+            futures = [executor.submit(benchmark_workers.single_db_request, i, comic_id, alias)
+                       for i in range(total_requests)]
+            concurrent.futures.wait(futures)
+            return time.time() - start_time
+
+    @staticmethod
+    async def _async_requests(total_requests, workers, comic_id, alias):
+        semaphore = asyncio.Semaphore(workers)
+        release = sync_to_async(lambda: connections[alias].close_if_unusable_or_obsolete())
+
+        async def single(index):
+            async with semaphore:
+                try:
+                    await Comic.objects.using(alias).acount()
+                    if comic_id is not None:
+                        await Comic.objects.using(alias).aget(pk=comic_id)
+                finally:
+                    await release()
+            return index
+
+        try:
+            await asyncio.gather(*(single(i) for i in range(total_requests)))
+        finally:
+            # async ORM працює в окремому потоці sync_to_async - закриваємо його підключення там само
+            await sync_to_async(connections.close_all)()
+
+    @staticmethod
+    def _run_asyncio(total_requests, workers, comic_id, alias):
+        start_time = time.time()
+        asyncio.run(DatabaseBenchmark._async_requests(total_requests, workers, comic_id, alias))
+        return time.time() - start_time
+
+    @staticmethod
+    def run_benchmark(total_requests=200, max_workers_list=[1, 2, 4, 8, 16], modes=('thread',),
+                      strategies=('persistent',)):
         results = {
+            'mode': [],
+            'strategy': [],
             'workers': [],
-            'time': []
+            'time': [],
+            'rps': [],
+        }
+        runners = {
+            'thread': DatabaseBenchmark._run_threads,
+            'process': DatabaseBenchmark._run_processes,
+            'asyncio': DatabaseBenchmark._run_asyncio,
         }
+        comic_id = Comic.objects.order_by('pk').values_list('pk', flat=True).first()
+        if connection.vendor != 'postgresql':
+            # psycopg_pool працює лише з PostgreSQL
+            strategies = [strategy for strategy in strategies if strategy != 'pool']
 
         print(f"Starting benchmark with {total_requests} requests...")
 
-        for workers in max_workers_list:
-            start_time = time.time()
+        for strategy in strategies:
+            with DatabaseBenchmark.strategy_alias(strategy) as alias:
+                for mode in modes:
+                    for workers in max_workers_list:
+                        execution_time = runners[mode](total_requests, workers, comic_id, alias)
+
+                        results['mode'].append(mode)
+                        results['strategy'].append(strategy)
+                        results['workers'].append(workers)
+                        results['time'].append(round(execution_time, 4))
+                        results['rps'].append(round(total_requests / execution_time, 1) if execution_time else None)
+
+        return results
+
+
+# --- Навантажувальне тестування реальних ендпоінтів ---
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = 'get'
+    # payload для i-го запиту (POST/PUT)
+    data: Optional[Callable[[int], dict]] = None
+    # запис відкочується після запиту, щоб бенчмарк не залишав даних у БД
+    rollback: bool = False
+
+
+DEFAULT_SCENARIOS = (
+    Scenario('api-list', '/api/comics/'),
+    Scenario('api-retrieve', '/api/comics/{comic_id}/'),
+    Scenario('api-create', '/api/genres/', method='post',
+             data=lambda i: {'genrename': f'benchmark-{time.time_ns()}-{i}'}, rollback=True),
+    Scenario('analytics-publishers', '/analytics/publishers/'),
+    Scenario('analytics-authors', '/analytics/authors/'),
+    Scenario('analytics-basic-stats', '/analytics/basic-stats/'),
+    Scenario('dashboard-plotly', '/dashboard/plotly/'),
+    Scenario('dashboard-plotly-server', '/dashboard/plotly/?render=server'),
+    Scenario('dashboard-bokeh', '/dashboard/bokeh/'),
+    Scenario('dashboard-data', '/dashboard/data/publishers/'),
+    Scenario('aggregated-report', '/report/aggregated/'),
+)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає КБ, macOS - байти
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+class LoadTestSuite:
+    # Проганяє сценарії через тестовий клієнт Django (повний стек middleware -> view -> БД)
+    # і рахує p50/p95/p99, пропускну здатність, запити до БД на запит і піковий RSS
+
+    def __init__(self, scenarios=None, requests=100, concurrency=1, warmup=3, cold_cache=False):
+        self.scenarios = list(scenarios or DEFAULT_SCENARIOS)
+        self.requests = requests
+        self.concurrency = concurrency
+        self.warmup = warmup
+        # Очищати кеші перед кожним запитом - міряє шлях до БД, а не попадання в кеш
+        self.cold_cache = cold_cache
+        self.user = User(username='benchmark', is_staff=True)
+
+    def make_client(self):
+        client = APIClient(HTTP_HOST=self.host(), HTTP_ACCEPT='application/json')
+        client.force_authenticate(self.user)
+        return client
+
+    @staticmethod
+    def host():
+        hosts = [h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*']
+        return hosts[0] if hosts else 'localhost'
+
+    def context(self):
+        return {
+            'comic_id': Comic.objects.order_by('pk').values_list('pk', flat=True).first(),
+        }
+
+    def _request(self, client, scenario, path, index):
+        if self.cold_cache:
+            for cache in caches.all():
+                cache.clear()
+        data = scenario.data(index) if scenario.data else None
+        send = getattr(client, scenario.method)
+
+        # Запити рахуються на всіх псевдонімах: читання роутер відправляє на репліки
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+            start = time.perf_counter()
+            if scenario.rollback:
+                with transaction.atomic():
+                    response = send(path, data, format='json')
+                    transaction.set_rollback(True)
+            else:
+                response = send(path, data, format='json') if data is not None else send(path)
+            elapsed = time.perf_counter() - start
+        return elapsed * 1000, sum(len(queries.captured_queries) for queries in captured), response.status_code
+
+    def _worker(self, scenario, path, indexes):
+        client = self.make_client()
+        try:
+            return [self._request(client, scenario, path, i) for i in indexes]
+        finally:
+            connections.close_all()
+
+    def run_scenario(self, scenario, context):
+        placeholders = [field for _, field, _, _ in string.Formatter().parse(scenario.path) if field]
+        missing = [field for field in placeholders if context.get(field) is None]
+        if missing:
+            return {'skipped': f"no data for {', '.join(missing)}"}
+        path = scenario.path.format(**context)
+
+        warmup_client = self.make_client()
+        for i in range(self.warmup):
+            self._request(warmup_client, scenario, path, -i - 1)
+
+        indexes = range(self.requests)
+        chunks = [indexes[i::self.concurrency] for i in range(self.concurrency)]
+        start = time.perf_counter()
+        if self.concurrency == 1:
+            samples = [self._request(warmup_client, scenario, path, i) for i in indexes]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = [executor.submit(self._worker, scenario, path, chunk) for chunk in chunks]
+                samples = list(itertools.chain.from_iterable(f.result() for f in futures))
+        wall = time.perf_counter() - start
+
+        latencies = [s[0] for s in samples]
+        return {
+            'path': path,
+            'method': scenario.method.upper(),
+            'requests': len(samples),
+            'errors': sum(1 for s in samples if s[2] >= 400),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'mean_ms': round(float(np.mean(latencies)), 3) if latencies else None,
+            'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+            'queries_per_request': round(float(np.mean([s[1] for s in samples])), 2) if samples else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    def run(self):
+        context = self.context()
+        results = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'requests': self.requests,
+                'concurrency': self.concurrency,
+                'cold_cache': self.cold_cache,
+                'database': connection.vendor,
+            },
+            'scenarios': {},
+        }
+        for scenario in self.scenarios:
+            results['scenarios'][scenario.name] = self.run_scenario(scenario, context)
+        results['meta']['peak_rss_mb'] = peak_rss_mb()
+        return results
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(current, baseline, tolerance=0.2):
+    # Регресія: p95 гірший за базовий більш ніж на tolerance або зросла кількість запитів до БД
+    regressions = []
+    for name, stats in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base or 'skipped' in stats or 'skipped' in base:
+            continue
+        if base['p95_ms'] and stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if stats['queries_per_request'] > base['queries_per_request']:
+            regressions.append(
+                f"{name}: {stats['queries_per_request']} queries/request > baseline {base['queries_per_request']}"
+            )
+
+    startup, base = current.get('startup'), baseline.get('startup')
+    if startup and base:
+        for key in ('import_ms', 'rss_mb'):
+            if base[key] and startup[key] > base[key] * (1 + tolerance):
+                regressions.append(f"startup: {key} {startup[key]} > baseline {base[key]}")
+        for module in startup['heavy_modules']:
+            if module not in base['heavy_modules']:
+                regressions.append(f"startup: {module} is now imported at worker start")
+        for module in startup.get('client_dashboard_heavy_modules', []):
+            if module not in base.get('client_dashboard_heavy_modules', []):
+                regressions.append(f"startup: {module} is now imported by client-side dashboards")
+    return regressions
+
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-                futures = [executor.submit(DatabaseBenchmark._single_db_request, i) for i in range(total_requests)]
+# --- Холодний старт воркера ---
+# Свіжий інтерпретатор робить те саме, що WSGI/ASGI-воркер до першої відповіді: django.setup(),
+# middleware, URLconf і шаблонний рушій (з бібліотеками тегів). Міряємо час і піковий RSS та
+# перевіряємо, що важкі бібліотеки аналітики не завантажуються наперед - вони потрібні лише
+# дашбордам і статистиці і підвантажуються на першому такому запиті.
+# Після цього той самий процес віддає по першому запиту клієнтських дашбордів (графіки будує
+# браузер) - їм ці бібліотеки теж не потрібні.
 
-                concurrent.futures.wait(futures)
+HEAVY_MODULES = ('numpy', 'pandas', 'plotly', 'bokeh')
+CLIENT_DASHBOARD_PATHS = ('/dashboard/plotly/', '/dashboard/bokeh/')
 
-            end_time = time.time()
-            execution_time = end_time - start_time
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.template import engines
+from django.urls import get_resolver
+get_resolver().url_patterns
+engines.all()
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+except ImportError:
+    rss = None
+heavy_modules, paths = %r
+heavy = sorted(name for name in heavy_modules if name in sys.modules)
+modules = len(sys.modules)
+from django.contrib.auth.models import User
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+factory = APIRequestFactory()
+for path in paths:
+    request = factory.get(path)
+    force_authenticate(request, user=User(username='startup-probe'))
+    response = resolve(path).func(request)
+    assert response.status_code == 200, (path, response.status_code)
+print(json.dumps({'import_ms': round(elapsed * 1000, 1), 'rss_mb': rss,
+                  'heavy_modules': heavy, 'modules': modules,
+                  'client_dashboard_heavy_modules': sorted(name for name in heavy_modules if name in sys.modules)}))
+"""
 
-            results['workers'].append(workers)
-            results['time'].append(round(execution_time, 4))
 
-        return results
\ No newline at end of file
+def measure_startup(runs=3):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE % ((HEAVY_MODULES, CLIENT_DASHBOARD_PATHS),)],
+            env=env, cwd=getattr(settings, 'BASE_DIR', None), capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'rss_mb': max((s['rss_mb'] for s in samples), default=None),
+        'heavy_modules': samples[-1]['heavy_modules'],
+        'modules': samples[-1]['modules'],
+        'client_dashboard_heavy_modules': samples[-1]['client_dashboard_heavy_modules'],
+    }
@@ -0,0 +1,33 @@
+# Функції для ProcessPoolExecutor. Модуль не імпортує моделі на верхньому рівні:
+# при start method spawn/forkserver дочірній процес імпортує його до django.setup().
+import django
+
+
+def init_process(alias=None, settings_dict=None):
+    # Власне підключення до БД на кожен процес; успадковане після fork не використовуємо
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from django.db import DEFAULT_DB_ALIAS, connections
+    alias = alias or DEFAULT_DB_ALIAS
+    if settings_dict is not None:
+        # Псевдонім стратегії підключень з батьківського процесу (при spawn його тут ще немає)
+        connections.settings[alias] = settings_dict
+    connections[alias].ensure_connection()
+
+
+def ready(index):
+    return index
+
+
+def single_db_request(index, comic_id=None, alias=None):
+    from django.db import DEFAULT_DB_ALIAS, connections
+    from .models import Comic
+    alias = alias or DEFAULT_DB_ALIAS
+    try:
+        Comic.objects.using(alias).count()
+        if comic_id is not None:
+            Comic.objects.using(alias).get(pk=comic_id)
+    finally:
+        connections[alias].close_if_unusable_or_obsolete()
+    return index
@@ -0,0 +1,129 @@
+from math import pi
+
+import pandas as pd
+from bokeh.embed import components
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+from bokeh.transform import cumsum
+
+from .cache import cached_result
+from .models import Author, Borrowing, Comic, ComicAuthor, Genre, Publisher, Reader, Review
+from .repositories import AnalyticsRepository
+
+# Серверні фігури Bokeh (дашборд з ?render=server); як і plotly_charts, імпортується
+# з comics/dashboard_views.py лише на першому запиті, якому потрібен серверний рендеринг.
+
+
+@cached_result('bokeh:publishers', models=(Publisher, Comic))
+def bokeh_publishers_chart(min_stock):
+    if not AnalyticsRepository.get_top_publishers_by_inventory(limit=1):
+        return None
+
+    rows1 = AnalyticsRepository.get_top_publishers_by_inventory(min_stock=min_stock)
+    df1 = pd.DataFrame(rows1, columns=['name', 'total_stock'])
+    source = ColumnDataSource(df1)
+    publishers = df1['name'].tolist()
+
+    p = figure(x_range=publishers, height=400, title="1. Видавництва (Inventory)",
+               toolbar_location=None, tools="", sizing_mode='stretch_width')
+    p.vbar(x='name', top='total_stock', width=0.9, source=source,
+           line_color='white')
+    return components(p)
+
+
+@cached_result('bokeh:authors', models=(Author, Review, ComicAuthor))
+def bokeh_authors_chart():
+    rows2 = AnalyticsRepository.get_highly_rated_authors(limit=20)
+    df2 = pd.DataFrame(rows2, columns=['lastname', 'avg_rating', 'review_count'])
+    if df2.empty:
+        return None
+    source = ColumnDataSource(df2)
+    p = figure(height=400, title="2. Автори (Rating vs Reviews)", sizing_mode='stretch_width')
+    p.circle(x='review_count', y='avg_rating', size=15, source=source)
+    return components(p)
+
+
+@cached_result('bokeh:release', models=(Comic,))
+def bokeh_release_chart():
+    rows3 = AnalyticsRepository.get_comics_release_activity(ascending=True)
+    df3 = pd.DataFrame(rows3, columns=['year', 'total_released'])
+    if df3.empty:
+        return None
+    p = figure(height=400, title="3. Динаміка публікацій", sizing_mode='stretch_width')
+    p.line(df3['year'], df3['total_released'], line_width=3, color="navy")
+    p.circle(df3['year'], df3['total_released'], size=8, line_color="navy")
+    return components(p)
+
+
+@cached_result('bokeh:genres', models=(Genre, Comic, Borrowing))
+def bokeh_genres_chart():
+    rows4 = AnalyticsRepository.get_popular_genres()
+    df4 = pd.DataFrame(rows4, columns=['genrename', 'borrow_count'])
+    if df4.empty:
+        return None
+
+    df4['angle'] = df4['borrow_count'] / df4['borrow_count'].sum() * 2 * pi
+
+    source = ColumnDataSource(df4)
+
+    p = figure(height=400, title="4. Популярні жанри (Pie Chart)", toolbar_location=None,
+               tools="hover", tooltips="@genrename: @borrow_count", x_range=(-0.5, 1.0),
+               sizing_mode='stretch_width')
+
+    p.wedge(x=0, y=1, radius=0.4,
+            start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'),
+            line_color="white", legend_field='genrename', source=source)
+
+    p.axis.axis_label = None
+    p.axis.visible = False
+    p.grid.grid_line_color = None
+
+    return components(p)
+
+
+@cached_result('bokeh:readers', models=(Reader, Borrowing))
+def bokeh_readers_chart():
+    rows5 = AnalyticsRepository.get_active_readers(limit=15)[::-1]  # Топ-15
+    df5 = pd.DataFrame(rows5, columns=['lastname', 'books_borrowed'])
+    if df5.empty:
+        return None
+    readers = df5['lastname'].tolist()
+    source = ColumnDataSource(df5)
+
+    p = figure(y_range=readers, height=400, title="5. Топ читачів (Horizontal)",
+               toolbar_location=None, tools="", sizing_mode='stretch_width')
+
+    p.hbar(y='lastname', right='books_borrowed', height=0.8, source=source,
+           line_color="white")
+
+    return components(p)
+
+
+@cached_result('bokeh:reviews', models=(Comic, Review))
+def bokeh_reviews_chart():
+    rows6 = AnalyticsRepository.get_most_reviewed_comics(limit=20)
+    df6 = pd.DataFrame(rows6, columns=['title', 'rating_avg', 'reviews_total'])
+    if df6.empty:
+        return None
+    source = ColumnDataSource(df6)
+    titles = df6['title'].tolist()
+
+    p = figure(x_range=titles, height=400, title="6. Рейтинг популярних коміксів (Color Map)",
+               toolbar_location=None, tools="", sizing_mode='stretch_width')
+
+    p.vbar(x='title', top='rating_avg', width=0.9, source=source)
+
+    p.xaxis.major_label_orientation = 0.785
+
+    return components(p)
+
+
+def bokeh_chart_calls(filters):
+    return [
+        (bokeh_publishers_chart, (filters['min_stock'],)),
+        (bokeh_authors_chart, ()),
+        (bokeh_release_chart, ()),
+        (bokeh_genres_chart, ()),
+        (bokeh_readers_chart, ()),
+        (bokeh_reviews_chart, ()),
+    ]
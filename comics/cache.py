@@ -0,0 +1,142 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.http import quote_etag
+
+from . import routers
+
+
+def get_cache():
+    return caches[getattr(settings, 'COMICS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'comics:version:{model._meta.db_table}'
+
+
+def _new_version():
+    # Початкове значення залежить від часу, тож після витіснення ключа
+    # версія не повториться і старі записи кешу не оживуть
+    return int(time.time() * 1000)
+
+
+def _object_version_key(model, pk):
+    return f'comics:version:{model._meta.db_table}:{pk}'
+
+
+def _versions(keys):
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = _new_version()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def data_version(*models):
+    # Версія даних для набору моделей; входить у ключі кешу,
+    # тому інвалідація - це просто збільшення лічильника
+    return _versions([_version_key(model) for model in models])
+
+
+def object_version(model, pk, *related):
+    # Версія одного рядка (зміна інших рядків таблиці її не зачіпає) плюс версії
+    # таблиць related, від яких залежить його представлення - одним get_many
+    return _versions([_object_version_key(model, pk), *(_version_key(m) for m in related)])
+
+
+def _written_key(key):
+    return f'{key}:written'
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+    if routers.replicas():
+        # Позначка "щойно змінено" живе стільки ж, скільки cookie read-your-writes - час,
+        # за який репліки мають наздогнати primary
+        cache.set(_written_key(key), 1, getattr(settings, 'COMICS_READ_YOUR_WRITES_SECONDS', 5))
+
+
+def _replica_may_lag(keys):
+    # Нова версія вже видна, а репліка могла ще не отримати сам запис: результат, прочитаний
+    # з неї, не можна зберігати під цією версією. Читання з primary - завжди свіже
+    if routers.read_alias() == DEFAULT_DB_ALIAS:
+        return False
+    return bool(get_cache().get_many([_written_key(key) for key in keys]))
+
+
+def may_be_stale(*models):
+    return _replica_may_lag([_version_key(model) for model in models])
+
+
+def object_may_be_stale(model, pk, *related):
+    return _replica_may_lag([_object_version_key(model, pk), *(_version_key(m) for m in related)])
+
+
+def bump_version(model):
+    _bump(_version_key(model))
+
+
+def bump_object_versions(model, pks):
+    for pk in pks:
+        _bump(_object_version_key(model, pk))
+
+
+def invalidate_model(model):
+    # Після коміту, щоб паралельний запит не закешував старі дані з новою версією
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def invalidate_objects(model, pks):
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: bump_object_versions(model, pks))
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def get_analytics_cache():
+    return caches[getattr(settings, 'COMICS_ANALYTICS_CACHE_ALIAS', 'default')]
+
+
+_MISSING = object()
+
+
+def cached_result(name, models, timeout=None):
+    # Кешує результат функції за ключем "ім'я + параметри + версія даних models".
+    # Бекенд (LocMem / FileBased / Redis) задається в CACHES, TTL - timeout або TIMEOUT бекенду.
+    # Функція читає з репліки; одразу після запису результат повертається, але не зберігається.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            params = repr((args, sorted(kwargs.items())))
+            digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+            key = f'comics:result:{name}:{digest}:{data_version(*models)}'
+
+            cache = get_analytics_cache()
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                if not may_be_stale(*models):
+                    if timeout is None:
+                        cache.set(key, result)
+                    else:
+                        cache.set(key, result, timeout)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+import numpy as np
+from django.db import connections
+
+CHUNK_SIZE = 10000
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+def fetch_columns(queryset, dtypes, chunk_size=CHUNK_SIZE):
+    # Читає values_list-запит курсором через fetchmany і складає одразу в масиви NumPy.
+    # chunked_cursor на PostgreSQL - серверний курсор (як у QuerySet.iterator()): звичайний
+    # клієнтський psycopg отримав би весь результат ще при execute(). Тож у пам'яті одночасно
+    # лише один блок кортежів, а не весь результат як список dict.
+    fields = list(dtypes)
+    # Псевдонім, який роутер вибрав для queryset (репліка або primary), - один раз для SQL і курсора
+    db = queryset.db
+    sql, params = queryset.values_list(*fields).query.get_compiler(using=db).as_sql()
+
+    blocks = {field: [] for field in fields}
+    with connections[db].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for field, values in zip(fields, zip(*rows)):
+                blocks[field].append(np.asarray(values, dtype=dtypes[field]))
+
+    return {
+        field: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[field])
+        for field, parts in blocks.items()
+    }
+
+
+def describe(values, percentiles=PERCENTILES):
+    # Ті самі ключі та семантика, що й у pandas Series.describe()
+    values = np.asarray(values, dtype=float)
+    stats = {
+        'count': float(values.size),
+        'mean': float(values.mean()) if values.size else None,
+        'std': float(values.std(ddof=1)) if values.size > 1 else None,
+        'min': float(values.min()) if values.size else None,
+    }
+    for q, value in zip(percentiles, np.quantile(values, percentiles) if values.size else [None] * len(percentiles)):
+        stats[f'{q:.0%}'] = None if value is None else float(value)
+    stats['max'] = float(values.max()) if values.size else None
+    return stats
+
+
+def group_mean(keys, values):
+    # Середнє values по групах keys без pandas.groupby: np.unique + bincount
+    if not keys.size:
+        return np.empty(0, dtype=keys.dtype), np.empty(0)
+    groups, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=values)
+    counts = np.bincount(inverse)
+    return groups, sums / counts
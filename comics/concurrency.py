@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+
+
+def _release_connections():
+    # Як наприкінці звичайного запиту: закрити, якщо CONN_MAX_AGE вичерпано або з'єднання зламане
+    for conn in connections.all(initialized_only=True):
+        conn.close_if_unusable_or_obsolete()
+
+
+def db_sync_to_async(func):
+    # sync_to_async у власному потоці (thread_sensitive=False), тож кілька таких викликів
+    # під asyncio.gather справді йдуть у БД паралельно - кожен зі своїм підключенням
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _release_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def max_concurrency():
+    return max(1, getattr(settings, 'COMICS_DASHBOARD_CONCURRENCY', 4))
+
+
+def get_pool():
+    # Один пул на процес: кількість потоків = максимум одночасних підключень до БД від дашбордів
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max_concurrency(), thread_name_prefix='comics-db')
+        return _pool
+
+
+def _run(func, args):
+    try:
+        return func(*args)
+    finally:
+        _release_connections()
+
+
+def _task(func, args):
+    # Копія contextvars - щоб запити потоку пулу потрапили в метрики поточного HTTP-запиту
+    return functools.partial(contextvars.copy_context().run, _run, func, args)
+
+
+def run_parallel(calls):
+    # calls - [(func, args), ...]; результати в тому ж порядку.
+    # Усередині транзакції інші підключення не бачать її змін, тож виконуємо послідовно.
+    if max_concurrency() == 1 or len(calls) < 2 or connection.in_atomic_block:
+        return [func(*args) for func, args in calls]
+    futures = [get_pool().submit(_task(func, args)) for func, args in calls]
+    return [future.result() for future in futures]
+
+
+async def arun_parallel(calls):
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(get_pool(), _task(func, args)) for func, args in calls))
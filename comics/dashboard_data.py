@@ -0,0 +1,59 @@
+from .models import Author, Borrowing, Comic, ComicAuthor, Genre, Publisher, Reader, Review
+from .repositories import AnalyticsRepository
+
+# Дані графіків дашбордів без рендерингу: стовпці {"name": [...], "total_stock": [...]}.
+# Малює браузер (шаблони dashboard_*.html); сервер лише читає агрегати з AnalyticsRepository,
+# а вони вже кешуються за версіями своїх моделей. Кожен графік - окремий запит зі своїм ETag
+# і своїм інтервалом оновлення (refresh, с), тож зміна одних даних не перебудовує всю сторінку.
+
+
+class ChartData:
+
+    def __init__(self, fetch, columns, models, params=(), refresh=300):
+        # fetch(**фільтри з params) -> рядки-словники з AnalyticsRepository
+        self.fetch = fetch
+        self.columns = columns
+        self.models = models
+        self.params = params
+        self.refresh = refresh
+
+    def filters(self, filters):
+        return {name: filters[name] for name in self.params}
+
+    def load(self, filters):
+        return to_columns(self.fetch(**self.filters(filters)), self.columns)
+
+
+def to_columns(rows, columns):
+    return {column: [row[column] for row in rows] for column in columns}
+
+
+CHARTS = {
+    'publishers': ChartData(
+        lambda min_stock, sort_by: AnalyticsRepository.get_top_publishers_by_inventory(
+            min_stock=min_stock, sort_by=sort_by, limit=20),
+        ('name', 'total_stock'), (Publisher, Comic), params=('min_stock', 'sort_by'), refresh=60,
+    ),
+    'authors': ChartData(
+        lambda min_rating, max_rating: AnalyticsRepository.get_highly_rated_authors(
+            min_rating=min_rating, max_rating=max_rating, limit=40),
+        ('lastname', 'avg_rating', 'review_count'), (Author, Review, ComicAuthor),
+        params=('min_rating', 'max_rating'), refresh=300,
+    ),
+    'release': ChartData(
+        lambda: AnalyticsRepository.get_comics_release_activity(ascending=True),
+        ('year', 'total_released'), (Comic,), refresh=3600,
+    ),
+    'genres': ChartData(
+        AnalyticsRepository.get_popular_genres,
+        ('genrename', 'borrow_count'), (Genre, Comic, Borrowing), refresh=300,
+    ),
+    'readers': ChartData(
+        lambda: AnalyticsRepository.get_active_readers(limit=20),
+        ('lastname', 'books_borrowed'), (Reader, Borrowing), refresh=60,
+    ),
+    'reviews': ChartData(
+        lambda: AnalyticsRepository.get_most_reviewed_comics(limit=20),
+        ('title', 'rating_avg', 'reviews_total'), (Comic, Review), refresh=300,
+    ),
+}
@@ -0,0 +1,249 @@
+from functools import lru_cache
+from importlib.metadata import version
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.html import format_html_join
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import dashboard_data, plotly_assets
+from .cache import data_version, make_etag, may_be_stale
+from .concurrency import run_parallel
+from .metrics import timed
+from .models import Author, Borrowing, Comic, ComicAuthor, Genre, Publisher, Reader, Review
+
+# Дашборди і бенчмарк. pandas / plotly / bokeh тут не імпортуються: серверні фігури будують
+# plotly_charts і bokeh_charts, які підвантажуються на першому запиті з ?render=server (чи POST
+# бенчмарку), а бандл plotly.js - на першому запиті самого файлу. Клієнтським дашбордам досить
+# версій пакетів з їхніх метаданих, тож воркер, що обслуговує лише API або клієнтські дашборди,
+# цих бібліотек не завантажує - див. стартовий бенчмарк (python manage.py benchmark --startup).
+
+# Від цих моделей залежать графіки дашбордів; їхні версії входять в ETag сторінки
+DASHBOARD_MODELS = (Publisher, Author, Comic, ComicAuthor, Genre, Reader, Review, Borrowing)
+PUBLISHER_SORT_OPTIONS = ('stock_desc', 'stock_asc', 'name')
+BOKEH_CDN_URL = 'https://cdn.bokeh.org/bokeh/release/{component}-{version}.min.js'
+
+
+def parse_dashboard_filters(request):
+    # Нормалізовані фільтри: однакові за змістом запити дають однаковий ключ кешу
+    sort_by = request.GET.get('sort_by', 'stock_desc')
+    if sort_by not in PUBLISHER_SORT_OPTIONS:
+        sort_by = 'stock_desc'
+    # Нечислові значення - 400 (і в APIView, і в async-варіантах), а не 500
+    try:
+        return {
+            'min_stock': int(request.GET.get('min_stock', 0)),
+            'sort_by': sort_by,
+            'min_rating': round(float(request.GET.get('min_rating', 0)), 2),
+            'max_rating': round(float(request.GET.get('max_rating', 10)), 2),
+        }
+    except ValueError:
+        raise ValidationError({'detail': 'Invalid dashboard filters'})
+
+
+def dashboard_not_modified(request, name, filters):
+    # If-None-Match збігся -> 304 без жодного запиту до БД і без рендерингу
+    etag = make_etag(name, sorted(filters.items()), data_version(*DASHBOARD_MODELS))
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is None and may_be_stale(*DASHBOARD_MODELS):
+        # Дані щойно змінились, а репліка може відставати - сторінка без ETag
+        etag = None
+    return etag, not_modified
+
+
+def dashboard_chart_sources(filters):
+    # Адреси даних графіків для шаблону: у query string - лише фільтри, від яких залежить графік,
+    # тож однакові графіки різних сторінок - один і той самий HTTP-ресурс
+    sources = []
+    for name, chart in dashboard_data.CHARTS.items():
+        url = reverse('dashboard-data', args=[name])
+        if chart.params:
+            url += '?' + urlencode(chart.filters(filters))
+        sources.append({'name': name, 'url': url, 'refresh': chart.refresh})
+    return sources
+
+
+def render_server_side(request):
+    # ?render=server - фігури будує сервер (як раніше), напр. для клієнтів без JS
+    return request.GET.get('render') == 'server'
+
+
+class DashboardChartDataView(APIView):
+    # Стовпці одного графіка (comics/dashboard_data.py); ETag - версії лише його моделей
+    def get(self, request, name):
+        chart = dashboard_data.CHARTS.get(name)
+        if chart is None:
+            raise NotFound(f'Unknown chart: {name}')
+        filters = parse_dashboard_filters(request)
+        etag = make_etag('chart', name, sorted(chart.filters(filters).items()), data_version(*chart.models))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            with timed('charts'):
+                response = Response(chart.load(filters))
+            if may_be_stale(*chart.models):
+                # Репліка може ще не мати щойно записаного: без ETag і без кешу в браузері
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=chart.refresh)
+        return response
+
+
+class DashboardPlotlyView(APIView):
+    def get(self, request):
+        filters = parse_dashboard_filters(request)
+        if not render_server_side(request):
+            # Лише каркас сторінки: кожен графік браузер завантажує і малює сам
+            return render(request, 'comics/dashboard_plotly.html', {
+                'chart_sources': dashboard_chart_sources(filters),
+                'filters': filters
+            })
+
+        etag, not_modified = dashboard_not_modified(request, 'plotly', filters)
+        if not_modified is not None:
+            return not_modified
+
+        from . import plotly_charts
+
+        with timed('charts'):
+            charts = run_parallel(plotly_charts.plotly_chart_calls(filters))
+
+        with timed('render'):
+            response = render(request, 'comics/dashboard_plotly.html', {
+                'charts': [chart for chart in charts if chart is not None],
+                'filters': filters
+            })
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+
+def plotly_js(request, fingerprint):
+    # Бандл plotly.js + рендер графіків; адреса містить відбиток, тож кешується "назавжди".
+    # Застарілий відбиток (після оновлення plotly) - редірект на актуальний файл
+    if fingerprint != plotly_assets.fingerprint():
+        return redirect('plotly-js', fingerprint=plotly_assets.fingerprint())
+
+    etag = f'"{fingerprint}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is None:
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(plotly_assets.gzipped_bundle(), content_type='text/javascript; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(plotly_assets.bundle(), content_type='text/javascript; charset=utf-8')
+    else:
+        response = not_modified
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+@lru_cache(maxsize=None)
+def bokeh_api_resources():
+    # BokehJS + bokeh-api (Bokeh.Plotting) для графіків, які будує браузер - ті самі адреси CDN,
+    # що дає bokeh.resources, але з версії в метаданих пакета, без імпорту bokeh
+    return format_html_join('\n', '<script src="{}"></script>', (
+        (BOKEH_CDN_URL.format(component=component, version=version('bokeh')),)
+        for component in ('bokeh', 'bokeh-api')
+    ))
+
+
+class DashboardBokehView(APIView):
+    def get(self, request):
+        dashboard_filters = parse_dashboard_filters(request)
+        filters = {'min_stock': dashboard_filters['min_stock']}
+        if not render_server_side(request):
+            return render(request, 'comics/dashboard_bokeh.html', {
+                'chart_sources': dashboard_chart_sources(dashboard_filters),
+                'filters': filters,
+                'resources': bokeh_api_resources()
+            })
+
+        etag, not_modified = dashboard_not_modified(request, 'bokeh', filters)
+        if not_modified is not None:
+            return not_modified
+
+        from bokeh.resources import CDN
+        from . import bokeh_charts
+
+        with timed('charts'):
+            script_divs = run_parallel(bokeh_charts.bokeh_chart_calls(filters))
+
+        resources = CDN.render()
+
+        with timed('render'):
+            response = render(request, 'comics/dashboard_bokeh.html', {
+                'charts': [chart for chart in script_divs if chart is not None],
+                'filters': filters,
+                'resources': resources
+            })
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+
+class CanRunBenchmarks(BasePermission):
+    # Прогін синхронно займає воркер на весь час і навантажує БД: запускати його можуть лише
+    # персонал або DEBUG-оточення; для навантажувальних прогонів - manage.py benchmark
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or settings.DEBUG or request.user.is_staff
+
+
+class BenchmarkView(APIView):
+    # Сам бенчмарк (numpy) і графік (pandas, plotly) потрібні лише після POST
+    permission_classes = [IsAuthenticated, CanRunBenchmarks]
+
+    def get(self, request):
+        return render(request, 'comics/benchmark.html', {'chart': None})
+
+    def post(self, request):
+        from .benchmark import DatabaseBenchmark
+        from .plotly_charts import benchmark_chart
+
+        try:
+            total_requests = int(request.POST.get('total_requests', 200))
+        except ValueError:
+            total_requests = 200
+
+        if request.POST.get('kind') == 'suite':
+            return self.run_suite(request, total_requests)
+
+        modes = [m for m in request.POST.getlist('modes') if m in DatabaseBenchmark.WEB_MODES] or ['thread']
+        strategies = [s for s in request.POST.getlist('strategies')
+                      if s in DatabaseBenchmark.STRATEGIES] or ['persistent']
+
+        data = DatabaseBenchmark.run_benchmark(
+            total_requests=total_requests,
+            max_workers_list=[1, 2, 4, 5, 8, 10, 16, 32],
+            modes=modes,
+            strategies=strategies
+        )
+
+        return render(request, 'comics/benchmark.html', {
+            'chart': benchmark_chart(data, total_requests),
+            'last_requests': total_requests,
+            'modes': modes,
+            'strategies': strategies
+        })
+
+    def run_suite(self, request, total_requests):
+        from .benchmark import LoadTestSuite
+        from .plotly_charts import suite_chart
+
+        # Реальні сценарії (API, аналітика, дашборди, звіт) через тестовий клієнт
+        results = LoadTestSuite(requests=total_requests).run()
+
+        return render(request, 'comics/benchmark.html', {
+            'chart': suite_chart(results, total_requests),
+            'suite': results,
+            'last_requests': total_requests
+        })
@@ -0,0 +1,35 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def stream_ndjson(objs, serializer_class, flush_every=200):
+    # Один JSON-об'єкт на рядок; буфер скидається кожні flush_every рядків
+    buffer = []
+    for obj in objs:
+        buffer.append(_dumps(serializer_class(obj).data))
+        if len(buffer) >= flush_every:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def stream_json_array(objs, serializer_class, flush_every=200):
+    # Той самий потік, але як один JSON-масив: [ {...},{...} ]
+    yield '['
+    buffer = []
+    first = True
+    for obj in objs:
+        buffer.append(_dumps(serializer_class(obj).data))
+        if len(buffer) >= flush_every:
+            yield ('' if first else ',') + ','.join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield ']'
@@ -0,0 +1,127 @@
+import json
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.http import parse_header_parameters
+from rest_framework import serializers
+from rest_framework.fields import Field
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # необов'язкова залежність: без неї - json.dumps з параметрами JSONRenderer
+    orjson = None
+
+
+# Швидкий шлях list-відповіді: рядки values() замість екземплярів моделі і ModelSerializer.
+# Результат побайтово збігається з JSONRenderer(serializer(many=True).data); серіалізатори,
+# які не вдається так відтворити (SerializerMethodField, власний to_representation тощо), -
+# звичайним шляхом (build_plan повертає None).
+
+class FastListPlan:
+
+    def __init__(self, columns):
+        # [(ім'я в JSON, колонка values() або m2m-поле, перетворення; None - список id з m2m)],
+        # у порядку serializer.fields
+        self.columns = columns
+
+    @property
+    def fields(self):
+        return [column for _, column, convert in self.columns if convert is not None]
+
+    def only(self, names):
+        # Sparse fieldset (?fields=): ті самі перетворення, лише вибрані поля
+        return FastListPlan([entry for entry in self.columns if entry[0] in names])
+
+    def rows(self, repo, values):
+        pk = repo.model._meta.pk.attname
+        pks = [row[pk] for row in values]
+        related = {column: repo.get_related_ids(column, pks)
+                   for _, column, convert in self.columns if convert is None}
+
+        result = []
+        for row in values:
+            item = {}
+            for name, column, convert in self.columns:
+                if convert is None:
+                    item[name] = related[column][row[pk]]
+                else:
+                    value = row[column]
+                    item[name] = None if value is None else convert(value)
+            result.append(item)
+        return result
+
+
+def _is_stock(field, base, method):
+    return getattr(type(field), method) is getattr(base, method)
+
+
+def _pk_only(field):
+    # PrimaryKeyRelatedField без pk_field віддає саме значення *_id
+    return (isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None
+            and _is_stock(field, PrimaryKeyRelatedField, 'to_representation')
+            and _is_stock(field, RelatedField, 'get_attribute'))
+
+
+@lru_cache(maxsize=None)
+def build_plan(serializer_class):
+    if serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    serializer = serializer_class()
+    opts = serializer.Meta.model._meta
+    columns = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = opts.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+
+        if isinstance(field, ManyRelatedField):
+            if not (model_field.many_to_many and model_field.concrete and _pk_only(field.child_relation)
+                    and _is_stock(field, ManyRelatedField, 'to_representation')
+                    and _is_stock(field, ManyRelatedField, 'get_attribute')):
+                return None
+            columns.append((name, model_field.name, None))
+        elif model_field.is_relation:
+            if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+                    and _pk_only(field)):
+                return None
+            columns.append((name, model_field.attname, _identity))
+        else:
+            if not (model_field.concrete and _is_stock(field, Field, 'get_attribute')):
+                return None
+            # Значення з values() те саме, що getattr(instance, name): ті самі from_db_value конвертери
+            columns.append((name, model_field.attname, field.to_representation))
+
+    return FastListPlan(columns)
+
+
+def _identity(value):
+    return value
+
+
+def can_render(renderer, accepted_media_type):
+    # Лише стандартний компактний JSON без ?indent - інакше байти відрізнялися б
+    if type(renderer) is not JSONRenderer or not renderer.compact:
+        return False
+    _, params = parse_header_parameters(accepted_media_type or '')
+    return 'indent' not in params
+
+
+def render(data, renderer):
+    if orjson is not None and not renderer.ensure_ascii:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=renderer.ensure_ascii,
+            allow_nan=not renderer.strict, separators=(',', ':'),
+        ).encode()
+    # Як і JSONRenderer: U+2028/U+2029 завжди екрануються
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,72 @@
+import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .repositoriesdir.filter_spec import FilterSpec
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+
+def parse_bool(value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+
+def parse_date(value):
+    return datetime.date.fromisoformat(value)
+
+
+class Filter:
+    # ?param=value -> Q(lookup=parse(value))
+    def __init__(self, lookup, parse=int):
+        self.lookup = lookup
+        self.parse = parse
+
+    def to_q(self, value):
+        return Q(**{self.lookup: self.parse(value)})
+
+
+class ConditionFilter:
+    # ?param=true - умова, ?param=false - її заперечення; condition() будується на кожен запит
+    # (напр. "прострочено" залежить від поточної дати)
+    def __init__(self, condition):
+        self.condition = condition
+
+    def to_q(self, value):
+        condition = self.condition()
+        return condition if parse_bool(value) else ~condition
+
+
+def build_filter_spec(params, filter_fields, ordering_fields, model, fields=None):
+    # Параметри запиту -> FilterSpec; некоректні значення - 400 зі списком помилок по параметрах
+    errors = {}
+    conditions = []
+    for name, flt in filter_fields.items():
+        if name in params:
+            try:
+                conditions.append(flt.to_q(params[name]))
+            except (TypeError, ValueError):
+                errors[name] = [f'Invalid value: {params[name]!r}']
+
+    ordering = []
+    for name in filter(None, (part.strip() for part in params.get('ordering', '').split(','))):
+        if name.lstrip('-') not in ordering_fields:
+            errors['ordering'] = [f'Allowed: {", ".join(ordering_fields) or "none"}']
+            break
+        ordering.append(name)
+
+    if errors:
+        raise ValidationError(errors)
+
+    # only() - лише для власних колонок моделі; m2m (authors) читається окремим запитом
+    columns = ()
+    if fields is not None:
+        concrete = {f.name for f in model._meta.concrete_fields}
+        columns = ('pk', *(name for name in fields if name in concrete))
+    return FilterSpec(conditions, ordering, columns)
@@ -1,8 +1,90 @@
-# comics/forms.py
 from django import forms
-from .models import Comic
+from django.core.exceptions import ValidationError
+from .models import Comic, Genre, Publisher
+from .repositoriesdir.django_repositories import repository_for
+
+
+class CachedModelChoiceIterator(forms.models.ModelChoiceIterator):
+    # Варіанти вибору - з репозиторію (для Genre/Publisher це копія таблиці в пам'яті процесу)
+
+    def __iter__(self):
+        repo = self.field.repo
+        if repo is None:
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in repo.get_all():
+            yield self.choice(obj)
+
+    def __len__(self):
+        repo = self.field.repo
+        if repo is None:
+            return super().__len__()
+        return len(repo.get_all()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        repo = self.field.repo
+        if repo is None:
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(repo.get_all())
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    # ModelChoiceField без запитів до БД для довідників: і рендер <select>, і валідація POST
+    # ідуть через репозиторій; відфільтрований queryset - стандартним шляхом
+    iterator = CachedModelChoiceIterator
+
+    @property
+    def repo(self):
+        if self.queryset is None or self.queryset.query.has_filters():
+            return None
+        # ForeignKey.formfield() завжди передає to_field_name; через репозиторій - лише коли це pk
+        if self.to_field_name not in (None, self.queryset.model._meta.pk.name):
+            return None
+        return repository_for(self.queryset.model)
+
+    def to_python(self, value):
+        repo = self.repo
+        if repo is None or value in self.empty_values:
+            return super().to_python(value)
+        self.validate_no_null_characters(value)
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = repo.get_by_id(self.queryset.model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
 
 class ComicForm(forms.ModelForm):
+    # Довідники оголошені на формі і виключені в Meta: їхнє існування вже перевірив репозиторій
+    # у to_python, а поля з Meta.exclude модельна валідація пропускає - без повторного SELECT 1 ...
+    # з ForeignKey.validate() у full_clean(). В instance їх переносить clean(), початкові - __init__.
+    REFERENCE_FIELDS = ('publisher', 'genre')
+    publisher = CachedModelChoiceField(queryset=Publisher.objects.all())
+    genre = CachedModelChoiceField(queryset=Genre.objects.all())
+    field_order = ['title', 'volume', 'releasedate', 'availablenumber', 'publisher', 'genre']
+
     class Meta:
         model = Comic
-        fields = '__all__'
+        exclude = ('publisher', 'genre')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.REFERENCE_FIELDS:
+            self.initial.setdefault(name, getattr(self.instance, f'{name}_id'))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name in self.REFERENCE_FIELDS:
+            if name in cleaned_data:
+                setattr(self.instance, name, cleaned_data[name])
+        return cleaned_data
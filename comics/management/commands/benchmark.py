@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comics.benchmark import (
+    DEFAULT_SCENARIOS, DatabaseBenchmark, LoadTestSuite, compare_results, load_results, measure_startup,
+    save_results,
+)
+
+
+class Command(BaseCommand):
+    help = "Навантажувальний тест основних ендпоінтів: p50/p95/p99, RPS, запити до БД, піковий RSS"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help="Запитів на сценарій")
+        parser.add_argument('--concurrency', type=int, default=1, help="Кількість паралельних потоків")
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--scenario', nargs='+', choices=[s.name for s in DEFAULT_SCENARIOS],
+                            help="Запустити лише вказані сценарії")
+        parser.add_argument('--cold-cache', action='store_true',
+                            help="Очищати кеші перед кожним запитом")
+        parser.add_argument('--startup', action='store_true',
+                            help="Лише холодний старт воркера: час імпорту, RSS, завантажені важкі модулі")
+        parser.add_argument('--db', action='store_true',
+                            help="COUNT(*) + вибірка за pk з різною кількістю воркерів (як на сторінці бенчмарку)")
+        parser.add_argument('--modes', nargs='+', choices=DatabaseBenchmark.MODES, default=['thread'],
+                            help="Режими для --db; process - лише тут, не з веб-сторінки")
+        parser.add_argument('--strategies', nargs='+', choices=DatabaseBenchmark.STRATEGIES,
+                            default=['persistent'], help="Підключення до БД для --db")
+        parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8, 16],
+                            help="Кількість воркерів для --db")
+        parser.add_argument('--output', help="Зберегти результати в JSON")
+        parser.add_argument('--baseline', help="JSON з попереднього запуску для порівняння")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Допустиме погіршення p95 відносно baseline (0.2 = 20%%)")
+
+    def handle(self, *args, **options):
+        if options['startup']:
+            results = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}, 'scenarios': {},
+                       'startup': measure_startup()}
+            startup = results['startup']
+            self.stdout.write(
+                f"startup: {startup['import_ms']} ms (median of {startup['runs']}), RSS {startup['rss_mb']} MB, "
+                f"{startup['modules']} modules; heavy: {', '.join(startup['heavy_modules']) or 'none'}"
+            )
+            return self.finish(results, options)
+
+        if options['db']:
+            data = DatabaseBenchmark.run_benchmark(
+                total_requests=options['requests'], max_workers_list=options['workers'],
+                modes=options['modes'], strategies=options['strategies'],
+            )
+            self.stdout.write(f"{'mode':<10}{'strategy':<12}{'workers':>8}{'time':>10}{'rps':>10}")
+            for row in zip(data['mode'], data['strategy'], data['workers'], data['time'], data['rps']):
+                self.stdout.write(f"{row[0]:<10}{row[1]:<12}{row[2]:>8}{row[3]:>10.4f}{row[4] or 0:>10.1f}")
+            return
+
+        scenarios = DEFAULT_SCENARIOS
+        if options['scenario']:
+            scenarios = [s for s in DEFAULT_SCENARIOS if s.name in options['scenario']]
+
+        suite = LoadTestSuite(
+            scenarios=scenarios,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            cold_cache=options['cold_cache'],
+        )
+        results = suite.run()
+
+        self.stdout.write(f"{'scenario':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'q/req':>7}{'err':>5}")
+        for name, stats in results['scenarios'].items():
+            if 'skipped' in stats:
+                self.stdout.write(f"{name:<24}skipped: {stats['skipped']}")
+                continue
+            self.stdout.write(
+                f"{name:<24}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                f"{stats['throughput_rps']:>9.1f}{stats['queries_per_request']:>7.1f}{stats['errors']:>5}"
+            )
+        self.stdout.write(f"peak RSS: {results['meta']['peak_rss_mb']} MB")
+        self.finish(results, options)
+
+    def finish(self, results, options):
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(f"Results saved to {options['output']}")
+
+        if options['baseline']:
+            regressions = compare_results(results, load_results(options['baseline']), options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions against baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
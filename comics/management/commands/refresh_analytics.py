@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from comics import summaries
+from comics.cache import bump_version
+from comics.signals import TRACKED_MODELS
+
+
+class Command(BaseCommand):
+    help = "Повністю перераховує таблиці *_stats, з яких читає AnalyticsRepository"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=sorted(summaries.REFRESHERS),
+                            help="Перерахувати лише вказані агрегати")
+
+    def handle(self, *args, **options):
+        kinds = options['only'] or list(summaries.REFRESHERS)
+        for kind in kinds:
+            summaries.REFRESHERS[kind]()
+            self.stdout.write(f"{kind}: refreshed")
+        # Закешовані результати аналітики прив'язані до версій моделей - скидаємо їх
+        for model in TRACKED_MODELS:
+            bump_version(model)
+        self.stdout.write(self.style.SUCCESS("Analytics summaries are up to date"))
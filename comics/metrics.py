@@ -0,0 +1,234 @@
+import contextvars
+import heapq
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Метрики поточного запиту. contextvar, а не thread-local: переходить у sync_to_async
+# і в потоки, запущені через contextvars.copy_context().run
+_current = contextvars.ContextVar('comics_request_metrics', default=None)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def query_signature(sql):
+    # Параметри вже винесені в %s; лишається звести IN (%s, %s, ...) різної довжини до одного вигляду
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.signatures = Counter()
+        self.timings = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+            self.signatures[query_signature(sql)] += 1
+            entry = (duration, self.queries, sql)
+            limit = getattr(settings, 'COMICS_METRICS_SLOW_QUERIES', 3)
+            if len(self.slowest) < limit:
+                heapq.heappush(self.slowest, entry)
+            elif limit:
+                heapq.heappushpop(self.slowest, entry)
+
+    def repeated_queries(self):
+        # Однаковий запит, виконаний багато разів за один HTTP-запит, - типова сигнатура N+1
+        threshold = getattr(settings, 'COMICS_METRICS_N_PLUS_ONE_THRESHOLD', 5)
+        return [(sql, count) for sql, count in self.signatures.most_common() if count >= threshold]
+
+    def slowest_queries(self):
+        return [(sql, duration) for duration, _, sql in sorted(self.slowest, reverse=True)]
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def install_wrapper(connection, **kwargs):
+    # execute_wrappers живе на DatabaseWrapper і переживає перепідключення
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+connection_created.connect(install_wrapper, dispatch_uid='comics-metrics-wrapper')
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    # Фаза запиту для Server-Timing, напр. with timed('serialize'): serializer.data
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.timings[name] += time.perf_counter() - start
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    # Агрегати по маршрутах у пам'яті процесу; кожен воркер gunicorn/uvicorn віддає свої
+    HISTOGRAMS = {
+        'comics_request_duration_ms': LATENCY_BUCKETS_MS,
+        'comics_request_db_ms': LATENCY_BUCKETS_MS,
+        'comics_request_queries': QUERY_BUCKETS,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._n_plus_one = Counter()
+
+    def observe(self, method, route, metrics):
+        values = {
+            'comics_request_duration_ms': metrics.total_time * 1000,
+            'comics_request_db_ms': metrics.db_time * 1000,
+            'comics_request_queries': metrics.queries,
+        }
+        with self._lock:
+            for name, value in values.items():
+                key = (name, method, route)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.HISTOGRAMS[name])
+                self._histograms[key].observe(value)
+            if metrics.repeated_queries():
+                self._n_plus_one[(method, route)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._n_plus_one.clear()
+
+    def render(self):
+        # Текстовий формат Prometheus
+        lines = []
+        with self._lock:
+            for name in self.HISTOGRAMS:
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, method, route), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    labels = f'method="{method}",route="{_escape(route)}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.3f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+            lines.append('# TYPE comics_request_n_plus_one_total counter')
+            for (method, route), count in sorted(self._n_plus_one.items()):
+                lines.append(f'comics_request_n_plus_one_total{{method="{method}",route="{_escape(route)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+# Пул psycopg_pool (settings.COMICS_DB_POOL): заповненість і очікування вільного з'єднання.
+# Лічильники накопичуються з моменту відкриття пулу; середнє очікування - wait_ms / queued
+POOL_GAUGES = {
+    'comics_db_pool_size': 'pool_size',
+    'comics_db_pool_available': 'pool_available',
+    'comics_db_pool_max': 'pool_max',
+    'comics_db_pool_requests_waiting': 'requests_waiting',
+}
+POOL_COUNTERS = {
+    'comics_db_pool_requests_total': 'requests_num',
+    'comics_db_pool_requests_queued_total': 'requests_queued',
+    'comics_db_pool_requests_wait_ms_total': 'requests_wait_ms',
+    'comics_db_pool_requests_errors_total': 'requests_errors',
+    'comics_db_pool_usage_ms_total': 'usage_ms',
+    'comics_db_pool_connections_total': 'connections_num',
+    'comics_db_pool_connections_lost_total': 'connections_lost',
+    'comics_db_pool_returns_bad_total': 'returns_bad',
+}
+
+
+def pool_stats():
+    # {alias: get_stats()} для пулів, уже відкритих у цьому процесі; без пулу - {}
+    stats = {}
+    for alias in connections:
+        # Властивість pool бекенду PostgreSQL створює і відкриває пул при першому зверненні, тож
+        # читаємо лише вже створені (DatabaseWrapper._connection_pools, спільний для процесу)
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None and not pool.closed:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def render_pool_stats(stats=None):
+    stats = pool_stats() if stats is None else stats
+    lines = []
+    for kind, metrics in (('gauge', POOL_GAUGES), ('counter', POOL_COUNTERS)):
+        for name, key in metrics.items():
+            lines.append(f'# TYPE {name} {kind}')
+            for alias, values in sorted(stats.items()):
+                lines.append(f'{name}{{alias="{_escape(alias)}"}} {values.get(key, 0)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,153 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+from .repositoriesdir import identity_map
+
+logger = logging.getLogger('comics.metrics')
+
+
+class RequestMetricsMiddleware:
+    # Для кожного запиту: кількість SQL, час у БД, найповільніші запити, повтори (N+1),
+    # фази serialize/render і загальний час -> Server-Timing, рядок логу, гістограми /metrics/
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            metrics.install_wrapper(connection)
+
+        request_metrics, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self.report(request, response, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self.report(request, response, request_metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Response і TemplateResponse рендеряться вже після view - міряємо окремо
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                request_metrics.timings['render'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, request_metrics):
+        total_ms = request_metrics.total_time * 1000
+        db_ms = request_metrics.db_time * 1000
+        repeated = request_metrics.repeated_queries()
+
+        timing = [f'db;dur={db_ms:.2f};desc="{request_metrics.queries} queries"']
+        timing += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in request_metrics.timings.items()]
+        timing.append(f'total;dur={total_ms:.2f}')
+        response['Server-Timing'] = ', '.join(timing)
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        metrics.registry.observe(request.method, route, request_metrics)
+
+        if repeated:
+            level = logging.WARNING
+        elif total_ms >= getattr(settings, 'COMICS_METRICS_SLOW_REQUEST_MS', 500):
+            level = logging.INFO
+        else:
+            level = logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'queries': request_metrics.queries,
+            'timings_ms': {name: round(s * 1000, 2) for name, s in request_metrics.timings.items()},
+            'slowest': [{'sql': sql[:300], 'ms': round(d * 1000, 2)} for sql, d in request_metrics.slowest_queries()],
+            'n_plus_one': [{'sql': sql[:300], 'count': count} for sql, count in repeated],
+        }, ensure_ascii=False))
+
+
+class IdentityMapMiddleware:
+    # Новий identity map репозиторіїв на кожен запит; скидається у finally, навіть після винятку
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with identity_map.scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with identity_map.scope():
+            return await self.get_response(request)
+
+
+class ReadYourWritesMiddleware:
+    # Запити, що змінюють дані (POST/PUT/PATCH/DELETE), читають з primary; клієнт, який щойно писав,
+    # отримує cookie і ще COMICS_READ_YOUR_WRITES_SECONDS читає з primary, поки репліки наздоганяють
+    COOKIE_NAME = 'comics_primary'
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routers.request_scope(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.remember(response, state)
+
+    async def __acall__(self, request):
+        with routers.request_scope(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.remember(response, state)
+
+    def pinned(self, request):
+        return request.method not in self.SAFE_METHODS or self.COOKIE_NAME in request.COOKIES
+
+    def remember(self, response, state):
+        if state.wrote:
+            response.set_cookie(self.COOKIE_NAME, '1', httponly=True, samesite='Lax',
+                                max_age=getattr(settings, 'COMICS_READ_YOUR_WRITES_SECONDS', 5))
+        return response
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenreStats',
+            fields=[
+                ('genre', models.OneToOneField(db_column='genreid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats', serialize=False, to='comics.genre')),
+                ('borrow_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'genre_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(db_column='authorid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats', serialize=False, to='comics.author')),
+                ('avg_rating', models.FloatField(null=True)),
+                ('review_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'author_stats',
+                'indexes': [models.Index(fields=['avg_rating'], name='author_stats_rating_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ComicStats',
+            fields=[
+                ('comic', models.OneToOneField(db_column='comicid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats', serialize=False, to='comics.comic')),
+                ('reviews_total', models.IntegerField(default=0)),
+                ('rating_avg', models.FloatField(null=True)),
+            ],
+            options={
+                'db_table': 'comic_stats',
+                'indexes': [models.Index(fields=['reviews_total'], name='comic_stats_reviews_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PublisherStats',
+            fields=[
+                ('publisher', models.OneToOneField(db_column='publisherid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats', serialize=False, to='comics.publisher')),
+                ('total_stock', models.IntegerField(default=0)),
+                ('titles_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'publisher_stats',
+                'indexes': [models.Index(fields=['total_stock'], name='publisher_stats_stock_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReaderStats',
+            fields=[
+                ('reader', models.OneToOneField(db_column='readerid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats', serialize=False, to='comics.reader')),
+                ('books_borrowed', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'reader_stats',
+                'indexes': [models.Index(fields=['books_borrowed'], name='reader_stats_borrowed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# comic/review/borrowing - managed = False: автодетектор міграцій індекси таких моделей
+# ігнорує, а їхній історичний стан (0001) неповний (без FK). Тому індекси з Meta.indexes
+# створюються тут напряму за іменами колонок - лише якщо таблиця існує і такого індексу
+# (за назвою або тим самим набором колонок) ще немає.
+# На PostgreSQL - CREATE/DROP INDEX CONCURRENTLY: звичайний CREATE INDEX блокує запис у таблицю
+# на весь час побудови, а це мільйони рядків. CONCURRENTLY не працює в транзакції - atomic = False.
+INDEXES = [
+    ('comic', 'comic_releasedate_idx', ['releasedate']),
+    ('review', 'review_comic_idx', ['comicid']),
+    ('borrowing', 'borrowing_reader_idx', ['readerid']),
+    ('borrowing', 'borrowing_returndate_idx', ['returndate']),
+]
+
+
+def _existing_indexes(connection, table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {name: info['columns'] for name, info in constraints.items() if info['index'] or info['primary_key']}
+
+
+def _concurrently(connection):
+    return ' CONCURRENTLY' if connection.vendor == 'postgresql' else ''
+
+
+def _invalid_indexes(connection):
+    # Перерваний CREATE INDEX CONCURRENTLY лишає недійсний індекс з тим самим ім'ям - його перебудовуємо
+    if connection.vendor != 'postgresql':
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                       'WHERE NOT i.indisvalid')
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    tables = set(connection.introspection.table_names())
+    invalid = _invalid_indexes(connection)
+    for table, name, columns in INDEXES:
+        if table not in tables:
+            continue
+        existing = _existing_indexes(connection, table)
+        if name in invalid:
+            schema_editor.execute('DROP INDEX%s %s' % (_concurrently(connection), schema_editor.quote_name(name)))
+            existing.pop(name, None)
+        if name in existing or columns in existing.values():
+            continue
+        schema_editor.execute('CREATE INDEX%s %s ON %s (%s)' % (
+            _concurrently(connection),
+            schema_editor.quote_name(name),
+            schema_editor.quote_name(table),
+            ', '.join(schema_editor.quote_name(column) for column in columns),
+        ))
+
+
+def drop_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    tables = set(connection.introspection.table_names())
+    for table, name, columns in INDEXES:
+        if table in tables and name in _existing_indexes(connection, table):
+            schema_editor.execute('DROP INDEX%s %s' % (_concurrently(connection), schema_editor.quote_name(name)))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('comics', '0002_analytics_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
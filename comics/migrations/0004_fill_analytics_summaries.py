@@ -0,0 +1,70 @@
+from django.db import DEFAULT_DB_ALIAS, migrations
+
+# Таблиці *_stats з 0002 створюються порожніми, а AnalyticsRepository і дашборди читають лише їх -
+# без наповнення після деплою вони мовчки віддавали б порожні результати. Базові таблиці
+# managed = False: в історичному стані міграцій у них немає FK, тож агрегати - INSERT ... SELECT
+# по таблицях і стовпцях, якими вони є на момент цієї міграції (не живі моделі і не comics.summaries).
+# Якщо базових таблиць немає (порожня/тестова БД), агрегувати нічого.
+# Пізніше таблиці перераховує manage.py refresh_analytics.
+BASE_TABLES = ('publisher', 'author', 'genre', 'reader', 'comic', 'review', 'borrowing', 'comicauthor')
+
+SUMMARIES = {
+    'publisher_stats': """
+        INSERT INTO publisher_stats (publisherid, total_stock, titles_count)
+        SELECT p.publisherid, COALESCE(SUM(c.availablenumber), 0), COUNT(c.comicid)
+        FROM publisher p LEFT JOIN comic c ON c.publisherid = p.publisherid
+        GROUP BY p.publisherid
+    """,
+    'author_stats': """
+        INSERT INTO author_stats (authorid, avg_rating, review_count)
+        SELECT a.authorid, AVG(r.rating), COUNT(r.reviewid)
+        FROM author a
+        LEFT JOIN comicauthor ca ON ca.authorid = a.authorid
+        LEFT JOIN review r ON r.comicid = ca.comicid
+        GROUP BY a.authorid
+    """,
+    'genre_stats': """
+        INSERT INTO genre_stats (genreid, borrow_count)
+        SELECT g.genreid, COUNT(b.borrowid)
+        FROM genre g
+        LEFT JOIN comic c ON c.genreid = g.genreid
+        LEFT JOIN borrowing b ON b.comicid = c.comicid
+        GROUP BY g.genreid
+    """,
+    'reader_stats': """
+        INSERT INTO reader_stats (readerid, books_borrowed)
+        SELECT rd.readerid, COUNT(b.borrowid)
+        FROM reader rd LEFT JOIN borrowing b ON b.readerid = rd.readerid
+        GROUP BY rd.readerid
+    """,
+    'comic_stats': """
+        INSERT INTO comic_stats (comicid, reviews_total, rating_avg)
+        SELECT c.comicid, COUNT(r.reviewid), AVG(r.rating)
+        FROM comic c LEFT JOIN review r ON r.comicid = c.comicid
+        GROUP BY c.comicid
+    """,
+}
+
+
+def fill_summaries(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.alias != DEFAULT_DB_ALIAS:
+        return
+    tables = set(connection.introspection.table_names())
+    if not all(name in tables for name in BASE_TABLES):
+        return
+    with connection.cursor() as cursor:
+        for table, sql in SUMMARIES.items():
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comics', '0003_hot_column_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -68,6 +68,8 @@ class Comic(models.Model):
     class Meta:
         managed = False
         db_table = 'comic'
+        # Таблиця керується поза Django - індекси створює міграція 0003 через RunPython
+        indexes = [models.Index(fields=['releasedate'], name='comic_releasedate_idx')]
 
     def __str__(self):
         return self.title
@@ -93,6 +95,7 @@ class Review(models.Model):
     class Meta:
         managed = False
         db_table = 'review'
+        indexes = [models.Index(fields=['comic'], name='review_comic_idx')]
     def __str__(self):
         return f"Review for {self.comic.title} by {self.reader.firstname}"
 
@@ -107,6 +110,66 @@ class Borrowing(models.Model):
     class Meta:
         managed = False
         db_table = 'borrowing'
+        indexes = [
+            models.Index(fields=['reader'], name='borrowing_reader_idx'),
+            models.Index(fields=['returndate'], name='borrowing_returndate_idx'),
+        ]
 
     def __str__(self):
         return f"{self.comic.title} borrowed by {self.reader.firstname}"
+
+
+# Попередньо агреговані таблиці для AnalyticsRepository.
+# На відміну від моделей вище, ними керує Django (managed), а наповнює їх comics/summaries.py:
+# інкрементально - після змін Comic/Review/Borrowing, повністю - командою refresh_analytics.
+
+class PublisherStats(models.Model):
+    publisher = models.OneToOneField(Publisher, on_delete=models.DO_NOTHING, primary_key=True,
+                                     db_constraint=False, db_column='publisherid', related_name='stats')
+    total_stock = models.IntegerField(default=0)
+    titles_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'publisher_stats'
+        indexes = [models.Index(fields=['total_stock'], name='publisher_stats_stock_idx')]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(Author, on_delete=models.DO_NOTHING, primary_key=True,
+                                  db_constraint=False, db_column='authorid', related_name='stats')
+    avg_rating = models.FloatField(null=True)
+    review_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'author_stats'
+        indexes = [models.Index(fields=['avg_rating'], name='author_stats_rating_idx')]
+
+
+class GenreStats(models.Model):
+    genre = models.OneToOneField(Genre, on_delete=models.DO_NOTHING, primary_key=True,
+                                 db_constraint=False, db_column='genreid', related_name='stats')
+    borrow_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'genre_stats'
+
+
+class ReaderStats(models.Model):
+    reader = models.OneToOneField(Reader, on_delete=models.DO_NOTHING, primary_key=True,
+                                  db_constraint=False, db_column='readerid', related_name='stats')
+    books_borrowed = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'reader_stats'
+        indexes = [models.Index(fields=['books_borrowed'], name='reader_stats_borrowed_idx')]
+
+
+class ComicStats(models.Model):
+    comic = models.OneToOneField(Comic, on_delete=models.DO_NOTHING, primary_key=True,
+                                 db_constraint=False, db_column='comicid', related_name='stats')
+    reviews_total = models.IntegerField(default=0)
+    rating_avg = models.FloatField(null=True)
+
+    class Meta:
+        db_table = 'comic_stats'
+        indexes = [models.Index(fields=['reviews_total'], name='comic_stats_reviews_idx')]
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    # Курсорна пагінація поверх repo.get_page(); курсор - непрозорий base64 рядок
+    # з pk або, при ?ordering=, JSON-списком значень полів сортування і pk
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'COMICS_API_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'COMICS_API_MAX_PAGE_SIZE', 500)
+        self.page = None
+        self.request = None
+
+    def paginate(self, repo, request, plan=None, spec=None):
+        return self.load(request, lambda **page: repo.get_page(plan=plan, spec=spec, **page))
+
+    def paginate_values(self, repo, request, fields, spec=None):
+        return self.load(request, lambda **page: repo.get_values_page(fields, spec=spec, **page))
+
+    def load(self, request, get_page):
+        self.request = request
+        direction, key = self.decode_cursor(request)
+        limit = self.get_page_size(request)
+        try:
+            if direction == 'b':
+                self.page = get_page(before=key, limit=limit)
+            else:
+                self.page = get_page(after=key, limit=limit)
+        except (DjangoValidationError, TypeError, ValueError):
+            # Курсор не відповідає сортуванню чи типам полів
+            if key is None:
+                raise
+            raise NotFound(self.invalid_cursor_message)
+        return self.page.items
+
+    async def apaginate(self, repo, request, plan=None, spec=None):
+        self.request = request
+        direction, key = self.decode_cursor(request)
+        limit = self.get_page_size(request)
+        try:
+            if direction == 'b':
+                self.page = await repo.aget_page(before=key, limit=limit, plan=plan, spec=spec)
+            else:
+                self.page = await repo.aget_page(after=key, limit=limit, plan=plan, spec=spec)
+        except (DjangoValidationError, TypeError, ValueError):
+            if key is None:
+                raise
+            raise NotFound(self.invalid_cursor_message)
+        return self.page.items
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8')
+            direction, key = decoded.split(':', 1)
+            key = json.loads(key) if key.startswith('[') else int(key)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('a', 'b'):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, key
+
+    def encode_cursor(self, direction, key):
+        if isinstance(key, tuple):
+            key = json.dumps(list(key), cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(f'{direction}:{key}'.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.page.has_next or self.page.last_key is None:
+            return None
+        return self.encode_cursor('a', self.page.last_key)
+
+    def get_previous_link(self):
+        if not self.page.has_previous:
+            return None
+        if self.page.first_key is None:
+            # порожня сторінка після останнього елемента - повертаємось на початок
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor('b', self.page.first_key)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+from importlib.metadata import version
+
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+# plotly.js віддається один раз окремим файлом (з установленого пакета plotly - офлайн, без CDN)
+# за адресою з відбитком вмісту, тож браузер кешує його назавжди; графіки на сторінці - лише
+# компактний JSON фігури, який малює скрипт з того самого файлу.
+# Відбиток - з версії plotly (метадані пакета) і власного скрипта, тож {% plotly_js %} на
+# клієнтських дашбордах не імпортує plotly; сам бандл збирається лише на запиті файлу.
+
+# Шаблони оформлення plotly.py (~6 КБ кожен) теж їдуть у файл: у фігурі лишається тільки ім'я
+BUNDLED_TEMPLATES = ('plotly', 'plotly_white')
+
+_RENDER_SCRIPT = """
+(function () {
+  var templates = %s;
+  function draw(target, figure) {
+    var layout = figure.layout || {};
+    if (typeof layout.template === 'string') {
+      layout.template = templates[layout.template];
+    }
+    return Plotly.react(target, figure.data || [], layout, {responsive: true});
+  }
+  function renderCharts() {
+    document.querySelectorAll('script[data-plotly-figure]').forEach(function (node) {
+      var target = document.createElement('div');
+      target.className = 'plotly-graph-div';
+      node.parentNode.insertBefore(target, node);
+      draw(target, JSON.parse(node.textContent));
+    });
+  }
+  // Для графіків, які будує сама сторінка (дані з /dashboard/data/<графік>/)
+  window.ComicsPlotly = {draw: draw};
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', renderCharts);
+  } else {
+    renderCharts();
+  }
+})();
+"""
+
+# Як json_script у Django: у <script> JSON не може закрити тег чи відкрити коментар
+_JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+@lru_cache(maxsize=None)
+def _templates():
+    import plotly.io as pio
+    return {name: pio.templates[name].to_plotly_json() for name in BUNDLED_TEMPLATES}
+
+
+@lru_cache(maxsize=None)
+def bundle():
+    from plotly.offline import get_plotlyjs
+    templates = json.dumps(_templates(), separators=(',', ':'))
+    return (get_plotlyjs() + _RENDER_SCRIPT % templates).encode()
+
+
+@lru_cache(maxsize=None)
+def gzipped_bundle():
+    return gzip.compress(bundle(), compresslevel=9)
+
+
+@lru_cache(maxsize=None)
+def fingerprint():
+    # Вміст бандла визначають версія plotly (plotly.js і шаблони) та скрипт рендеру
+    source = f'{version("plotly")}\n{BUNDLED_TEMPLATES}\n{_RENDER_SCRIPT}'
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def plotly_js_url():
+    return reverse('plotly-js', kwargs={'fingerprint': fingerprint()})
+
+
+def figure_json(fig):
+    import plotly.io as pio
+    figure = fig.to_plotly_json()
+    layout = figure.setdefault('layout', {})
+    template = layout.get('template')
+    for name, bundled in _templates().items():
+        if template == bundled:
+            layout['template'] = name
+            break
+    return pio.json.to_json_plotly(figure)
+
+
+def chart_html(fig):
+    # Фрагмент графіка для шаблону: JSON фігури в <script type="application/json">
+    data = figure_json(fig).translate(_JSON_SCRIPT_ESCAPES)
+    return format_html('<script type="application/json" data-plotly-figure>{}</script>', mark_safe(data))
@@ -0,0 +1,162 @@
+import pandas as pd
+import plotly.express as px
+
+from .cache import cached_result
+from .models import Author, Borrowing, Comic, ComicAuthor, Genre, Publisher, Reader, Review
+from .plotly_assets import chart_html
+from .repositories import AnalyticsRepository
+
+# Серверні фігури Plotly: дашборд з ?render=server і сторінка бенчмарку.
+# Модуль тягне pandas і plotly.express, тому його імпортують лише view, яким він потрібен,
+# і лише на першому такому запиті (comics/dashboard_views.py).
+
+# Кожен графік - окрема кешована функція від нормалізованих фільтрів, які він використовує;
+# ключ також містить версію даних, тож після змін у БД фрагмент перебудовується
+
+@cached_result('plotly-json:publishers', models=(Publisher, Comic))
+def plotly_publishers_chart(min_stock, sort_by):
+    # Поріг, сортування і LIMIT виконує БД - сюди приходять лише 20 рядків графіка
+    if not AnalyticsRepository.get_top_publishers_by_inventory(limit=1):
+        return "<div>Немає даних для Графіка 1</div>"
+
+    rows1 = AnalyticsRepository.get_top_publishers_by_inventory(min_stock=min_stock, sort_by=sort_by, limit=20)
+    df1 = pd.DataFrame(rows1, columns=['name', 'total_stock'])
+
+    sort_title = {'name': "(за назвою)", 'stock_asc': "(зростання)"}.get(sort_by, "(спадання)")
+
+    fig1 = px.bar(df1, x='name', y='total_stock',
+                  title=f"Видавництва: > {min_stock} книг {sort_title}",
+                  text='total_stock',
+                  labels={'total_stock': 'Кількість', 'name': 'Видавництво'})
+    return chart_html(fig1)
+
+
+@cached_result('plotly-json:authors', models=(Author, Review, ComicAuthor))
+def plotly_authors_chart(min_rating, max_rating):
+    if not AnalyticsRepository.get_highly_rated_authors(limit=1):
+        return "<div>Немає даних для Графіка 2</div>"
+
+    rows2 = AnalyticsRepository.get_highly_rated_authors(min_rating=min_rating, max_rating=max_rating, limit=40)
+    df2 = pd.DataFrame(rows2, columns=['lastname', 'avg_rating', 'review_count'])
+
+    fig2 = px.scatter(df2, x='review_count', y='avg_rating',
+                      size='review_count', hover_name='lastname',
+                      title=f"Автори: Рейтинг {min_rating}-{max_rating} (Топ кращих)",
+                      range_y=[0, 5.5])
+    return chart_html(fig2)
+
+
+@cached_result('plotly-json:release', models=(Comic,))
+def plotly_release_chart():
+    rows3 = AnalyticsRepository.get_comics_release_activity(ascending=True)
+    df3 = pd.DataFrame(rows3, columns=['year', 'total_released'])
+
+    if df3.empty:
+        return "<div>Немає даних для Графіка 3</div>"
+    fig3 = px.line(df3, x='year', y='total_released', markers=True,
+                   title="Загальна динаміка випуску коміксів")
+    return chart_html(fig3)
+
+
+@cached_result('plotly-json:genres', models=(Genre, Comic, Borrowing))
+def plotly_genres_chart():
+    rows4 = AnalyticsRepository.get_popular_genres()
+    df4 = pd.DataFrame(rows4, columns=['genrename', 'borrow_count'])
+    if df4.empty:
+        return None
+
+    fig4 = px.pie(df4, values='borrow_count', names='genrename', title="Частка жанрів у позичаннях")
+    return chart_html(fig4)
+
+
+@cached_result('plotly-json:readers', models=(Reader, Borrowing))
+def plotly_readers_chart():
+    # Топ-20 з БД у спадному порядку; для горизонтального графіка розвертаємо
+    rows5 = AnalyticsRepository.get_active_readers(limit=20)[::-1]
+    df5_top = pd.DataFrame(rows5, columns=['lastname', 'books_borrowed'])
+
+    if df5_top.empty:
+        return None
+
+    fig5 = px.bar(
+        df5_top,
+        x='books_borrowed',
+        y='lastname',
+        orientation='h',
+        title="Топ-20 Активних читачів",
+        text='books_borrowed',
+    )
+    return chart_html(fig5)
+
+
+@cached_result('plotly-json:reviews', models=(Comic, Review))
+def plotly_reviews_chart():
+    rows6 = AnalyticsRepository.get_most_reviewed_comics(limit=20)
+    df6_top = pd.DataFrame(rows6, columns=['title', 'rating_avg', 'reviews_total'])
+
+    if df6_top.empty:
+        return None
+
+    fig6 = px.bar(
+        df6_top,
+        x='title',
+        y='rating_avg',
+        title="Рейтинг популярних коміксів",
+        labels={'rating_avg': 'Рейтинг', 'title': 'Комікс'}
+    )
+    return chart_html(fig6)
+
+
+def plotly_chart_calls(filters):
+    # Шість незалежних графіків: запит + рендер кожного - окрема задача пулу (comics/concurrency.py),
+    # тож час сторінки ~ найповільніший графік, а не сума
+    return [
+        (plotly_publishers_chart, (filters['min_stock'], filters['sort_by'])),
+        (plotly_authors_chart, (filters['min_rating'], filters['max_rating'])),
+        (plotly_release_chart, ()),
+        (plotly_genres_chart, ()),
+        (plotly_readers_chart, ()),
+        (plotly_reviews_chart, ()),
+    ]
+
+
+def benchmark_chart(data, total_requests):
+    df = pd.DataFrame(data)
+
+    # Режими на одному графіку: потоки vs процеси vs asyncio; стиль лінії - спосіб підключення
+    fig = px.line(
+        df,
+        x='workers',
+        y='time',
+        color='mode',
+        line_dash='strategy',
+        markers=True,
+        hover_data=['rps'],
+        title=f"Залежність часу виконання від паралельності ({total_requests} запитів)",
+        labels={'workers': 'Потоків / процесів / корутин', 'time': 'Час виконання (сек)', 'mode': 'Режим',
+                'strategy': 'Підключення', 'rps': 'Запитів/с'}
+    )
+
+    fig.update_layout(
+        xaxis=dict(tickmode='linear'),
+        template="plotly_white"
+    )
+    return chart_html(fig)
+
+
+def suite_chart(results, total_requests):
+    rows = [
+        {'scenario': name, **stats}
+        for name, stats in results['scenarios'].items() if 'skipped' not in stats
+    ]
+    df = pd.DataFrame(rows).melt(
+        id_vars='scenario', value_vars=['p50_ms', 'p95_ms', 'p99_ms'],
+        var_name='percentile', value_name='latency'
+    )
+    fig = px.bar(
+        df, x='scenario', y='latency', color='percentile', barmode='group', log_y=True,
+        title=f"Латентність сценаріїв ({total_requests} запитів на сценарій)",
+        labels={'scenario': 'Сценарій', 'latency': 'Латентність (мс)', 'percentile': 'Перцентиль'}
+    )
+    fig.update_layout(template="plotly_white")
+    return chart_html(fig)
@@ -1,75 +1,211 @@
-from django.db.models import Count, Avg, Sum, F, Q
+from django.db import connections, router
+from django.db.models import Count, Avg, F, Min, Max, StdDev
 from django.db.models.functions import ExtractYear
 from .models import Publisher, Author, Comic, Genre, Reader, Review, Borrowing
+from .models import PublisherStats, AuthorStats, GenreStats, ReaderStats, ComicStats, ComicAuthor
+from .cache import cached_result
 
 
 class AnalyticsRepository:
 
+    REPORT_TABLES = {
+        'authors': Author,
+        'comics': Comic,
+        'readers': Reader,
+        'genres': Genre,
+        'publishers': Publisher,
+        'reviews': Review,
+        'borrowings': Borrowing,
+    }
+
+    @staticmethod
+    def get_table_totals():
+        # Усі COUNT(*) одним запитом: SELECT (SELECT COUNT(*) FROM author), ...
+        # Сирий SQL - на підключенні, яке роутер вибрав би для читання (репліка або primary)
+        tables = AnalyticsRepository.REPORT_TABLES
+        connection = connections[router.db_for_read(Comic)]
+        sql = 'SELECT ' + ', '.join(
+            f'(SELECT COUNT(*) FROM {connection.ops.quote_name(model._meta.db_table)})'
+            for model in tables.values()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            row = cursor.fetchone()
+        return dict(zip(tables, row))
+
+    @staticmethod
+    def get_active_borrowings():
+        rows = Borrowing.objects.filter(returndate__isnull=True).values_list(
+            'borrowid', 'comic__title', 'reader__firstname', 'reader__lastname', 'borrowdate', 'duedate'
+        )
+        return [{
+            'borrowid': borrowid,
+            'comic': title,
+            'reader': f"{firstname} {lastname}",
+            'borrowdate': borrowdate,
+            'duedate': duedate
+        } for borrowid, title, firstname, lastname, borrowdate, duedate in rows]
+
+    # Агрегати читаються з попередньо обчислених таблиць *_stats (див. comics/summaries.py),
+    # тож запит проходить по рядках результату, а не по comic/review/borrowing.
+    # Результати (списки рядків) спільно кешуються для дашбордів і /analytics/*;
+    # ключ містить версії моделей, від яких залежить агрегат.
+
+    PUBLISHER_ORDERING = {
+        'stock_desc': ('-total_stock', 'pk'),
+        'stock_asc': ('total_stock', 'pk'),
+        'name': ('name', 'pk'),
+    }
+
     @staticmethod
-    def get_top_publishers_by_inventory():
-        return Publisher.objects.annotate(
-            total_stock=Sum('comic__availablenumber'),
-            titles_count=Count('comic')
-        ).filter(
+    def _limit(qs, limit):
+        return qs[:limit] if limit else qs
+
+    @staticmethod
+    @cached_result('top_publishers', models=(Publisher, Comic))
+    def get_top_publishers_by_inventory(min_stock=None, sort_by='stock_desc', limit=None):
+        qs = PublisherStats.objects.filter(
             total_stock__gt=50
-        ).order_by('-total_stock')
+        )
+        if min_stock is not None:
+            qs = qs.filter(total_stock__gte=min_stock)
+        qs = qs.annotate(
+            name=F('publisher__name'),
+            country=F('publisher__country')
+        ).order_by(*AnalyticsRepository.PUBLISHER_ORDERING.get(sort_by, ('-total_stock', 'pk')))
+        return list(AnalyticsRepository._limit(qs, limit).values('name', 'country', 'total_stock', 'titles_count'))
 
     @staticmethod
-    def get_highly_rated_authors():
-        return Author.objects.annotate(
-            avg_rating=Avg('comic__review__rating'),
-            review_count=Count('comic__review')
-        ).filter(
+    @cached_result('highly_rated_authors', models=(Author, Review, ComicAuthor))
+    def get_highly_rated_authors(min_rating=None, max_rating=None, limit=None):
+        qs = AuthorStats.objects.filter(
             avg_rating__gt=3,
             review_count__gt=3
-        ).order_by('-avg_rating')
+        )
+        if min_rating is not None:
+            qs = qs.filter(avg_rating__gte=min_rating)
+        if max_rating is not None:
+            qs = qs.filter(avg_rating__lte=max_rating)
+        qs = qs.annotate(
+            firstname=F('author__firstname'),
+            lastname=F('author__lastname')
+        ).order_by('-avg_rating', 'pk')
+        return list(AnalyticsRepository._limit(qs, limit).values('firstname', 'lastname', 'avg_rating', 'review_count'))
 
     @staticmethod
-    def get_comics_release_activity():
-        return Comic.objects.annotate(
+    @cached_result('release_activity', models=(Comic,))
+    def get_comics_release_activity(ascending=False):
+        return list(Comic.objects.annotate(
             year=ExtractYear('releasedate')
         ).values('year').annotate(
             total_released=Count('comicid')
-        ).order_by('-year')
+        ).order_by('year' if ascending else '-year'))
 
     @staticmethod
-    def get_popular_genres():
-        return Genre.objects.annotate(
-            borrow_count=Count('comic__borrowing')
-        ).filter(
+    @cached_result('popular_genres', models=(Genre, Comic, Borrowing))
+    def get_popular_genres(limit=None):
+        qs = GenreStats.objects.filter(
             borrow_count__gt=1000
-        ).order_by('-borrow_count')
+        ).annotate(
+            genrename=F('genre__genrename')
+        ).order_by('-borrow_count', 'pk')
+        return list(AnalyticsRepository._limit(qs, limit).values('genrename', 'borrow_count'))
 
     @staticmethod
-    def get_active_readers():
-        return Reader.objects.filter(
-            isblocked=False
-        ).annotate(
-            books_borrowed=Count('borrowing')
-        ).filter(
+    @cached_result('active_readers', models=(Reader, Borrowing))
+    def get_active_readers(limit=None):
+        qs = ReaderStats.objects.filter(
+            reader__isblocked=False,
             books_borrowed__gt=2
-        ).order_by('-books_borrowed')
+        ).annotate(
+            firstname=F('reader__firstname'),
+            lastname=F('reader__lastname'),
+            email=F('reader__email')
+        ).order_by('-books_borrowed', 'pk')
+        return list(AnalyticsRepository._limit(qs, limit).values('firstname', 'lastname', 'email', 'books_borrowed'))
 
     @staticmethod
-    def get_most_reviewed_comics():
-        return Comic.objects.annotate(
-            reviews_total=Count('review'),
-            rating_avg=Avg('review__rating')
-        ).filter(
+    @cached_result('most_reviewed_comics', models=(Comic, Review))
+    def get_most_reviewed_comics(limit=None):
+        qs = ComicStats.objects.filter(
             reviews_total__gte=1
-        ).order_by('-reviews_total')
+        ).annotate(
+            title=F('comic__title')
+        ).order_by('-reviews_total', 'pk')
+        return list(AnalyticsRepository._limit(qs, limit).values('title', 'reviews_total', 'rating_avg'))
 
+    # --- Описова статистика для /analytics/basic-stats/ ---
+    # SQL-шлях: count/mean/std/min/max агрегатами БД, перцентилі - percentile_cont на PostgreSQL.
+    # Колонковий шлях: стовпці читаються fetchmany-блоками в NumPy і рахуються векторно.
+    # NumPy (comics/columnar.py) імпортується лише тут: звіт і CRUD-воркери його не завантажують.
 
     @staticmethod
-    def get_raw_comic_data():
-        return Comic.objects.select_related('genre', 'publisher').values(
-            'title',
-            'volume',
-            'availablenumber',
-            'genre__genrename',
-            'publisher__name'
+    def _column_describe(model, field):
+        import numpy as np
+        from . import columnar
+
+        column = model._meta.get_field(field).column
+        qs = model.objects.exclude(**{f'{field}__isnull': True})
+        # Агрегати і перцентилі - з однієї й тієї ж БД
+        qs = qs.using(qs.db)
+        connection = connections[qs.db]
+        stats = qs.aggregate(
+            count=Count(field), mean=Avg(field), std=StdDev(field, sample=True),
+            min=Min(field), max=Max(field),
         )
+        if not stats['count']:
+            return None
+
+        if connection.vendor == 'postgresql':
+            quote = connection.ops.quote_name
+            sql = (f'SELECT percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY {quote(column)}) '
+                   f'FROM {quote(model._meta.db_table)} WHERE {quote(column)} IS NOT NULL')
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [list(columnar.PERCENTILES)])
+                quantiles = cursor.fetchone()[0]
+        else:
+            # Без percentile_cont (SQLite) - тягнемо лише один стовпець у масив
+            values = columnar.fetch_columns(qs, {field: float})[field]
+            quantiles = np.quantile(values, columnar.PERCENTILES)
+
+        result = {'count': float(stats['count']), 'mean': float(stats['mean'])}
+        result['std'] = None if stats['std'] is None else float(stats['std'])
+        result['min'] = float(stats['min'])
+        for q, value in zip(columnar.PERCENTILES, quantiles):
+            result[f'{q:.0%}'] = float(value)
+        result['max'] = float(stats['max'])
+        return result
+
+    @staticmethod
+    @cached_result('basic_stats', models=(Comic, Genre, Review))
+    def get_basic_stats():
+        genre_rows = Comic.objects.filter(genre__isnull=False).values('genre__genrename').annotate(
+            Average_Stock=Avg('availablenumber')
+        ).order_by('genre__genrename').values_list('genre__genrename', 'Average_Stock')
+        return {
+            'stock': AnalyticsRepository._column_describe(Comic, 'availablenumber'),
+            'rating': AnalyticsRepository._column_describe(Review, 'rating'),
+            'avg_stock_by_genre': [{'Genre': name, 'Average_Stock': avg} for name, avg in genre_rows],
+        }
 
     @staticmethod
-    def get_raw_review_data():
-        return Review.objects.values('rating', 'comic__title')
+    @cached_result('basic_stats_columnar', models=(Comic, Genre, Review))
+    def get_basic_stats_columnar():
+        import numpy as np
+        from . import columnar
+
+        comics = columnar.fetch_columns(Comic.objects.all(), {'availablenumber': float, 'genre_id': float})
+        ratings = columnar.fetch_columns(Review.objects.all(), {'rating': float})['rating']
+        if not comics['availablenumber'].size or not ratings.size:
+            return {'stock': None, 'rating': None, 'avg_stock_by_genre': []}
+
+        # genre_id може бути NULL -> NaN; такі комікси, як і в groupby, не входять у групи
+        has_genre = ~np.isnan(comics['genre_id'])
+        names = dict(Genre.objects.values_list('pk', 'genrename'))
+        genre_names = np.array([names.get(pk) for pk in comics['genre_id'][has_genre].astype(np.int64)], dtype=object)
+        genres, means = columnar.group_mean(genre_names, comics['availablenumber'][has_genre])
+        return {
+            'stock': columnar.describe(comics['availablenumber']),
+            'rating': columnar.describe(ratings),
+            'avg_stock_by_genre': [{'Genre': name, 'Average_Stock': float(avg)} for name, avg in zip(genres, means)],
+        }
@@ -1,189 +1,402 @@
 # comics/repositoriesdir.py
-from typing import List, Optional
+import copy
+from operator import attrgetter
+from typing import List
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from comics import summaries
+from comics.cache import invalidate_model, invalidate_objects
 from comics.models import Author, Comic, Reader, Genre, Review, Borrowing, ComicAuthor, Publisher
 from .interfaces import (
     IAuthorRepository, IComicRepository, IReaderRepository, IGenreRepository,
-    IReviewRepository, IBorrowingRepository, IComicAuthorRepository, IPublisherRepository
+    IReviewRepository, IBorrowingRepository, IComicAuthorRepository, IPublisherRepository,
+    Page
 )
-
-class DjangoAuthorRepository(IAuthorRepository):
-    def get_by_id(self, id: int) -> Optional[Author]:
+from . import identity_map, reference_cache
+from .filter_spec import FilterSpec
+from .query_plan import QueryPlan
+
+
+class BaseDjangoRepository:
+    # Спільна логіка для всіх Django-репозиторіїв; конкретний клас задає model
+    model = None
+    default_plan = QueryPlan()
+    # Псевдонім БД для читання; None - вирішує роутер (comics/routers.py: репліка або primary)
+    db = None
+
+    def using(self, alias):
+        # Копія репозиторію, що читає з alias, напр. repo.using('default') - свіжі дані з primary.
+        # Запис завжди йде через роутер у primary
+        clone = copy.copy(self)
+        clone.db = alias
+        return clone
+
+    def _objects(self):
+        return self.model.objects.using(self.db)
+
+    def get_queryset(self, plan=None):
+        # План ViewSet-а замінює план репозиторію за замовчуванням
+        return (plan or self.default_plan).apply(self._objects())
+
+    def _normalize_pk(self, id):
+        # '5' з URL і 5 з JSON - один ключ identity map
         try:
-            return Author.objects.get(pk=id)
-        except Author.DoesNotExist:
-            return None
-
-    def get_all(self) -> List[Author]:
-        return list(Author.objects.all())
-
-    def add(self, entity: Author) -> Author:
+            return self.model._meta.pk.to_python(id)
+        except ValidationError:
+            return id
+
+    def _remember(self, obj):
+        # У карту йде і сам об'єкт, і пов'язані, вже завантажені через select_related
+        for field in self.model._meta.concrete_fields:
+            if field.is_relation and field.is_cached(obj):
+                related = field.get_cached_value(obj)
+                if related is not None:
+                    identity_map.put(related)
+        return identity_map.put(obj)
+
+    def get_by_id(self, id):
+        # Повторне читання того ж рядка в межах запиту береться з identity map, без запиту до БД
+        pk = self._normalize_pk(id)
+        obj = identity_map.get(self.model, pk)
+        if obj is None:
+            try:
+                obj = self._remember(self.get_queryset().get(pk=pk))
+            except self.model.DoesNotExist:
+                return None
+        return obj
+
+    def get_all(self):
+        return list(self.get_queryset())
+
+    def add(self, entity):
         entity.save()
-        return entity
+        return identity_map.put(entity)
 
-    def update(self, entity: Author) -> Author:
+    def update(self, entity):
         entity.save()
-        return entity
+        return identity_map.put(entity)
 
-    def delete(self, entity: Author) -> None:
+    def delete(self, entity):
+        pk = entity.pk
         entity.delete()
-
-
-class DjangoComicRepository(IComicRepository):
-    def get_by_id(self, id: int) -> Optional[Comic]:
-        try:
-            return Comic.objects.select_related('publisher', 'genre').get(pk=id)
-        except Comic.DoesNotExist:
-            return None
-
-    def get_all(self) -> List[Comic]:
-        return list(Comic.objects.select_related('publisher', 'genre').all())
-
-    def add(self, entity: Comic) -> Comic:
-        entity.save()
+        identity_map.discard(self.model, [pk])
+
+    def _page_query(self, after, before, limit, plan, spec):
+        # Keyset-пагінація: WHERE ключ > after ORDER BY ключ LIMIT n+1, тож вартість запиту
+        # не залежить від номера сторінки; ключ - поля сортування FilterSpec плюс pk
+        spec = spec or FilterSpec()
+        return self._seek(spec.apply(self.get_queryset(plan)), spec, after, before)[:limit + 1]
+
+    def _seek(self, qs, spec, after, before):
+        if before is not None:
+            qs = spec.seek(qs, self._parse_key(spec, before), backwards=True)
+            return spec.sort(qs, backwards=True)
+        if after is not None:
+            qs = spec.seek(qs, self._parse_key(spec, after))
+        return spec.sort(qs)
+
+    def _parse_key(self, spec, key):
+        # Значення курсора приходять з JSON (дати - рядками) -> типи полів моделі;
+        # невідповідний курсор - ValueError / ValidationError
+        opts = self.model._meta
+        if not spec.ordering:
+            return opts.pk.to_python(key)
+        if not isinstance(key, (list, tuple)) or len(key) != len(spec.keys):
+            raise ValueError('cursor does not match ordering')
+        return tuple((opts.pk if name == 'pk' else opts.get_field(name)).to_python(value)
+                     for (name, _), value in zip(spec.keys, key))
+
+    @staticmethod
+    def _make_page(rows, after, before, limit, key=attrgetter('pk')) -> Page:
+        if before is not None:
+            has_previous = len(rows) > limit
+            items = rows[:limit][::-1]
+            has_next = True
+        else:
+            has_next = len(rows) > limit
+            items = rows[:limit]
+            has_previous = after is not None
+
+        return Page(
+            items=items,
+            has_next=has_next,
+            has_previous=has_previous,
+            first_key=key(items[0]) if items else None,
+            last_key=key(items[-1]) if items else None,
+        )
+
+    @staticmethod
+    def _object_key(spec):
+        spec = spec or FilterSpec()
+        return lambda obj: spec.key_of(lambda name: getattr(obj, name))
+
+    def get_page(self, after=None, before=None, limit=50, plan=None, spec=None) -> Page:
+        rows = list(self._page_query(after, before, limit, plan, spec))
+        return self._make_page(rows, after, before, limit, key=self._object_key(spec))
+
+    def get_values_page(self, fields, after=None, before=None, limit=50, spec=None) -> Page:
+        # Та сама keyset-сторінка, але рядки - словники values() без створення екземплярів моделі
+        spec = spec or FilterSpec()
+        pk = self.model._meta.pk.attname
+        columns = [pk, *fields, *(name for name, _ in spec.keys if name != 'pk')]
+        qs = self._objects().filter(*spec.filters).values(*dict.fromkeys(columns))
+        rows = list(self._seek(qs, spec, after, before)[:limit + 1])
+        return self._make_page(rows, after, before, limit,
+                               key=lambda row: spec.key_of(lambda name: row[pk if name == 'pk' else name]))
+
+    def get_related_ids(self, name, pks):
+        # {pk: [id, ...]} для many-to-many поля одним запитом до проміжної таблиці, id - за зростанням
+        field = self.model._meta.get_field(name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+        related = {pk: [] for pk in pks}
+        rows = through.objects.using(self.db).filter(**{f'{source}__in': pks}).order_by(source, target).values_list(source, target)
+        for pk, related_id in rows:
+            related[pk].append(related_id)
+        return related
+
+    async def aget_page(self, after=None, before=None, limit=50, plan=None, spec=None) -> Page:
+        rows = [obj async for obj in self._page_query(after, before, limit, plan, spec)]
+        return self._make_page(rows, after, before, limit, key=self._object_key(spec))
+
+    async def aget_by_id(self, id, plan=None):
+        pk = self._normalize_pk(id)
+        obj = identity_map.get(self.model, pk) if plan is None else None
+        if obj is None:
+            try:
+                obj = self._remember(await self.get_queryset(plan).aget(pk=pk))
+            except self.model.DoesNotExist:
+                return None
+        return obj
+
+    async def aget_all(self, plan=None):
+        return [obj async for obj in self.get_queryset(plan)]
+
+    def iterate(self, chunk_size=2000, plan=None):
+        # Серверний курсор: рядки читаються порціями, без кешу QuerySet;
+        # prefetch_related з плану виконується окремо для кожної порції
+        return self.get_queryset(plan).order_by('pk').iterator(chunk_size=chunk_size)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'COMICS_BULK_BATCH_SIZE', 500)
+
+    def get_many(self, ids, plan=None):
+        # Один запит WHERE pk IN (...) лише для тих id, яких ще немає в identity map;
+        # порядок результату - як у ids. Об'єкти з іншим планом (prefetch/only) завжди читаються з БД.
+        ids = [self._normalize_pk(pk) for pk in ids]
+        found = {}
+        if plan is None:
+            for pk in ids:
+                obj = identity_map.get(self.model, pk)
+                if obj is not None:
+                    found[pk] = obj
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in found]
+        if missing:
+            loaded = self.get_queryset(plan).in_bulk(missing)
+            for obj in loaded.values():
+                self._remember(obj)
+            found.update(loaded)
+        return [found[pk] for pk in ids if pk in found]
+
+    def add_many(self, entities):
+        with transaction.atomic():
+            created = self.model.objects.bulk_create(entities, batch_size=self.batch_size)
+            # bulk_create не надсилає post_save, тож агрегати і кеш оновлюємо явно
+            summaries.mark_changed(self.model, created)
+        invalidate_model(self.model)
+        for obj in created:
+            identity_map.put(obj)
+        return created
+
+    def update_many(self, entities, fields):
+        with transaction.atomic():
+            previous = summaries.previous_state(self.model, [e.pk for e in entities])
+            self.model.objects.bulk_update(entities, fields, batch_size=self.batch_size)
+            summaries.mark_changed(self.model, [*entities, *previous])
+        invalidate_model(self.model)
+        invalidate_objects(self.model, [e.pk for e in entities])
+        for obj in entities:
+            identity_map.put(obj)
+        return entities
+
+    def delete_many(self, ids):
+        ids = [self._normalize_pk(pk) for pk in ids]
+        with transaction.atomic():
+            deleted, _ = self.model.objects.filter(pk__in=ids).delete()
+        invalidate_model(self.model)
+        invalidate_objects(self.model, ids)
+        identity_map.discard(self.model, ids)
+        return deleted
+
+
+class ReferenceTableMixin:
+    # Для маленьких довідників, що рідко змінюються (Genre, Publisher): читання з in-process
+    # копії таблиці (reference_cache.py) замість запиту; будь-який запис через репозиторій скидає копію
+
+    def _reference_table(self):
+        table = reference_cache.table(self.model)
+        return table if table.usable() else None
+
+    def get_by_id(self, id):
+        pk = self._normalize_pk(id)
+        obj = identity_map.get(self.model, pk)
+        if obj is not None:
+            return obj
+        table = self._reference_table()
+        obj = table.get(pk) if table is not None else None
+        if obj is None:
+            return super().get_by_id(pk)
+        return identity_map.put(obj)
+
+    def get_all(self):
+        table = self._reference_table()
+        if table is None:
+            return super().get_all()
+        return table.all()
+
+    def get_many(self, ids, plan=None):
+        table = self._reference_table()
+        if table is None or plan is not None:
+            return super().get_many(ids, plan)
+        ids = [self._normalize_pk(pk) for pk in ids]
+        found = {}
+        for pk in dict.fromkeys(ids):
+            obj = identity_map.get(self.model, pk)
+            if obj is None:
+                obj = table.get(pk)
+                if obj is not None:
+                    obj = identity_map.put(obj)
+            if obj is not None:
+                found[pk] = obj
+        # Рядки, яких ще немає в копії таблиці (додані іншим процесом) - одним in_bulk
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in found]
+        if missing:
+            found.update((obj.pk, obj) for obj in super().get_many(missing))
+        return [found[pk] for pk in ids if pk in found]
+
+    def _reset_reference_table(self):
+        reference_cache.table(self.model).reset()
+
+    def add(self, entity):
+        entity = super().add(entity)
+        self._reset_reference_table()
         return entity
 
-    def update(self, entity: Comic) -> Comic:
-        entity.save()
+    def update(self, entity):
+        entity = super().update(entity)
+        self._reset_reference_table()
         return entity
 
-    def delete(self, entity: Comic) -> None:
-        entity.delete()
-
-
-class DjangoReaderRepository(IReaderRepository):
-    def get_by_id(self, id: int) -> Optional[Reader]:
-        try:
-            return Reader.objects.get(pk=id)
-        except Reader.DoesNotExist:
-            return None
+    def delete(self, entity):
+        super().delete(entity)
+        self._reset_reference_table()
 
-    def get_all(self) -> List[Reader]:
-        return list(Reader.objects.all())
+    def add_many(self, entities):
+        created = super().add_many(entities)
+        self._reset_reference_table()
+        return created
 
-    def add(self, entity: Reader) -> Reader:
-        entity.save()
-        return entity
+    def update_many(self, entities, fields):
+        entities = super().update_many(entities, fields)
+        self._reset_reference_table()
+        return entities
 
-    def update(self, entity: Reader) -> Reader:
-        entity.save()
-        return entity
+    def delete_many(self, ids):
+        deleted = super().delete_many(ids)
+        self._reset_reference_table()
+        return deleted
 
-    def delete(self, entity: Reader) -> None:
-        entity.delete()
 
+class DjangoAuthorRepository(BaseDjangoRepository, IAuthorRepository):
+    model = Author
 
-class DjangoGenreRepository(IGenreRepository):
-    def get_by_id(self, id: int) -> Optional[Genre]:
-        try:
-            return Genre.objects.get(pk=id)
-        except Genre.DoesNotExist:
-            return None
 
-    def get_all(self) -> List[Genre]:
-        return list(Genre.objects.all())
+class DjangoComicRepository(BaseDjangoRepository, IComicRepository):
+    model = Comic
+    default_plan = QueryPlan(select_related=('publisher', 'genre'))
 
-    def add(self, entity: Genre) -> Genre:
-        entity.save()
-        return entity
+    def attach_references(self, comics):
+        # publisher/genre з in-process довідників замість JOIN або запиту на кожен комікс
+        publishers = {p.pk: p for p in DjangoPublisherRepository().get_all()}
+        genres = {g.pk: g for g in DjangoGenreRepository().get_all()}
+        for comic in comics:
+            if comic.publisher_id in publishers:
+                comic.publisher = publishers[comic.publisher_id]
+            if comic.genre_id in genres:
+                comic.genre = genres[comic.genre_id]
+        return comics
 
-    def update(self, entity: Genre) -> Genre:
-        entity.save()
-        return entity
 
-    def delete(self, entity: Genre) -> None:
-        entity.delete()
+class DjangoReaderRepository(BaseDjangoRepository, IReaderRepository):
+    model = Reader
 
 
-class DjangoReviewRepository(IReviewRepository):
-    def get_by_id(self, id: int) -> Optional[Review]:
-        try:
-            return Review.objects.get(pk=id)
-        except Review.DoesNotExist:
-            return None
+class DjangoGenreRepository(ReferenceTableMixin, BaseDjangoRepository, IGenreRepository):
+    model = Genre
 
-    def get_all(self) -> List[Review]:
-        return list(Review.objects.all())
 
-    def add(self, entity: Review) -> Review:
-        entity.save()
-        return entity
+class DjangoReviewRepository(BaseDjangoRepository, IReviewRepository):
+    model = Review
 
-    def update(self, entity: Review) -> Review:
-        entity.save()
-        return entity
 
-    def delete(self, entity: Review) -> None:
-        entity.delete()
+class DjangoBorrowingRepository(BaseDjangoRepository, IBorrowingRepository):
+    model = Borrowing
 
 
-class DjangoBorrowingRepository(IBorrowingRepository):
-    def get_by_id(self, id: int) -> Optional[Borrowing]:
-        try:
-            return Borrowing.objects.get(pk=id)
-        except Borrowing.DoesNotExist:
-            return None
-
-    def get_all(self) -> List[Borrowing]:
-        return list(Borrowing.objects.all())
-
-    def add(self, entity: Borrowing) -> Borrowing:
-        entity.save()
-        return entity
-
-    def update(self, entity: Borrowing) -> Borrowing:
-        entity.save()
-        return entity
-
-    def delete(self, entity: Borrowing) -> None:
-        entity.delete()
-
-
-class DjangoComicAuthorRepository(IComicAuthorRepository):
-    def get_by_id(self, id: int) -> Optional[ComicAuthor]:
-        try:
-            return ComicAuthor.objects.get(pk=id)
-        except ComicAuthor.DoesNotExist:
-            return None
-
-    def get_all(self) -> List[ComicAuthor]:
-        return list(ComicAuthor.objects.all())
-
-    def add(self, entity: ComicAuthor) -> ComicAuthor:
-        entity.save()
-        return entity
-
-    def update(self, entity: ComicAuthor) -> ComicAuthor:
-        entity.save()
-        return entity
-
-    def delete(self, entity: ComicAuthor) -> None:
-        entity.delete()
+class DjangoComicAuthorRepository(BaseDjangoRepository, IComicAuthorRepository):
+    model = ComicAuthor
 
     # Додаткові зручні методи
     def delete_by_comic(self, comic: Comic) -> None:
         ComicAuthor.objects.filter(comic=comic).delete()
 
     def get_authors_for_comic(self, comic: Comic) -> List[ComicAuthor]:
-        return list(ComicAuthor.objects.filter(comic=comic))
-
-
-class DjangoPublisherRepository(IPublisherRepository):
-    def get_by_id(self, id: int) -> Optional[Publisher]:
-        try:
-            return Publisher.objects.get(pk=id)
-        except Publisher.DoesNotExist:
-            return None
-
-    def get_all(self) -> List[Publisher]:
-        return list(Publisher.objects.all())
-
-    def add(self, entity: Publisher) -> Publisher:
-        entity.save()
-        return entity
-
-    def update(self, entity: Publisher) -> Publisher:
-        entity.save()
-        return entity
-
-    def delete(self, entity: Publisher) -> None:
-        entity.delete()
+        return list(self._objects().filter(comic=comic))
+
+    def set_authors(self, comic_authors: dict) -> None:
+        # {comic: [author, ...]} -> зберігаємо лише різницю з тим, що вже є в БД:
+        # один SELECT, один DELETE і один bulk INSERT на весь пакет коміксів
+        if not comic_authors:
+            return
+        wanted = {(comic.pk, author.pk) for comic, authors in comic_authors.items() for author in authors}
+        with transaction.atomic():
+            # Поточний стан - у транзакції, тобто з primary: різниця з відсталої репліки зламала б запис
+            existing = set(ComicAuthor.objects.filter(
+                comic_id__in=[comic.pk for comic in comic_authors]
+            ).values_list('comic_id', 'author_id'))
+
+            to_delete = existing - wanted
+            to_add = wanted - existing
+            if to_delete:
+                condition = Q()
+                for comic_id, author_id in to_delete:
+                    condition |= Q(comic_id=comic_id, author_id=author_id)
+                ComicAuthor.objects.filter(condition).delete()
+            if to_add:
+                created = ComicAuthor.objects.bulk_create(
+                    [ComicAuthor(comic_id=comic_id, author_id=author_id) for comic_id, author_id in sorted(to_add)],
+                    batch_size=self.batch_size,
+                )
+                summaries.mark_changed(ComicAuthor, created)
+        if to_add:
+            invalidate_model(ComicAuthor)
+
+
+class DjangoPublisherRepository(ReferenceTableMixin, BaseDjangoRepository, IPublisherRepository):
+    model = Publisher
+
+
+# Один екземпляр на модель - для полів серіалізаторів і форм, що резолвлять FK через репозиторії
+REPOSITORIES = {repo.model: repo for repo in (
+    DjangoAuthorRepository(), DjangoComicRepository(), DjangoReaderRepository(), DjangoGenreRepository(),
+    DjangoReviewRepository(), DjangoBorrowingRepository(), DjangoComicAuthorRepository(),
+    DjangoPublisherRepository(),
+)}
+
+
+def repository_for(model):
+    return REPOSITORIES.get(model)
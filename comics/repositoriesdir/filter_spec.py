@@ -0,0 +1,60 @@
+from django.db.models import Q
+
+
+class FilterSpec:
+    # Декларативний опис вибірки для list: умови WHERE (Q), порядок і набір полів.
+    # Як і QueryPlan, репозиторій застосовує його до свого QuerySet; pk завжди додається
+    # останнім ключем сортування, тож порядок однозначний і придатний для keyset-курсора.
+
+    def __init__(self, filters=(), ordering=(), fields=()):
+        self.filters = tuple(filters)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(fields)
+
+    @property
+    def order_by(self):
+        return (*self.ordering, 'pk')
+
+    @property
+    def keys(self):
+        # [(поле, за спаданням?), ...] - складові курсора
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.order_by]
+
+    def apply(self, queryset):
+        if self.filters:
+            queryset = queryset.filter(*self.filters)
+        if self.fields:
+            # Поля сортування потрібні для курсора - без них був би дозапит на кожен об'єкт
+            queryset = queryset.only(*dict.fromkeys([*self.fields, *(name for name, _ in self.keys)]))
+        return queryset
+
+    def key_of(self, get):
+        # Курсор без сортування - просто pk (сумісно з попередніми курсорами), інакше кортеж значень;
+        # get(name) читає значення з об'єкта чи рядка values()
+        if not self.ordering:
+            return get('pk')
+        return tuple(get(name) for name, _ in self.keys)
+
+    def seek(self, queryset, key, backwards=False):
+        # Keyset-умова "після key" для складного порядку:
+        # (a > x) OR (a = x AND b > y) OR ... ; для спадання і руху назад знаки міняються
+        keys = self.keys
+        values = (key,) if not self.ordering else key
+        if len(values) != len(keys):
+            raise ValueError('cursor does not match ordering')
+
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(keys, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return queryset.filter(condition)
+
+    def sort(self, queryset, backwards=False):
+        if not backwards:
+            return queryset.order_by(*self.order_by)
+        return queryset.order_by(*(name[1:] if name.startswith('-') else f'-{name}' for name in self.order_by))
+
+    def __repr__(self):
+        return f"FilterSpec(filters={self.filters!r}, ordering={self.ordering!r}, fields={self.fields!r})"
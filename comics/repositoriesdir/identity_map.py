@@ -0,0 +1,40 @@
+import contextvars
+from contextlib import contextmanager
+
+# Identity map у межах одного HTTP-запиту: (модель, pk) -> завантажений екземпляр.
+# Поза scope() (shell, management-команди) карта вимкнена і репозиторії завжди читають з БД.
+_current = contextvars.ContextVar('comics_identity_map', default=None)
+
+
+@contextmanager
+def scope():
+    token = _current.set({})
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def active():
+    return _current.get() is not None
+
+
+def get(model, pk):
+    entities = _current.get()
+    if entities is None:
+        return None
+    return entities.get((model, pk))
+
+
+def put(obj):
+    entities = _current.get()
+    if entities is not None and obj.pk is not None:
+        entities[(type(obj), obj.pk)] = obj
+    return obj
+
+
+def discard(model, pks):
+    entities = _current.get()
+    if entities is not None:
+        for pk in pks:
+            entities.pop((model, pk), None)
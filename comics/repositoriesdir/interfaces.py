@@ -1,10 +1,23 @@
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, List, Optional
+from dataclasses import dataclass
+from typing import Any, Generic, Iterable, Iterator, TypeVar, List, Optional
 from comics.models import Author, Comic, Reader, Review, Publisher, ComicAuthor, Borrowing, Genre
 
 T = TypeVar('T')
 
+
+@dataclass
+class Page(Generic[T]):
+    # Одна сторінка keyset-пагінації: межі сторінки - ключі першого/останнього елемента
+    # (pk або кортеж полів сортування FilterSpec разом із pk)
+    items: List[T]
+    has_next: bool
+    has_previous: bool
+    first_key: Optional[Any] = None
+    last_key: Optional[Any] = None
+
+
 class IRepository(ABC, Generic[T]):
     @abstractmethod
     def get_by_id(self, id: int) -> Optional[T]:
@@ -14,6 +27,39 @@ class IRepository(ABC, Generic[T]):
     def get_all(self) -> List[T]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_page(self, after: Optional[Any] = None, before: Optional[Any] = None,
+                 limit: int = 50, plan: Optional[Any] = None, spec: Optional[Any] = None) -> Page[T]:
+        raise NotImplementedError
+
+    # Швидке читання для list-відповідей: словники полів замість екземплярів моделі
+    @abstractmethod
+    def get_values_page(self, fields: List[str], after: Optional[Any] = None, before: Optional[Any] = None,
+                        limit: int = 50, spec: Optional[Any] = None) -> Page[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_related_ids(self, name: str, pks: Iterable[Any]) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iterate(self, chunk_size: int = 2000, plan: Optional[Any] = None) -> Iterator[T]:
+        raise NotImplementedError
+
+    # Асинхронне читання для ASGI-view (async ORM, без блокування event loop)
+    @abstractmethod
+    async def aget_by_id(self, id: int, plan: Optional[Any] = None) -> Optional[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aget_all(self, plan: Optional[Any] = None) -> List[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aget_page(self, after: Optional[Any] = None, before: Optional[Any] = None,
+                        limit: int = 50, plan: Optional[Any] = None, spec: Optional[Any] = None) -> Page[T]:
+        raise NotImplementedError
+
     @abstractmethod
     def add(self, entity: T) -> T:
         raise NotImplementedError
@@ -27,6 +73,23 @@ class IRepository(ABC, Generic[T]):
     def delete(self, entity: T) -> None:
         raise NotImplementedError
 
+    # Пакетні операції: один запит (або кілька батчів) в одній транзакції
+    @abstractmethod
+    def get_many(self, ids: Iterable[Any]) -> List[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_many(self, entities: List[T]) -> List[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_many(self, entities: List[T], fields: List[str]) -> List[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_many(self, ids: Iterable[Any]) -> int:
+        raise NotImplementedError
+
 
 class IAuthorRepository(IRepository[Author]):
     pass
@@ -0,0 +1,33 @@
+class QueryPlan:
+    # Декларативний опис того, як завантажувати сутності для конкретного ViewSet:
+    # які FK приєднати JOIN-ом, які M2M/зворотні зв'язки підтягнути окремим запитом
+    # і які поля читати. Репозиторій застосовує його до свого QuerySet.
+
+    def __init__(self, select_related=(), prefetch_related=(), only=()):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+    def for_fields(self, names):
+        # Лише зв'язки, потрібні вибраним полям (?fields=): решту JOIN/prefetch не виконуємо
+        def root(lookup):
+            return getattr(lookup, 'prefetch_to', lookup).split('__')[0]
+
+        return QueryPlan(
+            select_related=[lookup for lookup in self.select_related if root(lookup) in names],
+            prefetch_related=[lookup for lookup in self.prefetch_related if root(lookup) in names],
+            only=self.only,
+        )
+
+    def __repr__(self):
+        return (f"QueryPlan(select_related={self.select_related!r}, "
+                f"prefetch_related={self.prefetch_related!r}, only={self.only!r})")
@@ -0,0 +1,61 @@
+import copy
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connection
+
+from comics.cache import data_version
+
+
+class ReferenceTable:
+    # Уся невелика таблиця-довідник у пам'яті процесу. Актуальність перевіряється за версією моделі
+    # у спільному кеші (comics/cache.py): збереження/видалення в будь-якому процесі збільшує версію
+    # після коміту, і наступне звернення перечитує таблицю одним запитом.
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        # (версія, рядки) одним атрибутом: читач бере знімок одним присвоєнням і не побачить
+        # нову версію зі старими рядками чи порожню таблицю від паралельного reset()
+        self._snapshot = (None, {})
+
+    def usable(self):
+        # Усередині транзакції таблицю не читаємо і не наповнюємо: у ній можуть бути
+        # незакомічені зміни, які не повинні потрапити в кеш інших запитів
+        return not connection.in_atomic_block
+
+    def rows(self):
+        version = data_version(self.model)
+        snapshot = self._snapshot
+        if snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot[0] != version:
+                    # З primary: копія живе до наступної зміни версії, і відставання репліки
+                    # в момент перечитування лишилося б у ній надовго
+                    rows = {obj.pk: obj for obj in self.model.objects.using(DEFAULT_DB_ALIAS).order_by('pk')}
+                    snapshot = self._snapshot = (version, rows)
+        return snapshot[1]
+
+    def get(self, pk):
+        # Копія, щоб зміни атрибутів в одному запиті не побачили інші потоки
+        obj = self.rows().get(pk)
+        return copy.copy(obj) if obj is not None else None
+
+    def all(self):
+        return [copy.copy(obj) for obj in self.rows().values()]
+
+    def reset(self):
+        # Новий знімок замість очищення словника: читачі дочитують свій старий
+        with self._lock:
+            self._snapshot = (None, {})
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def table(model):
+    with _tables_lock:
+        if model not in _tables:
+            _tables[model] = ReferenceTable(model)
+        return _tables[model]
@@ -0,0 +1,79 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Читання - з реплік (settings.COMICS_DB_REPLICAS), запис - лише в primary ('default').
+# Read-your-writes: після першого запису поточний HTTP-запит читає з primary, а через cookie
+# (ReadYourWritesMiddleware) - і наступні запити того ж клієнта протягом COMICS_READ_YOUR_WRITES_SECONDS.
+# Стан - об'єкт у contextvar, як метрики запиту: переходить у sync_to_async і в потоки
+# concurrency.run_parallel, а позначка про запис з такого потоку видна всьому запиту.
+
+
+class RoutingState:
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        # Одна репліка на весь запит: повторне читання не повернеться в минуле через іншу репліку
+        self.replica = None
+
+
+_state = contextvars.ContextVar('comics_db_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'COMICS_DB_REPLICAS', [])
+
+
+@contextmanager
+def request_scope(pinned=False):
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_to_primary():
+    state = _state.get()
+    if state is None:
+        # Поза запитом (shell, management-команди) - до кінця поточного контексту
+        state = RoutingState()
+        _state.set(state)
+    state.pinned = state.wrote = True
+
+
+def read_alias():
+    state = _state.get()
+    # Усередині транзакції читаємо те саме підключення, що й пишемо
+    if (state is not None and state.pinned) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    choices = replicas()
+    if not choices:
+        return DEFAULT_DB_ALIAS
+    if state is None:
+        return random.choice(choices)
+    if state.replica is None:
+        state.replica = random.choice(choices)
+    return state.replica
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary і репліки - копії однієї бази
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
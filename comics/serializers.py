@@ -1,7 +1,9 @@
 
 import datetime
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
 from .models import *
 from comics.repositoriesdir.django_repositories import *
 
@@ -14,11 +16,103 @@ borrowing_repo = DjangoBorrowingRepository()
 comicauthor_repo = DjangoComicAuthorRepository()
 publisher_repo = DjangoPublisherRepository()
 
+class RepoManyRelatedField(ManyRelatedField):
+    # authors=[1, 2, 3] -> один repo.get_many() замість queryset.get() на кожен id
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        repo = child.get_repo()
+        if repo is None:
+            return super().to_internal_value(data)
+
+        pks = [child.to_pk(item) for item in data]
+        found = {obj.pk: obj for obj in repo.get_many(pks)}
+        for pk in pks:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class RepoPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # PrimaryKeyRelatedField, що читає об'єкт через репозиторій (identity map) замість queryset.get()
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return RepoManyRelatedField(**list_kwargs)
+
+    def get_repo(self):
+        queryset = self.get_queryset()
+        # Відфільтрований queryset (limit_choices_to тощо) - лише через стандартну перевірку
+        if queryset.query.has_filters():
+            return None
+        # Повтори в межах запиту йдуть з identity map, довідники (Genre, Publisher) - з пам'яті процесу
+        return repository_for(queryset.model)
+
+    def to_pk(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_internal_value(self, data):
+        repo = self.get_repo()
+        if repo is None or self.pk_field is not None:
+            return super().to_internal_value(data)
+        obj = repo.get_by_id(self.to_pk(data))
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    # many=True + save() -> один bulk_create замість create() для кожного елемента
+    def create(self, validated_data):
+        return self.child.create_many(validated_data)
+
+
+class RepoSerializerMixin:
+    repo = None
+    serializer_related_field = RepoPrimaryKeyRelatedField
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # fields=[...] - sparse fieldset для ?fields=: решта полів прибирається з відповіді
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def create_many(self, validated_data):
+        objs = [self.Meta.model(**item) for item in validated_data]
+        return self.repo.add_many(objs)
+
+    def update_many(self, instances, validated_data):
+        fields = set()
+        for instance, data in zip(instances, validated_data):
+            for k, v in data.items():
+                setattr(instance, k, v)
+            fields.update(data)
+        if fields:
+            self.repo.update_many(instances, sorted(fields))
+        return instances
+
+
+class GenreSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = genre_repo
 
-class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         genre = Genre(**validated_data)
@@ -30,10 +124,13 @@ class GenreSerializer(serializers.ModelSerializer):
         return genre_repo.update(instance)
 
 
-class PublisherSerializer(serializers.ModelSerializer):
+class PublisherSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = publisher_repo
+
     class Meta:
         model = Publisher
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         p = Publisher(**validated_data)
@@ -45,10 +142,13 @@ class PublisherSerializer(serializers.ModelSerializer):
         return publisher_repo.update(instance)
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = author_repo
+
     class Meta:
         model = Author
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         a = Author(**validated_data)
@@ -60,10 +160,13 @@ class AuthorSerializer(serializers.ModelSerializer):
         return author_repo.update(instance)
 
 
-class ReaderSerializer(serializers.ModelSerializer):
+class ReaderSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = reader_repo
+
     class Meta:
         model = Reader
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         r = Reader(**validated_data)
@@ -75,32 +178,36 @@ class ReaderSerializer(serializers.ModelSerializer):
         return reader_repo.update(instance)
 
 
-class ComicAuthorSerializer(serializers.ModelSerializer):
+class ComicAuthorSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = comicauthor_repo
+
     class Meta:
         model = ComicAuthor
         fields = ['comic', 'author']
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         ca = ComicAuthor(**validated_data)
         return comicauthor_repo.add(ca)
 
 
-class ComicSerializer(serializers.ModelSerializer):
-    authors = serializers.PrimaryKeyRelatedField(many=True, queryset=Author.objects.all())
+class ComicSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = comic_repo
+    authors = RepoPrimaryKeyRelatedField(many=True, queryset=Author.objects.all())
 
 
     class Meta:
         model = Comic
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         authors = validated_data.pop('authors', [])
         comic = Comic(**validated_data)
         comic = comic_repo.add(comic)
 
-        for author in authors:
-            ca = ComicAuthor(comic=comic, author=author)
-            comicauthor_repo.add(ca)
+        if authors:
+            comicauthor_repo.set_authors({comic: authors})
         return comic
 
     def update(self, instance, validated_data):
@@ -110,17 +217,29 @@ class ComicSerializer(serializers.ModelSerializer):
         instance = comic_repo.update(instance)
 
         if authors is not None:
-            comicauthor_repo.delete_by_comic(instance)
-            for author in authors:
-                ca = ComicAuthor(comic=instance, author=author)
-                comicauthor_repo.add(ca)
+            comicauthor_repo.set_authors({instance: authors})
         return instance
 
+    def create_many(self, validated_data):
+        authors = [item.pop('authors', []) for item in validated_data]
+        comics = comic_repo.add_many([Comic(**item) for item in validated_data])
+        comicauthor_repo.set_authors({comic: a for comic, a in zip(comics, authors) if a})
+        return comics
+
+    def update_many(self, instances, validated_data):
+        authors = [item.pop('authors', None) for item in validated_data]
+        instances = super().update_many(instances, validated_data)
+        comicauthor_repo.set_authors({comic: a for comic, a in zip(instances, authors) if a is not None})
+        return instances
+
+
+class ReviewSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = review_repo
 
-class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         r = Review(**validated_data)
@@ -132,10 +251,13 @@ class ReviewSerializer(serializers.ModelSerializer):
         return review_repo.update(instance)
 
 
-class BorrowingSerializer(serializers.ModelSerializer):
+class BorrowingSerializer(RepoSerializerMixin, serializers.ModelSerializer):
+    repo = borrowing_repo
+
     class Meta:
         model = Borrowing
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
     def create(self, validated_data):
         b = Borrowing(**validated_data)
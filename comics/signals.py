@@ -0,0 +1,41 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from . import summaries
+from .cache import invalidate_model, invalidate_objects
+from .models import Author, Comic, Reader, Genre, Publisher, Review, Borrowing, ComicAuthor
+
+TRACKED_MODELS = (Author, Comic, Reader, Genre, Publisher, Review, Borrowing, ComicAuthor)
+
+
+def _before_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._summary_previous = summaries.previous_state(sender, [instance.pk])
+
+
+def _after_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = instance.__dict__.pop('_summary_previous', [])
+        summaries.mark_changed(sender, [instance, *previous])
+
+
+def _after_delete(sender, instance, **kwargs):
+    summaries.mark_changed(sender, [instance])
+
+
+def _on_change(sender, instance, raw=False, **kwargs):
+    invalidate_model(sender)
+    # Версія рядка - для ETag і кешу відповіді retrieve
+    if not raw:
+        invalidate_objects(sender, [instance.pk])
+
+
+# Порядок важливий: перерахунок агрегатів реєструється в on_commit раніше,
+# ніж збільшення версії кешу, тож кеш не встигне закешувати старі агрегати
+for _model in TRACKED_MODELS:
+    pre_save.connect(_before_save, sender=_model, dispatch_uid=f'comics-summary-pre-{_model.__name__}')
+    post_save.connect(_after_save, sender=_model, dispatch_uid=f'comics-summary-save-{_model.__name__}')
+    post_delete.connect(_after_delete, sender=_model, dispatch_uid=f'comics-summary-delete-{_model.__name__}')
+
+for _model in TRACKED_MODELS:
+    post_save.connect(_on_change, sender=_model, dispatch_uid=f'comics-invalidate-save-{_model.__name__}')
+    post_delete.connect(_on_change, sender=_model, dispatch_uid=f'comics-invalidate-delete-{_model.__name__}')
@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Avg, Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Author, Comic, ComicAuthor, Genre, Publisher, Reader, Review, Borrowing,
+    AuthorStats, ComicStats, GenreStats, PublisherStats, ReaderStats,
+)
+
+CHUNK_SIZE = 2000
+
+
+def _replace(stats_model, key, ids, rows, build):
+    # Перераховані рядки замінюють старі: DELETE по ключах + пакетний INSERT
+    with transaction.atomic():
+        old = stats_model.objects.all()
+        if ids is not None:
+            old = old.filter(**{f'{key}__in': ids})
+        old.delete()
+
+        batch = []
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            batch.append(build(*row))
+            if len(batch) >= CHUNK_SIZE:
+                stats_model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            stats_model.objects.bulk_create(batch)
+
+
+def _restrict(qs, ids):
+    return qs if ids is None else qs.filter(pk__in=ids)
+
+
+def refresh_publisher_stats(ids=None):
+    rows = _restrict(Publisher.objects, ids).annotate(
+        total_stock=Coalesce(Sum('comic__availablenumber'), Value(0)),
+        titles_count=Count('comic'),
+    ).values_list('pk', 'total_stock', 'titles_count')
+    _replace(PublisherStats, 'publisher_id', ids, rows,
+             lambda pk, stock, titles: PublisherStats(publisher_id=pk, total_stock=stock, titles_count=titles))
+
+
+def refresh_author_stats(ids=None):
+    rows = _restrict(Author.objects, ids).annotate(
+        avg_rating=Avg('comic__review__rating'),
+        review_count=Count('comic__review'),
+    ).values_list('pk', 'avg_rating', 'review_count')
+    _replace(AuthorStats, 'author_id', ids, rows,
+             lambda pk, rating, reviews: AuthorStats(author_id=pk, avg_rating=rating, review_count=reviews))
+
+
+def refresh_genre_stats(ids=None):
+    rows = _restrict(Genre.objects, ids).annotate(
+        borrow_count=Count('comic__borrowing'),
+    ).values_list('pk', 'borrow_count')
+    _replace(GenreStats, 'genre_id', ids, rows,
+             lambda pk, borrows: GenreStats(genre_id=pk, borrow_count=borrows))
+
+
+def refresh_reader_stats(ids=None):
+    rows = _restrict(Reader.objects, ids).annotate(
+        books_borrowed=Count('borrowing'),
+    ).values_list('pk', 'books_borrowed')
+    _replace(ReaderStats, 'reader_id', ids, rows,
+             lambda pk, borrowed: ReaderStats(reader_id=pk, books_borrowed=borrowed))
+
+
+def refresh_comic_stats(ids=None):
+    rows = _restrict(Comic.objects, ids).annotate(
+        reviews_total=Count('review'),
+        rating_avg=Avg('review__rating'),
+    ).values_list('pk', 'reviews_total', 'rating_avg')
+    _replace(ComicStats, 'comic_id', ids, rows,
+             lambda pk, reviews, rating: ComicStats(comic_id=pk, reviews_total=reviews, rating_avg=rating))
+
+
+REFRESHERS = {
+    'publishers': refresh_publisher_stats,
+    'authors': refresh_author_stats,
+    'genres': refresh_genre_stats,
+    'readers': refresh_reader_stats,
+    'comics': refresh_comic_stats,
+}
+
+
+def refresh_all(kinds=None):
+    for kind in kinds or REFRESHERS:
+        REFRESHERS[kind]()
+
+
+# Які агрегати зачіпає зміна рядка. 'comic_genres'/'comic_authors' - id коміксів,
+# жанр і авторів яких треба дочитати з БД перед перерахунком.
+DEPENDENCIES = {
+    Comic: lambda o: {'publishers': o.publisher_id, 'genres': o.genre_id, 'comics': o.pk},
+    Review: lambda o: {'comics': o.comic_id, 'comic_authors': o.comic_id},
+    Borrowing: lambda o: {'readers': o.reader_id, 'comic_genres': o.comic_id},
+    ComicAuthor: lambda o: {'authors': o.author_id},
+    Publisher: lambda o: {'publishers': o.pk},
+    Author: lambda o: {'authors': o.pk},
+    Genre: lambda o: {'genres': o.pk},
+    Reader: lambda o: {'readers': o.pk},
+}
+FK_FIELDS = {
+    Comic: ('pk', 'publisher_id', 'genre_id'),
+    Review: ('pk', 'comic_id'),
+    Borrowing: ('pk', 'reader_id', 'comic_id'),
+    ComicAuthor: ('pk', 'author_id'),
+}
+
+_local = threading.local()
+
+
+class _Batch:
+    # Ключі, зачеплені в одній транзакції; перерахунок - колбеком on_commit, один раз
+    def __init__(self):
+        self.keys = defaultdict(set)
+        self.done = False
+
+    def __call__(self):
+        if not self.done:
+            self.done = True
+            flush(self.keys)
+
+
+def _batch():
+    # Пакет живий, поки його колбек стоїть у черзі on_commit. Після відкату Django викидає
+    # колбеки відкоченого блоку - і ключі відкоченої транзакції не потраплять у наступний перерахунок
+    batch = getattr(_local, 'batch', None)
+    queued = transaction.get_connection().run_on_commit
+    if batch is None or batch.done or not any(entry[1] is batch for entry in reversed(queued)):
+        batch = _local.batch = _Batch()
+    return batch
+
+
+def mark_changed(model, instances):
+    # Запам'ятовуємо зачеплені ключі; перерахунок - один раз після коміту транзакції
+    dependencies = DEPENDENCIES.get(model)
+    if dependencies is None:
+        return
+    batch = _batch()
+    for instance in instances:
+        for kind, key in dependencies(instance).items():
+            if key is not None:
+                batch.keys[kind].add(key)
+    transaction.on_commit(batch)
+
+
+def previous_state(model, pks):
+    # Старі значення FK до UPDATE (наприклад, комікс перейшов до іншого видавництва);
+    # їх передають у mark_changed разом з новими вже після запису
+    fields = FK_FIELDS.get(model)
+    pks = [pk for pk in pks if pk is not None]
+    if fields is None or not pks:
+        return []
+    return [model(**dict(zip(fields, row)))
+            for row in model.objects.filter(pk__in=pks).values_list(*fields)]
+
+
+def flush(pending):
+    comic_ids = pending.pop('comic_genres', set())
+    if comic_ids:
+        pending['genres'].update(
+            Comic.objects.filter(pk__in=comic_ids, genre__isnull=False).values_list('genre_id', flat=True)
+        )
+    comic_ids = pending.pop('comic_authors', set())
+    if comic_ids:
+        pending['authors'].update(
+            ComicAuthor.objects.filter(comic_id__in=comic_ids).values_list('author_id', flat=True)
+        )
+
+    for kind, ids in pending.items():
+        if ids:
+            REFRESHERS[kind](sorted(ids))
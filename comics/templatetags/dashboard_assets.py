@@ -0,0 +1,12 @@
+from django import template
+from django.utils.html import format_html
+
+from ..plotly_assets import plotly_js_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def plotly_js():
+    # Один <script> на сторінку; defer - графіки малюються після розбору документа
+    return format_html('<script src="{}" defer></script>', plotly_js_url())
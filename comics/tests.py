@@ -1,3 +1,952 @@
-from django.test import TestCase
+import datetime
+import itertools
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.db.utils import ConnectionDoesNotExist
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Author, Comic, ComicAuthor, Genre, Publisher, Reader, Review, Borrowing
+from .models import AuthorStats, ComicStats, PublisherStats
+from . import concurrency, summaries
+from .cache import bump_version, cached_result, may_be_stale
+from .benchmark import DatabaseBenchmark, compare_results, measure_startup
+from .metrics import RequestMetrics, pool_stats, render_pool_stats
+from .middleware import ReadYourWritesMiddleware
+from .routers import ReplicaRouter, read_alias, request_scope
+from .fast_serialization import build_plan
+from .forms import ComicForm
+from .repositoriesdir import identity_map
+from .repositoriesdir.django_repositories import (
+    DjangoAuthorRepository, DjangoComicAuthorRepository, DjangoComicRepository, DjangoGenreRepository,
+    DjangoPublisherRepository,
+)
+from .repositoriesdir.reference_cache import ReferenceTable
+from .repositories import AnalyticsRepository
+
+
+class UnmanagedModelsTestCase(TestCase):
+    # Моделі застосунку managed = False, тож тестова БД їх не створює - робимо це вручну
+
+    @classmethod
+    def unmanaged_models(cls):
+        return [m for m in apps.get_app_config('comics').get_models() if not m._meta.managed]
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in cls.unmanaged_models():
+                editor.create_model(model)
+        super().setUpClass()
+
+    def setUp(self):
+        # Версії даних і кешовані відповіді API не переходять з тесту в тест
+        for cache in caches.all():
+            cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.unmanaged_models()):
+                editor.delete_model(model)
+
+
+class QueryCountAssertionsMixin:
+    # Хелпер для перевірки відсутності N+1: кількість запитів list-ендпоінта
+    # має бути однаковою незалежно від кількості рядків у таблиці
+
+    def count_queries(self, url):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueryCount(self, url, make_rows, small=2, large=10):
+        # on_commit виконується, тож версія даних зростає і відповідь будується заново
+        with self.captureOnCommitCallbacks(execute=True):
+            make_rows(small)
+        queries_small = self.count_queries(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_rows(large - small)
+        queries_large = self.count_queries(url)
+        self.assertEqual(
+            queries_small, queries_large,
+            f"{url}: {queries_small} queries for {small} rows, {queries_large} for {large}"
+        )
+
+
+class ListEndpointQueryCountTests(QueryCountAssertionsMixin, UnmanagedModelsTestCase):
+    _counter = itertools.count()
+
+    def make_comic(self):
+        n = next(self._counter)
+        publisher = Publisher.objects.create(name=f'Publisher {n}', country='UA', foundedyear=2000)
+        genre = Genre.objects.create(genrename=f'Genre {n}')
+        comic = Comic.objects.create(
+            title=f'Comic {n}', volume=1, releasedate=datetime.date(2020, 1, 1),
+            availablenumber=5, publisher=publisher, genre=genre,
+        )
+        for i in range(2):
+            author = Author.objects.create(firstname=f'Name {n}', lastname=f'Last {i}', country='UA')
+            ComicAuthor.objects.create(comic=comic, author=author)
+        return comic
+
+    def make_reader(self):
+        n = next(self._counter)
+        return Reader.objects.create(firstname='Reader', lastname=str(n), email=f'reader{n}@example.com')
+
+    def make_review(self):
+        return Review.objects.create(comic=self.make_comic(), reader=self.make_reader(), rating=4)
+
+    def make_borrowing(self):
+        return Borrowing.objects.create(
+            comic=self.make_comic(), reader=self.make_reader(), duedate=datetime.date(2030, 1, 1),
+        )
+
+    def rows(self, factory):
+        def make_rows(count):
+            for _ in range(count):
+                factory()
+        return make_rows
+
+    def test_list_endpoints_have_constant_query_count(self):
+        factories = {
+            '/api/comics/': self.make_comic,
+            '/api/genres/': self.make_comic,
+            '/api/publishers/': self.make_comic,
+            '/api/authors/': self.make_comic,
+            '/api/comicauthor/': self.make_comic,
+            '/api/readers/': self.make_reader,
+            '/api/reviews/': self.make_review,
+            '/api/borrowings/': self.make_borrowing,
+        }
+        for url, factory in factories.items():
+            with self.subTest(url=url):
+                self.assertConstantQueryCount(url, self.rows(factory))
+
+
+class BasicStatsTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        genres = [Genre.objects.create(genrename=f'Genre {i}') for i in range(3)]
+        reader = Reader.objects.create(firstname='Reader', lastname='One', email='reader@example.com')
+        for i in range(12):
+            comic = Comic.objects.create(
+                title=f'Comic {i}', volume=1, releasedate=datetime.date(2020, 1, 1),
+                availablenumber=i * 7 % 11, publisher=publisher, genre=genres[i % 3] if i % 4 else None,
+            )
+            Review.objects.create(comic=comic, reader=reader, rating=i % 5 + 1)
+
+    def test_sql_and_columnar_paths_agree(self):
+        sql = AnalyticsRepository.get_basic_stats.uncached()
+        vectorized = AnalyticsRepository.get_basic_stats_columnar.uncached()
+
+        for key in ('stock', 'rating'):
+            self.assertEqual(sql[key].keys(), vectorized[key].keys())
+            for stat, value in sql[key].items():
+                self.assertAlmostEqual(value, vectorized[key][stat], msg=f'{key}.{stat}')
+        self.assertEqual(
+            [row['Genre'] for row in sql['avg_stock_by_genre']],
+            [row['Genre'] for row in vectorized['avg_stock_by_genre']],
+        )
+        for expected, actual in zip(sql['avg_stock_by_genre'], vectorized['avg_stock_by_genre']):
+            self.assertAlmostEqual(expected['Average_Stock'], actual['Average_Stock'])
+
+
+class AnalyticsCacheTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+
+    def add_comic(self, year):
+        with self.captureOnCommitCallbacks(execute=True):
+            Comic.objects.create(title=f'Comic {year}', volume=1, releasedate=datetime.date(year, 1, 1),
+                                 availablenumber=1, publisher=self.publisher)
+
+    def test_results_are_cached_per_parameters_until_a_write(self):
+        self.add_comic(2001)
+        with self.assertNumQueries(1):
+            descending = AnalyticsRepository.get_comics_release_activity()
+        with self.assertNumQueries(0):
+            self.assertEqual(AnalyticsRepository.get_comics_release_activity(), descending)
+
+        # Інші параметри - окремий запис кешу
+        with self.assertNumQueries(1):
+            AnalyticsRepository.get_comics_release_activity(ascending=True)
+        with self.assertNumQueries(0):
+            AnalyticsRepository.get_comics_release_activity(ascending=True)
+            self.assertEqual(AnalyticsRepository.get_comics_release_activity(), descending)
+
+        # Запис у Comic збільшує версію - наступне читання йде в БД
+        self.add_comic(2002)
+        with self.assertNumQueries(1):
+            self.assertEqual(AnalyticsRepository.get_comics_release_activity(),
+                             [{'year': 2002, 'total_released': 1}, {'year': 2001, 'total_released': 1}])
+
+
+class AggregatedReportTests(UnmanagedModelsTestCase):
+
+    def borrow(self, comic, reader, returned=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Borrowing.objects.create(comic=comic, reader=reader, borrowdate=datetime.date(2024, 1, 1),
+                                            duedate=datetime.date(2024, 2, 1), returndate=returned)
+
+    def test_report_takes_two_queries_and_follows_writes(self):
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        comic = Comic.objects.create(title='Comic', volume=1, releasedate=datetime.date(2020, 1, 1),
+                                     availablenumber=3, publisher=publisher)
+        reader = Reader.objects.create(firstname='Reader', lastname='One', email='one@example.com')
+        open_borrowing = self.borrow(comic, reader)
+        self.borrow(comic, reader, returned=datetime.date(2024, 1, 10))
+        client = APIClient()
+        client.force_authenticate(User(username='viewer'))
+
+        # Усі COUNT(*) - одним запитом, активні видачі - другим; повтор - з кешу
+        with self.assertNumQueries(2):
+            report = client.get('/report/aggregated/').json()
+        self.assertEqual(report['totals'], {'authors': 0, 'comics': 1, 'readers': 1, 'genres': 0,
+                                            'publishers': 1, 'reviews': 0, 'borrowings': 2})
+        self.assertEqual(report['active_borrowings'], [{
+            'borrowid': open_borrowing.pk, 'comic': 'Comic', 'reader': 'Reader One',
+            'borrowdate': '2024-01-01', 'duedate': '2024-02-01',
+        }])
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/report/aggregated/').json(), report)
+
+        self.borrow(comic, reader)
+        with self.assertNumQueries(2):
+            report = client.get('/report/aggregated/').json()
+        self.assertEqual(report['totals']['borrowings'], 3)
+        self.assertEqual(len(report['active_borrowings']), 2)
+
+
+class SummaryMaintenanceTests(UnmanagedModelsTestCase):
+    # Сигнали -> previous_state -> mark_changed -> перерахунок *_stats після коміту
+
+    def make_comic(self, publisher, stock=60):
+        return Comic.objects.create(
+            title='Comic', volume=1, releasedate=datetime.date(2020, 1, 1),
+            availablenumber=stock, publisher=publisher,
+        )
+
+    def test_comic_moving_to_another_publisher_updates_both(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old, new = (Publisher.objects.create(name=name, country='UA', foundedyear=2000) for name in 'AB')
+            comic = self.make_comic(old)
+        self.assertEqual(PublisherStats.objects.get(publisher=old).total_stock, 60)
+
+        comic.publisher = new
+        with self.captureOnCommitCallbacks(execute=True):
+            comic.save()
+        stats = {row.publisher_id: (row.total_stock, row.titles_count) for row in PublisherStats.objects.all()}
+        self.assertEqual(stats, {old.pk: (0, 0), new.pk: (60, 1)})
+
+    def test_review_delete_updates_comic_and_author_stats(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            comic = self.make_comic(Publisher.objects.create(name='A', country='UA', foundedyear=2000))
+            author = Author.objects.create(firstname='Name', lastname='Last', country='UA')
+            ComicAuthor.objects.create(comic=comic, author=author)
+            reader = Reader.objects.create(firstname='Reader', lastname='One', email='one@example.com')
+            reviews = [Review.objects.create(comic=comic, reader=reader, rating=rating) for rating in (4, 2)]
+        self.assertEqual(ComicStats.objects.get(comic=comic).reviews_total, 2)
+        self.assertEqual(AuthorStats.objects.get(author=author).avg_rating, 3.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reviews[1].delete()
+        stats = ComicStats.objects.get(comic=comic)
+        self.assertEqual((stats.reviews_total, stats.rating_avg), (1, 4.0))
+        self.assertEqual(AuthorStats.objects.get(author=author).review_count, 1)
+
+    def test_rolled_back_changes_are_not_refreshed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kept, rolled_back = (Publisher.objects.create(name=name, country='UA', foundedyear=2000)
+                                 for name in 'AB')
+
+        refresh = mock.Mock()
+        with mock.patch.dict(summaries.REFRESHERS, {'publishers': refresh}):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                summaries.mark_changed(Publisher, [rolled_back])
+                raise RuntimeError
+            with self.captureOnCommitCallbacks(execute=True):
+                summaries.mark_changed(Publisher, [kept])
+        refresh.assert_called_once_with([kept.pk])
+
+
+class BenchmarkBaselineTests(TestCase):
+
+    def results(self, p95, queries):
+        return {'scenarios': {
+            'api-list': {'p95_ms': p95, 'queries_per_request': queries},
+            'api-retrieve': {'skipped': 'no data for comic_id'},
+        }}
+
+    def test_compare_results_flags_latency_and_query_regressions(self):
+        baseline = self.results(10.0, 2)
+        self.assertEqual(compare_results(self.results(11.0, 2), baseline, tolerance=0.2), [])
+        self.assertEqual(len(compare_results(self.results(13.0, 2), baseline, tolerance=0.2)), 1)
+        self.assertEqual(len(compare_results(self.results(10.0, 3), baseline, tolerance=0.2)), 1)
+
+    def test_worker_startup_does_not_import_analytics_libraries(self):
+        # Свіжий процес: django.setup(), URLconf, шаблони - без numpy / pandas / plotly / bokeh;
+        # перші запити клієнтських дашбордів (тег {% plotly_js %}, адреси BokehJS) - так само
+        startup = measure_startup(runs=1)
+        self.assertEqual(startup['heavy_modules'], [])
+        self.assertEqual(startup['client_dashboard_heavy_modules'], [])
+
+        baseline = {'scenarios': {}, 'startup': {**startup, 'heavy_modules': []}}
+        current = {'scenarios': {}, 'startup': {**startup, 'heavy_modules': ['pandas']}}
+        self.assertEqual(compare_results(current, baseline), ['startup: pandas is now imported at worker start'])
+
+    def test_only_staff_can_start_a_benchmark_run(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('viewer'))
+        self.assertEqual(client.get('/benchmark/').status_code, 200)
+        self.assertEqual(client.post('/benchmark/', {'kind': 'suite', 'total_requests': 10}).status_code, 403)
+
+    def test_connection_strategies(self):
+        unpooled = DatabaseBenchmark.strategy_settings('unpooled')
+        persistent = DatabaseBenchmark.strategy_settings('persistent')
+        pooled = DatabaseBenchmark.strategy_settings('pool')
+        self.assertEqual(unpooled['CONN_MAX_AGE'], 0)
+        self.assertNotIn('pool', unpooled['OPTIONS'])
+        self.assertNotEqual(persistent['CONN_MAX_AGE'], 0)
+        self.assertTrue(persistent['CONN_HEALTH_CHECKS'])
+        # Django з пулом вимагає CONN_MAX_AGE=0
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 32)
+
+
+class DatabaseBenchmarkModeTests(UnmanagedModelsTestCase):
+
+    def test_thread_and_asyncio_modes_run_on_sqlite(self):
+        # Бенчмарк підключається через власний тимчасовий псевдонім (копія 'default');
+        # у databases його не оголосиш заздалегідь - його ще немає в DATABASES
+        databases = {*self.databases, 'benchmark-persistent'}
+        with mock.patch('builtins.print'), mock.patch.object(type(self), 'databases', databases):
+            data = DatabaseBenchmark.run_benchmark(total_requests=6, max_workers_list=[1, 2],
+                                                   modes=('thread', 'asyncio'), strategies=('persistent', 'pool'))
+        # pool - лише PostgreSQL, на SQLite пропускається
+        self.assertEqual(list(zip(data['mode'], data['strategy'], data['workers'])), [
+            ('thread', 'persistent', 1), ('thread', 'persistent', 2),
+            ('asyncio', 'persistent', 1), ('asyncio', 'persistent', 2),
+        ])
+        self.assertTrue(all(rps > 0 for rps in data['rps']))
+
+    def test_process_mode_is_not_started_from_the_web_page(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        with mock.patch.object(DatabaseBenchmark, 'run_benchmark') as run, \
+                mock.patch('comics.plotly_charts.benchmark_chart', return_value=''):
+            client.post('/benchmark/', {'modes': ['process', 'asyncio'], 'total_requests': 10})
+        self.assertEqual(run.call_args.kwargs['modes'], ['asyncio'])
+
+
+class RequestMetricsTests(UnmanagedModelsTestCase):
+
+    def test_server_timing_reports_queries(self):
+        response = APIClient().get('/api/genres/', HTTP_ACCEPT='application/json')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_only_slow_requests_are_logged_above_debug(self):
+        with self.assertLogs('comics.metrics', 'DEBUG') as logs:
+            APIClient().get('/api/genres/', HTTP_ACCEPT='application/json')
+        self.assertEqual([record.levelname for record in logs.records], ['DEBUG'])
+
+        with override_settings(COMICS_METRICS_SLOW_REQUEST_MS=0), self.assertLogs('comics.metrics', 'DEBUG') as logs:
+            APIClient().get('/api/genres/', HTTP_ACCEPT='application/json')
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'])
+
+    def test_repeated_queries_are_reported_as_n_plus_one(self):
+        request_metrics = RequestMetrics()
+        for pk in range(6):
+            request_metrics.record_query('SELECT * FROM "author" WHERE "authorid" = %s', 0.001)
+        request_metrics.record_query('SELECT * FROM "comic" WHERE "comicid" IN (%s, %s)', 0.001)
+        request_metrics.record_query('SELECT * FROM "comic" WHERE "comicid" IN (%s, %s, %s)', 0.001)
+
+        self.assertEqual(request_metrics.queries, 8)
+        self.assertEqual(request_metrics.repeated_queries(), [('SELECT * FROM "author" WHERE "authorid" = %s', 6)])
+        self.assertEqual(request_metrics.signatures['SELECT * FROM "comic" WHERE "comicid" IN (...)'], 2)
+
+    def test_pool_stats_are_rendered_per_alias(self):
+        # SQLite без пулу - порожньо; з пулом - gauge заповненості і лічильники очікування
+        self.assertEqual(pool_stats(), {})
+        text = render_pool_stats({'default': {'pool_size': 4, 'pool_available': 1, 'requests_wait_ms': 25}})
+        self.assertIn('comics_db_pool_size{alias="default"} 4', text)
+        self.assertIn('comics_db_pool_available{alias="default"} 1', text)
+        self.assertIn('comics_db_pool_requests_wait_ms_total{alias="default"} 25', text)
+        self.assertIn('comics_db_pool_requests_waiting{alias="default"} 0', text)
+
+    def test_pool_stats_do_not_open_pools(self):
+        class Wrapper:
+            _connection_pools = {}
+
+            @property
+            def pool(self):
+                raise AssertionError('scrape opened a pool')
+
+        with mock.patch('comics.metrics.connections', {'default': Wrapper(), 'replica': Wrapper()}):
+            self.assertEqual(pool_stats(), {})
+            Wrapper._connection_pools['default'] = mock.Mock(closed=False, get_stats=lambda: {'pool_size': 2})
+            self.assertEqual(pool_stats(), {'default': {'pool_size': 2}})
+
+
+class RunParallelTests(SimpleTestCase):
+
+    def setUp(self):
+        # Пул створюється один раз на процес з COMICS_DASHBOARD_CONCURRENCY - тут свій на кожен тест
+        patcher = mock.patch.object(concurrency, '_pool', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: concurrency._pool and concurrency._pool.shutdown())
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+
+    def work(self, value, delay):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(delay)
+        with self.lock:
+            self.active -= 1
+        return value, threading.current_thread().name
+
+    @override_settings(COMICS_DASHBOARD_CONCURRENCY=2)
+    def test_workers_are_capped_and_results_keep_order(self):
+        # Перші виклики - найповільніші, тож завершуються останніми
+        calls = [(self.work, (i, 0.05 - i * 0.008)) for i in range(6)]
+        results = concurrency.run_parallel(calls)
+        self.assertEqual([value for value, _ in results], list(range(6)))
+        self.assertEqual(self.peak, 2)
+        self.assertTrue(all(name.startswith('comics-db') for _, name in results))
+
+    def test_runs_sequentially_inside_a_transaction(self):
+        with mock.patch.object(concurrency, 'connection', mock.Mock(in_atomic_block=True)):
+            results = concurrency.run_parallel([(self.work, (i, 0.01)) for i in range(3)])
+        self.assertEqual(results, [(i, threading.current_thread().name) for i in range(3)])
+        self.assertEqual(self.peak, 1)
+        self.assertIsNone(concurrency._pool)
+
+
+class AsyncEndpointTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        genre = Genre.objects.create(genrename='Genre')
+        for i in range(3):
+            comic = Comic.objects.create(
+                title=f'Comic {i}', volume=1, releasedate=datetime.date(2020, 1, 1),
+                availablenumber=5, publisher=publisher, genre=genre,
+            )
+            author = Author.objects.create(firstname='Name', lastname=f'Last {i}', country='UA')
+            ComicAuthor.objects.create(comic=comic, author=author)
+
+    def test_async_list_and_retrieve_match_sync(self):
+        client = APIClient()
+        comic = Comic.objects.first()
+        for sync_url, async_url in [
+            ('/api/comics/', '/async/api/comics/'),
+            (f'/api/comics/{comic.pk}/', f'/async/api/comics/{comic.pk}/'),
+            ('/api/genres/', '/async/api/genres/'),
+        ]:
+            with self.subTest(url=async_url):
+                expected = client.get(sync_url, HTTP_ACCEPT='application/json')
+                actual = client.get(async_url)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.content, expected.content)
+
+    def test_async_analytics_requires_authentication(self):
+        self.assertEqual(APIClient().get('/async/analytics/publishers/').status_code, 401)
+
+
+class IdentityMapTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authors = [Author.objects.create(firstname='Name', lastname=str(i), country='UA') for i in range(3)]
+        self.repo = DjangoAuthorRepository()
+
+    def test_repeated_lookups_in_scope_hit_the_map(self):
+        with identity_map.scope():
+            with CaptureQueriesContext(connection) as ctx:
+                first = self.repo.get_by_id(str(self.authors[0].pk))
+                again = self.repo.get_by_id(self.authors[0].pk)
+                many = self.repo.get_many([a.pk for a in self.authors])
+            self.assertIs(first, again)
+            self.assertIs(many[0], first)
+            # один SELECT для get_by_id і один IN (...) лише для двох відсутніх у карті авторів
+            self.assertEqual(len(ctx.captured_queries), 2)
+
+        with self.assertNumQueries(1):
+            self.repo.get_by_id(self.authors[0].pk)
+
+    def test_deleted_entities_leave_the_map(self):
+        with identity_map.scope():
+            author = self.repo.get_by_id(self.authors[0].pk)
+            self.repo.delete(author)
+            self.assertIsNone(self.repo.get_by_id(self.authors[0].pk))
+
+
+class ReferenceCacheTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.publishers = [Publisher.objects.create(name=f'P{i}', country='UA', foundedyear=2000) for i in range(3)]
+        self.genre = Genre.objects.create(genrename='Drama')
+        self.repo = DjangoPublisherRepository()
+        # TestCase тримає відкриту транзакцію, у якій довідник свідомо не використовується
+        patcher = mock.patch.object(ReferenceTable, 'usable', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ReferenceTable(Publisher).reset)
+
+    def test_form_choices_and_lookups_come_from_memory(self):
+        self.repo.get_all()
+        DjangoGenreRepository().get_all()
+        with CaptureQueriesContext(connection) as ctx:
+            html = ComicForm().as_p()
+            form = ComicForm(data={'publisher': self.publishers[1].pk, 'genre': self.genre.pk})
+            form.is_valid()
+        # Запит лишається тільки для authors - це не довідник
+        tables = [q['sql'] for q in ctx.captured_queries if '"publisher"' in q['sql'] or '"genre"' in q['sql']]
+        self.assertEqual(tables, [])
+        self.assertIn('P2', html)
+        self.assertNotIn('publisher', form.errors)
+        self.assertEqual(form.cleaned_data['publisher'].name, 'P1')
+
+    def test_form_saves_references_checked_by_the_repository(self):
+        self.repo.get_all()
+        DjangoGenreRepository().get_all()
+        author = Author.objects.create(firstname='Name', lastname='Last', country='UA')
+        form = ComicForm(data={'title': 'X', 'volume': 1, 'releasedate': '2020-01-01', 'availablenumber': 2,
+                               'publisher': self.publishers[2].pk, 'genre': self.genre.pk, 'authors': [author.pk]})
+        self.assertEqual(list(form.fields)[4:6], ['publisher', 'genre'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse([q for q in ctx.captured_queries if '"publisher"' in q['sql'] or '"genre"' in q['sql']])
+
+        comic = form.save()
+        self.assertEqual((comic.publisher_id, comic.genre_id), (self.publishers[2].pk, self.genre.pk))
+        edit = ComicForm(instance=comic)
+        self.assertEqual((edit.initial['publisher'], edit.initial['genre']), (self.publishers[2].pk, self.genre.pk))
+        self.assertFalse(ComicForm(data={**form.data, 'publisher': 0}).is_valid())
+
+    def test_rows_missing_from_the_table_are_loaded_in_one_query(self):
+        self.repo.get_all()
+        # Додані в обхід репозиторію (інший процес) - копія таблиці про них не знає
+        added = [Publisher.objects.create(name=f'N{i}', country='UA', foundedyear=2020) for i in range(2)]
+        ids = [added[1].pk, self.publishers[0].pk, added[0].pk, 0]
+        with self.assertNumQueries(1):
+            self.assertEqual([p.name for p in self.repo.get_many(ids)], ['N1', 'P0', 'N0'])
+
+    def test_repository_writes_invalidate(self):
+        self.assertEqual(self.repo.get_by_id(self.publishers[0].pk).name, 'P0')
+        publisher = Publisher.objects.get(pk=self.publishers[0].pk)
+        publisher.name = 'Renamed'
+        self.repo.update(publisher)
+        self.assertEqual(self.repo.get_by_id(self.publishers[0].pk).name, 'Renamed')
+        self.repo.add(Publisher(name='New', country='UA', foundedyear=2020))
+        self.assertEqual(len(self.repo.get_all()), 4)
+
+
+class ConditionalGetTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        self.comics = [Comic.objects.create(
+            title=f'Comic {i}', volume=1, releasedate=datetime.date(2020, 1, 1),
+            availablenumber=5, publisher=publisher,
+        ) for i in range(2)]
+        self.client = APIClient()
+
+    def get(self, url, etag=None):
+        extra = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, HTTP_ACCEPT='application/json', **extra)
+
+    def update_stock(self, comic, value):
+        comic.availablenumber = value
+        with self.captureOnCommitCallbacks(execute=True):
+            DjangoComicRepository().update(comic)
+
+    def test_unchanged_resources_answer_304_without_queries(self):
+        for url in (f'/api/comics/{self.comics[0].pk}/', '/api/comics/'):
+            etag = self.get(url)['ETag']
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get(url, etag).status_code, 304)
+                # без If-None-Match - дані з кешу, теж без запитів
+                self.assertEqual(self.get(url)['ETag'], etag)
+
+    def test_repository_update_changes_only_that_objects_etag(self):
+        detail, other = (f'/api/comics/{comic.pk}/' for comic in self.comics)
+        etags = {url: self.get(url)['ETag'] for url in (detail, other, '/api/comics/')}
+
+        self.update_stock(self.comics[0], 1)
+
+        response = self.get(detail, etags[detail])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['availablenumber'], 1)
+        self.assertEqual(self.get(other, etags[other]).status_code, 304)
+        self.assertEqual(self.get('/api/comics/', etags['/api/comics/']).status_code, 200)
+
+
+class ExportTests(UnmanagedModelsTestCase):
+
+    def test_export_requires_authentication(self):
+        Reader.objects.create(firstname='Name', lastname='Last', email='reader@example.com')
+        client = APIClient()
+        self.assertEqual(client.get('/api/readers/export/').status_code, 401)
+
+        client.force_authenticate(User.objects.create_user('exporter'))
+        response = client.get('/api/readers/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'reader@example.com', b''.join(response.streaming_content))
+
+
+class BulkEndpointTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        self.authors = [Author.objects.create(firstname='Name', lastname=f'Last {i}', country='UA')
+                        for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('editor'))
+
+    def comic_payload(self, title, authors):
+        return {'title': title, 'volume': 1, 'releasedate': '2020-01-01', 'availablenumber': 5,
+                'publisher': self.publisher.pk, 'authors': [author.pk for author in authors]}
+
+    def create_comics(self):
+        response = self.client.post('/api/comics/bulk/', [
+            self.comic_payload('First', self.authors[:2]),
+            self.comic_payload('Second', []),
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        return [item['comicid'] for item in response.json()]
+
+    def test_bulk_create_update_and_delete(self):
+        first, second = self.create_comics()
+        self.assertEqual(sorted(ComicAuthor.objects.filter(comic_id=first).values_list('author_id', flat=True)),
+                         [author.pk for author in self.authors[:2]])
+
+        response = self.client.patch('/api/comics/bulk/', [
+            {'comicid': first, 'availablenumber': 0, 'authors': [self.authors[2].pk]},
+            {'comicid': second, 'availablenumber': 7},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(Comic.objects.values_list('pk', 'availablenumber')), {first: 0, second: 7})
+        self.assertEqual(list(ComicAuthor.objects.filter(comic_id=first).values_list('author_id', flat=True)),
+                         [self.authors[2].pk])
+
+        response = self.client.delete('/api/comics/bulk/', [first, second], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Comic.objects.exists())
+
+    def test_bulk_update_rejects_duplicate_ids(self):
+        first, _ = self.create_comics()
+        response = self.client.patch('/api/comics/bulk/', [
+            {'comicid': first, 'availablenumber': 1},
+            {'comicid': first, 'availablenumber': 2},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['duplicates'], [first])
+        self.assertEqual(Comic.objects.get(pk=first).availablenumber, 5)
+
+    def test_bulk_delete_of_referenced_rows_is_a_conflict(self):
+        first, _ = self.create_comics()
+        # На SQLite FK перевіряються лише при коміті, тож порушення імітуємо
+        with mock.patch.object(DjangoComicRepository, 'delete_many',
+                               side_effect=IntegrityError('violates foreign key constraint')):
+            response = self.client.delete('/api/comics/bulk/', [first], format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Comic.objects.filter(pk=first).exists())
+
+    def test_set_authors_writes_only_the_difference(self):
+        first, _ = self.create_comics()
+        comic = Comic.objects.get(pk=first)
+        kept = ComicAuthor.objects.get(comic=comic, author=self.authors[1]).pk
+        repo = DjangoComicAuthorRepository()
+
+        repo.set_authors({comic: self.authors[1:]})
+        self.assertEqual(sorted(ComicAuthor.objects.filter(comic=comic).values_list('author_id', flat=True)),
+                         [author.pk for author in self.authors[1:]])
+        # Незмінний зв'язок не перестворюється
+        self.assertEqual(ComicAuthor.objects.get(comic=comic, author=self.authors[1]).pk, kept)
+
+        with CaptureQueriesContext(connection) as queries:
+            repo.set_authors({comic: self.authors[1:]})
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+
+class FastListSerializationTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        publisher = Publisher.objects.create(name='Видавець\u2028', country='UA', foundedyear=2000)
+        genre = Genre.objects.create(genrename='Genre')
+        reader = Reader.objects.create(firstname='R', lastname='"quoted"', email='r@example.com',
+                                       joindate=datetime.date(2021, 5, 1), isblocked=False)
+        authors = [Author.objects.create(firstname='A', lastname=str(i), country='UA') for i in range(3)]
+        for i in range(4):
+            comic = Comic.objects.create(
+                title=f'Комікс {i}', volume=i, releasedate=datetime.date(2020, 1, i + 1),
+                availablenumber=i, publisher=publisher, genre=genre if i % 2 else None,
+            )
+            # Порядок вставки не збігається з порядком id авторів
+            for author in reversed(authors[:i]):
+                ComicAuthor.objects.create(comic=comic, author=author)
+            Review.objects.create(comic=comic, reader=reader, rating=i, comment=f'ok {i}',
+                                  reviewdate=datetime.date(2022, 1, 1))
+            Borrowing.objects.create(comic=comic, reader=reader, borrowdate=datetime.date(2023, 1, 1),
+                                     duedate=datetime.date(2023, 2, 1),
+                                     returndate=datetime.date(2023, 1, 15) if i % 2 else None)
+
+    def test_all_serializers_have_a_fast_plan(self):
+        from . import serializers
+        for name in ('Genre', 'Publisher', 'Author', 'Reader', 'ComicAuthor', 'Comic', 'Review', 'Borrowing'):
+            self.assertIsNotNone(build_plan(getattr(serializers, f'{name}Serializer')), name)
+
+    def test_fast_list_is_byte_identical_to_serializer(self):
+        from .views import ComicViewSet, ReviewViewSet, BorrowingViewSet
+        client = APIClient()
+        for viewset, url in ((ComicViewSet, '/api/comics/'), (ReviewViewSet, '/api/reviews/'),
+                             (BorrowingViewSet, '/api/borrowings/')):
+            with self.subTest(url=url):
+                first_page = f'{url}?page_size=3'
+                fast = client.get(first_page, HTTP_ACCEPT='application/json')
+                next_page = fast.json()['next']
+                fast_next = client.get(next_page, HTTP_ACCEPT='application/json')
+                for cache in caches.all():
+                    cache.clear()
+                with mock.patch.object(viewset, 'fast_list', False):
+                    slow = client.get(first_page, HTTP_ACCEPT='application/json')
+                    slow_next = client.get(next_page, HTTP_ACCEPT='application/json')
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast_next.content, slow_next.content)
+                self.assertEqual(fast['Content-Type'], slow['Content-Type'])
+
+
+class ListFilteringTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        self.readers = [Reader.objects.create(firstname='R', lastname=str(i), email=f'r{i}@example.com',
+                                              joindate=datetime.date(2021, 1, 1), isblocked=False)
+                        for i in range(2)]
+        # Кілька коміксів з однаковою датою - порядок усередині групи визначає pk
+        self.comics = [Comic.objects.create(
+            title=f'Comic {i}', volume=1, releasedate=datetime.date(2020, 1 + i % 3, 1),
+            availablenumber=i, publisher=publisher,
+        ) for i in range(7)]
+        today = datetime.date.today()
+        for i, comic in enumerate(self.comics):
+            Borrowing.objects.create(comic=comic, reader=self.readers[i % 2], borrowdate=today,
+                                     duedate=today + datetime.timedelta(days=-1 if i < 3 else 7),
+                                     returndate=today if i == 0 else None)
+        self.client = APIClient()
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        return response.status_code, response.json()
+
+    def test_filters_and_sparse_fields(self):
+        _, data = self.get(f'/api/borrowings/?reader={self.readers[0].pk}&overdue=true&fields=comic,reader')
+        self.assertEqual(data['results'], [{'comic': self.comics[2].pk, 'reader': self.readers[0].pk}])
+
+        _, data = self.get('/api/comics/?released_from=2020-02-01&fields=comicid')
+        self.assertEqual([row['comicid'] for row in data['results']],
+                         [comic.pk for comic in self.comics if comic.releasedate.month >= 2])
+
+        for url in ('/api/comics/?ordering=publisher', '/api/borrowings/?overdue=maybe', '/api/reviews/?fields=x'):
+            self.assertEqual(self.get(url)[0], 400, url)
+
+    def test_ordering_pages_with_composite_cursor(self):
+        from .views import ComicViewSet
+        expected = list(Comic.objects.order_by('-releasedate', 'title', 'pk').values_list('pk', flat=True))
+        for fast_list in (True, False):
+            with self.subTest(fast_list=fast_list), mock.patch.object(ComicViewSet, 'fast_list', fast_list):
+                url, seen, pages = '/api/comics/?ordering=-releasedate,title&page_size=3&fields=comicid', [], []
+                while url:
+                    _, data = self.get(url)
+                    pages.append(data)
+                    seen += [row['comicid'] for row in data['results']]
+                    url = data['next']
+                self.assertEqual(seen, expected)
+                # Назад від другої сторінки - знову перша
+                _, data = self.get(pages[1]['previous'])
+                self.assertEqual(data['results'], pages[0]['results'])
+
+
+class PlotlyAssetTests(UnmanagedModelsTestCase):
+
+    def test_dashboard_embeds_figure_json_and_one_script(self):
+        from .plotly_assets import plotly_js_url
+        publisher = Publisher.objects.create(name='Marvel', country='US', foundedyear=1939)
+        Comic.objects.create(title='X-Men', volume=1, releasedate=datetime.date(2020, 1, 1),
+                             availablenumber=5, publisher=publisher)
+        client = APIClient()
+        client.force_login(User.objects.create_user('viewer'))
+
+        body = client.get('/dashboard/plotly/?render=server').content.decode()
+        self.assertEqual(body.count(f'<script src="{plotly_js_url()}" defer></script>'), 1)
+        self.assertIn('data-plotly-figure', body)
+        self.assertNotIn('Plotly.newPlot', body)
+        self.assertLess(len(body), 100_000)
+
+    def test_asset_is_fingerprinted_and_long_cached(self):
+        from .plotly_assets import chart_html, plotly_js_url
+        import plotly.express as px
+        response = self.client.get(plotly_js_url(), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(plotly_js_url(), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertRedirects(self.client.get('/assets/plotly-0.js'), plotly_js_url(), fetch_redirect_response=False)
+
+        # JSON фігури не може закрити <script>, шаблон оформлення - лише ім'я з бандла
+        fragment = chart_html(px.bar(x=['</script>'], y=[1]))
+        self.assertEqual(fragment.count('</script>'), 1)
+        self.assertIn('"template":"plotly"', fragment)
+
+
+class DashboardChartDataTests(UnmanagedModelsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_login(User.objects.create_user('viewer'))
+        publisher = Publisher.objects.create(name='Publisher', country='UA', foundedyear=2000)
+        for year in (2001, 2001, 2003):
+            Comic.objects.create(title=f'Comic {year}', volume=1, releasedate=datetime.date(year, 1, 1),
+                                 availablenumber=1, publisher=publisher)
+
+    def test_chart_data_is_columnar_and_conditional(self):
+        response = self.client.get('/dashboard/data/release/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'year': [2001, 2003], 'total_released': [2, 1]})
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+        not_modified = self.client.get('/dashboard/data/release/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.client.get('/dashboard/data/unknown/').status_code, 404)
+        self.assertEqual(self.client.get('/dashboard/data/publishers/?min_stock=x').status_code, 400)
+        for url in ('/dashboard/plotly/?min_stock=abc', '/dashboard/bokeh/?min_stock=abc',
+                    '/dashboard/plotly/?min_rating=high', '/async/dashboard/plotly/?min_stock=abc'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_server_rendered_dashboards_answer_304_without_queries(self):
+        client = APIClient()
+        client.force_authenticate(User(username='viewer'))
+        for url in ('/dashboard/plotly/?render=server', '/dashboard/bokeh/?render=server'):
+            with self.subTest(url=url):
+                etag = client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    Comic.objects.create(title='New', volume=1, releasedate=datetime.date(2005, 1, 1),
+                                         availablenumber=1, publisher=Publisher.objects.first())
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_dashboard_pages_only_link_chart_data(self):
+        with mock.patch.object(AnalyticsRepository, 'get_comics_release_activity') as fetch:
+            for url in ('/dashboard/plotly/?min_stock=5', '/dashboard/bokeh/?min_stock=5'):
+                body = self.client.get(url).content.decode()
+                self.assertIn('/dashboard/data/release/', body)
+                self.assertIn('/dashboard/data/publishers/?min_stock=5', body)
+            fetch.assert_not_called()
+
+
+@override_settings(COMICS_DB_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def test_reads_go_to_primary_after_a_write(self):
+        router = ReplicaRouter()
+        with request_scope() as state:
+            self.assertEqual(router.db_for_read(Comic), 'replica')
+            self.assertEqual(DjangoAuthorRepository().get_queryset().db, 'replica')
+            self.assertEqual(DjangoAuthorRepository().using('default').get_queryset().db, 'default')
+
+            self.assertEqual(router.db_for_write(Comic), 'default')
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Comic), 'default')
+
+    def test_client_stays_on_primary_for_the_read_your_writes_window(self):
+        def view(request):
+            if request.method == 'POST':
+                ReplicaRouter().db_for_write(Comic)
+            return HttpResponse(read_alias())
+
+        middleware = ReadYourWritesMiddleware(view)
+        factory = RequestFactory()
+
+        response = middleware(factory.get('/api/comics/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(ReadYourWritesMiddleware.COOKIE_NAME, response.cookies)
+
+        response = middleware(factory.post('/api/comics/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[ReadYourWritesMiddleware.COOKIE_NAME]['max-age'], 5)
+
+        request = factory.get('/api/comics/')
+        request.COOKIES[ReadYourWritesMiddleware.COOKIE_NAME] = '1'
+        self.assertEqual(middleware(request).content, b'default')
+
+    def test_analytics_and_list_reads_reach_a_replica(self):
+        # У тестових налаштуваннях бази 'replica' немає: помилка підключення саме до неї
+        # означає, що побудова результату для кешу пішла на репліку
+        for cache in caches.all():
+            cache.clear()
+        with request_scope(), self.assertRaisesMessage(ConnectionDoesNotExist, "'replica'"):
+            AnalyticsRepository.get_top_publishers_by_inventory(limit=5)
+        with self.assertRaisesMessage(ConnectionDoesNotExist, "'replica'"):
+            self.client.get('/api/comics/')
+
+    def test_results_read_right_after_a_write_are_not_cached(self):
+        # Версію вже збільшено, а репліка може ще не мати запису: результат з неї віддаємо,
+        # але не зберігаємо ні в кеші, ні в ETag - до кінця COMICS_READ_YOUR_WRITES_SECONDS
+        from .views import ComicViewSet
+        calls = []
+
+        @cached_result('routing-probe', models=(Comic,))
+        def build():
+            calls.append(read_alias())
+            return calls[-1]
+
+        def respond():
+            return ComicViewSet().cached_response(RequestFactory().get('/'), '"probe"', build,
+                                                  stale=may_be_stale(Comic))
+
+        for cache in caches.all():
+            cache.clear()
+        with request_scope():
+            self.assertEqual((build(), build()), ('replica', 'replica'))
+            self.assertEqual(len(calls), 1)
+
+            bump_version(Comic)
+            build(), build()
+            self.assertNotIn('ETag', respond())
+            self.assertEqual(len(calls), 4)
+
+        with request_scope(pinned=True):
+            # Клієнт, що щойно писав, читає з primary - його результат можна кешувати
+            self.assertEqual((build(), build()), ('default', 'default'))
+            self.assertEqual(respond()['ETag'], '"probe"')
+        self.assertEqual(len(calls), 5)
@@ -1,15 +1,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from django.urls import path
-from .views import (
+from .analytics_views import (
     PublisherInventoryView,
     TopAuthorsView,
     ReleaseActivityView,
     PopularGenresView,
     ActiveReadersView,
-    ComicReviewsView
+    ComicReviewsView,
+    BasicStatsView,
+)
+from .dashboard_views import (
+    BenchmarkView,
+    DashboardBokehView,
+    DashboardChartDataView,
+    DashboardPlotlyView,
+    plotly_js,
 )
 from .views import *
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'comics', ComicViewSet, basename='comics')
@@ -24,6 +33,7 @@ router.register(r'borrowings', BorrowingViewSet, basename='borrowings')
 urlpatterns = [
     path('api/', include(router.urls)),
     path('report/aggregated/', aggregated_report),
+    path('metrics/', metrics_view, name='metrics'),
     path('', comic_list, name='comic_list'),
     path('comic/<int:pk>/', comic_detail, name='comic_detail'),
     path('comic/new/', comic_create, name='comic_new'),
@@ -40,7 +50,34 @@ urlpatterns = [
     path('analytics/basic-stats/', BasicStatsView.as_view(), name='basic-stats'),
 
     path('dashboard/plotly/', DashboardPlotlyView.as_view(), name='dashboard-plotly'),
+    path('assets/plotly-<str:fingerprint>.js', plotly_js, name='plotly-js'),
     path('dashboard/bokeh/', DashboardBokehView.as_view(), name='dashboard-bokeh'),
+    path('dashboard/data/<str:name>/', DashboardChartDataView.as_view(), name='dashboard-data'),
 
     path('benchmark/', BenchmarkView.as_view(), name='benchmark'),
+
+    # Async-варіанти для ASGI (lab/asgi.py): ті самі відповіді, але без потоку на запит
+    path('async/report/aggregated/', async_views.AsyncAggregatedReportView.as_view(), name='async-report-aggregated'),
+    path('async/dashboard/plotly/', async_views.AsyncDashboardPlotlyView.as_view(), name='async-dashboard-plotly'),
 ]
+
+for prefix, viewset, basename in router.registry:
+    urlpatterns += [
+        path(f'async/api/{prefix}/', async_views.AsyncRepoView.as_view(viewset=viewset),
+             name=f'async-{basename}-list'),
+        path(f'async/api/{prefix}/<int:pk>/', async_views.AsyncRepoView.as_view(viewset=viewset),
+             name=f'async-{basename}-detail'),
+    ]
+
+ANALYTICS_VIEWS = {
+    'publishers': PublisherInventoryView,
+    'authors': TopAuthorsView,
+    'years': ReleaseActivityView,
+    'genres': PopularGenresView,
+    'readers': ActiveReadersView,
+    'reviews': ComicReviewsView,
+    'basic-stats': BasicStatsView,
+}
+for name, view_class in ANALYTICS_VIEWS.items():
+    urlpatterns.append(path(f'async/analytics/{name}/', async_views.AsyncAnalyticsView.as_view(view_class=view_class),
+                            name=f'async-analytics-{name}'))
@@ -1,11 +1,27 @@
-from bokeh.resources import CDN
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from rest_framework import viewsets, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from .serializers import *
 from comics.repositoriesdir.django_repositories import *
-from comics.models import Comic, Review, Borrowing
+# Після import *: django_repositories експортує однойменний django.core.exceptions.ValidationError
+from rest_framework.exceptions import ValidationError
+from .pagination import KeysetPagination
+from comics.repositoriesdir.query_plan import QueryPlan
+from .export import stream_ndjson, stream_json_array
+from .cache import get_cache, data_version, object_version, make_etag, may_be_stale, object_may_be_stale
+from .metrics import registry as metrics_registry, render_pool_stats, timed
+from . import fast_serialization
+from .filters import ConditionFilter, Filter, build_filter_spec, parse_bool, parse_date
 
 author_repo = DjangoAuthorRepository()
 comic_repo = DjangoComicRepository()
@@ -21,24 +37,140 @@ class GenericRepoViewSet(viewsets.ViewSet):
 
     repo = None
     serializer_class = None
+    pagination_class = KeysetPagination
+    # Як репозиторій завантажує рядки для list/export; None - план репозиторію
+    query_plan = None
+    # Інші таблиці, з яких серіалізатор бере дані (напр. authors коміксу): їхні версії входять в ETag
+    cache_related_models = ()
+    # list через values() і fast_serialization замість екземплярів моделі та ModelSerializer
+    fast_list = False
+    # ?<параметр>=... -> умова FilterSpec (comics/filters.py)
+    filter_fields = {}
+    # Дозволені для ?ordering= поля; лише NOT NULL колонки - інакше keyset-курсор неоднозначний
+    ordering_fields = ()
 
     def get_permissions(self):
+        # export вивантажує всю таблицю (разом з email читачів) - лише для автентифікованих
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
 
+    # Умовний GET: ETag = версія даних. Збіг If-None-Match -> 304, інакше готові дані з кешу;
+    # БД і серіалізатор задіяні лише після зміни версії (інвалідація - cache.invalidate_*).
+    # stale - дані щойно змінились і репліка може відставати: відповідь без кешу і без ETag,
+    # щоб ні сервер, ні клієнт не запам'ятали старі рядки під новою версією.
+    def cached_response(self, request, etag, build, stale=False):
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        cache = get_cache()
+        key = 'comics:api:' + etag.strip('"')
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            if data is None:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            if not stale:
+                cache.set(key, data, getattr(settings, 'COMICS_API_CACHE_TTL', 300))
+        if isinstance(data, bytes):
+            # Уже готовий JSON зі швидкого шляху
+            response = HttpResponse(data, content_type=request.accepted_renderer.media_type)
+        else:
+            response = Response(data)
+        if not stale:
+            response['ETag'] = etag
+        return response
+
     def list(self, request):
-        objs = self.repo.get_all()
-        serializer = self.serializer_class(objs, many=True)
-        return Response(serializer.data)
+        model = self.serializer_class.Meta.model
+        # Посилання next/previous абсолютні, тож у ключі - повний URL разом із хостом
+        # Дата - бо фільтри на кшталт ?overdue= залежать від неї, а не лише від даних
+        etag = make_etag('list', self.basename, request.accepted_media_type, request.build_absolute_uri(),
+                         timezone.localdate(), data_version(model, *self.cache_related_models))
+        return self.cached_response(request, etag, lambda: self.list_data(request),
+                                    stale=may_be_stale(model, *self.cache_related_models))
+
+    def get_requested_fields(self, request):
+        # ?fields=a,b - лише ці поля у відповіді (у порядку серіалізатора); None - усі
+        value = request.query_params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        available = [name for name, field in self.serializer_class().fields.items() if not field.write_only]
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown fields: {", ".join(unknown)}']})
+        return fields
+
+    def get_list_query(self, request):
+        fields = self.get_requested_fields(request)
+        spec = build_filter_spec(request.query_params, self.filter_fields, self.ordering_fields,
+                                 self.serializer_class.Meta.model, fields)
+        plan = self.query_plan
+        if plan is not None and fields is not None:
+            plan = plan.for_fields(fields)
+        return spec, plan, fields
+
+    def list_data(self, request):
+        spec, plan, fields = self.get_list_query(request)
+        fast_plan = fast_serialization.build_plan(self.serializer_class) if self.fast_list else None
+        if fast_plan is not None and fast_serialization.can_render(request.accepted_renderer,
+                                                                   request.accepted_media_type):
+            if fields is not None:
+                fast_plan = fast_plan.only(fields)
+            paginator = self.pagination_class()
+            values = paginator.paginate_values(self.repo, request, fast_plan.fields, spec=spec)
+            with timed('serialize'):
+                data = paginator.get_paginated_data(fast_plan.rows(self.repo, values))
+                return fast_serialization.render(data, request.accepted_renderer)
+
+        paginator = self.pagination_class()
+        objs = paginator.paginate(self.repo, request, plan=plan, spec=spec)
+        serializer = self.serializer_class(objs, many=True, fields=fields)
+        with timed('serialize'):
+            data = serializer.data
+        return paginator.get_paginated_data(data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # Потокове вивантаження всієї таблиці: ?type=ndjson (за замовчуванням) або ?type=json
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in ('ndjson', 'json'):
+            return Response({'detail': 'type must be ndjson or json'}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunk_size = getattr(settings, 'COMICS_EXPORT_CHUNK_SIZE', 2000)
+        objs = self.repo.iterate(chunk_size=chunk_size, plan=self.query_plan)
+
+        if export_type == 'json':
+            response = StreamingHttpResponse(stream_json_array(objs, self.serializer_class),
+                                             content_type='application/json')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(objs, self.serializer_class),
+                                             content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
     def retrieve(self, request, pk=None):
+        model = self.serializer_class.Meta.model
+        try:
+            pk = model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        # Версія саме цього рядка: опитування залишків одного коміксу не скидається змінами інших
+        etag = make_etag('retrieve', self.basename, request.accepted_renderer.format, pk,
+                         object_version(model, pk, *self.cache_related_models))
+        return self.cached_response(request, etag, lambda: self.retrieve_data(pk),
+                                    stale=object_may_be_stale(model, pk, *self.cache_related_models))
+
+    def retrieve_data(self, pk):
         obj = self.repo.get_by_id(pk)
         if obj is None:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+            return None
         serializer = self.serializer_class(obj)
-        return Response(serializer.data)
+        with timed('serialize'):
+            return serializer.data
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -76,6 +208,78 @@ class GenericRepoViewSet(viewsets.ViewSet):
             obj.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    # Пакетні операції: /api/<resource>/bulk/ приймає масив і виконує все в одній транзакції
+    def _bulk_response(self, objs, status_code=status.HTTP_200_OK):
+        if self.query_plan and self.query_plan.prefetch_related:
+            prefetch_related_objects(objs, *self.query_plan.prefetch_related)
+        return Response(self.serializer_class(objs, many=True).data, status=status_code)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = self.serializer_class(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                objs = serializer.save()
+        except IntegrityError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self._bulk_response(objs, status.HTTP_201_CREATED)
+
+    @bulk.mapping.put
+    def bulk_update(self, request):
+        return self._bulk_update(request, partial=False)
+
+    @bulk.mapping.patch
+    def bulk_partial_update(self, request):
+        return self._bulk_update(request, partial=True)
+
+    def _bulk_update(self, request, partial):
+        items = request.data
+        pk_name = self.serializer_class.Meta.model._meta.pk.name
+        try:
+            ids = [int(item[pk_name]) for item in items]
+        except (KeyError, TypeError, ValueError):
+            return Response({'detail': f'Expected a list of objects with "{pk_name}"'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Два записи з одним id в одному пакеті - неоднозначно, який з них мав би застосуватися
+        duplicates = sorted(pk for pk, count in Counter(ids).items() if count > 1)
+        if duplicates:
+            return Response({'detail': 'Duplicate ids', 'duplicates': duplicates},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        instances = {obj.pk: obj for obj in self.repo.get_many(ids)}
+        missing = [pk for pk in ids if pk not in instances]
+        if missing:
+            return Response({'detail': 'Not found', 'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+
+        serializers = [self.serializer_class(instances[pk], data=item, partial=partial)
+                       for pk, item in zip(ids, items)]
+        valid = [s.is_valid() for s in serializers]
+        if not all(valid):
+            return Response([s.errors for s in serializers], status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                objs = self.serializer_class().update_many(
+                    [s.instance for s in serializers], [s.validated_data for s in serializers]
+                )
+        except IntegrityError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self._bulk_response(objs)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        try:
+            ids = [int(pk) for pk in request.data]
+        except (TypeError, ValueError):
+            return Response({'detail': 'Expected a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            deleted = self.repo.delete_many(ids)
+        except IntegrityError as e:
+            # На рядки ще посилаються інші таблиці (FK у БД без каскаду)
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response({'deleted': deleted})
+
 
 class GenreViewSet(GenericRepoViewSet):
     repo = genre_repo
@@ -90,31 +294,69 @@ class PublisherViewSet(GenericRepoViewSet):
 class AuthorViewSet(GenericRepoViewSet):
     repo = author_repo
     serializer_class = AuthorSerializer
+    filter_fields = {'country': Filter('country', str)}
+    ordering_fields = ('lastname',)
 
 
 class ReaderViewSet(GenericRepoViewSet):
     repo = reader_repo
     serializer_class = ReaderSerializer
+    filter_fields = {'blocked': Filter('isblocked', parse_bool)}
+    ordering_fields = ('joindate', 'lastname')
 
 
 class ComicAuthorViewSet(GenericRepoViewSet):
     repo = comicauthor_repo
     serializer_class = ComicAuthorSerializer
+    filter_fields = {'comic': Filter('comic_id'), 'author': Filter('author_id')}
 
 
 class ComicViewSet(GenericRepoViewSet):
     repo = comic_repo
     serializer_class = ComicSerializer
+    cache_related_models = (ComicAuthor,)
+    fast_list = True
+    filter_fields = {
+        'genre': Filter('genre_id'),
+        'publisher': Filter('publisher_id'),
+        'released_from': Filter('releasedate__gte', parse_date),
+        'released_to': Filter('releasedate__lte', parse_date),
+        'in_stock': ConditionFilter(lambda: Q(availablenumber__gt=0)),
+    }
+    ordering_fields = ('releasedate', 'title', 'availablenumber')
+    # Серіалізатор віддає лише id publisher/genre (поле *_id), тож JOIN не потрібен;
+    # authors підтягуються одним запитом на сторінку замість запиту на кожен комікс,
+    # у порядку id - так само, як у швидкому шляху list
+    query_plan = QueryPlan(
+        prefetch_related=(Prefetch('authors', queryset=Author.objects.only('authorid').order_by('pk')),),
+    )
 
 
 class ReviewViewSet(GenericRepoViewSet):
     repo = review_repo
     serializer_class = ReviewSerializer
+    fast_list = True
+    filter_fields = {
+        'comic': Filter('comic_id'),
+        'reader': Filter('reader_id'),
+        'min_rating': Filter('rating__gte'),
+        'max_rating': Filter('rating__lte'),
+    }
+    ordering_fields = ('reviewdate', 'rating')
 
 
 class BorrowingViewSet(GenericRepoViewSet):
     repo = borrowing_repo
     serializer_class = BorrowingSerializer
+    fast_list = True
+    filter_fields = {
+        'reader': Filter('reader_id'),
+        'comic': Filter('comic_id'),
+        'returned': ConditionFilter(lambda: Q(returndate__isnull=False)),
+        'overdue': ConditionFilter(lambda: Q(returndate__isnull=True, duedate__lt=timezone.localdate())),
+        'due_before': Filter('duedate__lt', parse_date),
+    }
+    ordering_fields = ('borrowdate', 'duedate')
 
 
 # comics/views.py
@@ -124,12 +366,14 @@ from .forms import ComicForm
 
 # 1. Список об'єктів
 def comic_list(request):
-    comics = Comic.objects.all()
+    # Видавець кожного коміксу - з довідника в пам'яті, а не окремим запитом у шаблоні
+    comics = comic_repo.attach_references(list(Comic.objects.all()))
     return render(request, 'comics/comic_list.html', {'comics': comics})
 
 # 2. Деталі об'єкта
 def comic_detail(request, pk):
     comic = get_object_or_404(Comic, pk=pk)
+    comic_repo.attach_references([comic])
     return render(request, 'comics/comic_detail.html', {'comic': comic})
 
 # 3. Створення нового об'єкта
@@ -165,42 +409,37 @@ def comic_delete(request, pk):
 
 
 
+from .repositories import AnalyticsRepository
+
+
+def aggregated_report_key():
+    return f"comics:report:aggregated:{data_version(*AnalyticsRepository.REPORT_TABLES.values())}"
+
+
 @api_view(['GET'])
 def aggregated_report(request):
-    total_authors = len(author_repo.get_all())
-    total_comics = len(comic_repo.get_all())
-    total_readers = len(reader_repo.get_all())
-    total_genres = len(genre_repo.get_all())
-    total_publishers = len(publisher_repo.get_all())
-    total_reviews = len(review_repo.get_all())
-    total_borrowings = len(borrowing_repo.get_all())
-
-
-    active_borrowings_qs = Borrowing.objects.filter(returndate__isnull=True)
-    active_borrowings = [{
-        'borrowid': b.borrowid,
-        'comic': b.comic.title,
-        'reader': f"{b.reader.firstname} {b.reader.lastname}",
-        'borrowdate': b.borrowdate,
-        'duedate': b.duedate
-    } for b in active_borrowings_qs]
-
-
-    report = {
-        'totals': {
-            'authors': total_authors,
-            'comics': total_comics,
-            'readers': total_readers,
-            'genres': total_genres,
-            'publishers': total_publishers,
-            'reviews': total_reviews,
-            'borrowings': total_borrowings,
-        },
-        'active_borrowings': active_borrowings,
-    }
+    cache = get_cache()
+    key = aggregated_report_key()
+    report = cache.get(key)
+    if report is None:
+        report = {
+            'totals': AnalyticsRepository.get_table_totals(),
+            'active_borrowings': AnalyticsRepository.get_active_borrowings(),
+        }
+        if not may_be_stale(*AnalyticsRepository.REPORT_TABLES.values()):
+            cache.set(key, report, getattr(settings, 'COMICS_REPORT_CACHE_TTL', 60))
     return Response(report)
 
 
+def metrics_view(request):
+    # Гістограми по маршрутах і стан пулу підключень у форматі Prometheus (дані поточного процесу)
+    allowed = getattr(settings, 'COMICS_METRICS_ALLOWED_IPS', [])
+    if not settings.DEBUG and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render() + render_pool_stats(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 from django.shortcuts import render, redirect
 from .NetworkHelper import NetworkHelper
 
@@ -223,396 +462,3 @@ def external_api_delete(request, item_id):
         helper = NetworkHelper(API_URL, API_USER, API_PASS)
         helper.delete_item(item_id)
     return redirect('external_list')
-
-
-from rest_framework.views import APIView
-
-
-
-class BasePandasView(APIView):
-    def export_data(self, queryset, fields):
-        data = list(queryset.values(*fields))
-        df = pd.DataFrame(data)
-
-        if df.empty:
-            return Response({"message": "Даних не знайдено", "data": []})
-
-        return Response(df.to_dict(orient='records'))
-
-
-class PublisherInventoryView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_top_publishers_by_inventory()
-        return self.export_data(qs, fields=['name', 'country', 'total_stock', 'titles_count'])
-
-
-class TopAuthorsView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_highly_rated_authors()
-        return self.export_data(qs, fields=['firstname', 'lastname', 'avg_rating', 'review_count'])
-
-
-class ReleaseActivityView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_comics_release_activity()
-        return self.export_data(qs, fields=['year', 'total_released'])
-
-
-class PopularGenresView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_popular_genres()
-        return self.export_data(qs, fields=['genrename', 'borrow_count'])
-
-
-class ActiveReadersView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_active_readers()
-        return self.export_data(qs, fields=['firstname', 'lastname', 'email', 'books_borrowed'])
-
-
-class ComicReviewsView(BasePandasView):
-    def get(self, request):
-        qs = AnalyticsRepository.get_most_reviewed_comics()
-        return self.export_data(qs, fields=['title', 'reviews_total', 'rating_avg'])
-
-
-from rest_framework.views import APIView
-from rest_framework.response import Response
-
-
-class BasicStatsView(APIView):
-    def get(self, request):
-        comics_qs = AnalyticsRepository.get_raw_comic_data()
-        reviews_qs = AnalyticsRepository.get_raw_review_data()
-
-        df_comics = pd.DataFrame(list(comics_qs))
-        df_reviews = pd.DataFrame(list(reviews_qs))
-
-        if df_comics.empty or df_reviews.empty:
-            return Response({"message": "Not enough data for statistics"})
-
-        stock_stats = df_comics['availablenumber'].describe().to_dict()
-
-        median_stock = df_comics['availablenumber'].median()
-
-        rating_stats = {
-            'min_rating': df_reviews['rating'].min(),
-            'max_rating': df_reviews['rating'].max(),
-            'mean_rating': round(df_reviews['rating'].mean(), 2),
-            'median_rating': df_reviews['rating'].median()
-        }
-
-        genre_grouping = df_comics.groupby('genre__genrename')['availablenumber'].mean().reset_index()
-        genre_grouping.columns = ['Genre', 'Average_Stock']
-
-        # comic_rating_grouping = df_reviews.groupby('comic__title')['rating'].max().reset_index()
-        # comic_rating_grouping.columns = ['Comic', 'Max_Rating']
-
-        response_data = {
-            "general_stats": {
-                "stock_statistics": stock_stats,
-                "stock_median_explicit": median_stock,
-                "rating_statistics": rating_stats
-            },
-            "grouped_analysis": {
-                "avg_stock_by_genre": genre_grouping.to_dict(orient='records'),
-                # "max_rating_by_comic": comic_rating_grouping.to_dict(orient='records')
-            }
-        }
-
-        return Response(response_data)
-
-
-from django.shortcuts import render
-from rest_framework.views import APIView
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-
-
-from .repositories import AnalyticsRepository
-
-
-class DashboardPlotlyView(APIView):
-    def get(self, request):
-        min_stock = int(request.GET.get('min_stock', 0))
-        sort_by = request.GET.get('sort_by', 'stock_desc')
-
-        min_rating = float(request.GET.get('min_rating', 0))
-        max_rating = float(request.GET.get('max_rating', 10))
-
-        charts = []
-
-
-        qs1 = AnalyticsRepository.get_top_publishers_by_inventory()
-        df1 = pd.DataFrame(list(qs1.values('name', 'total_stock')))
-
-        if not df1.empty:
-            df1 = df1[df1['total_stock'] >= min_stock]
-
-            if sort_by == 'name':
-                df1 = df1.sort_values('name')
-                sort_title = "(за назвою)"
-            elif sort_by == 'stock_asc':
-                df1 = df1.sort_values('total_stock', ascending=True)
-                sort_title = "(зростання)"
-            else:
-                df1 = df1.sort_values('total_stock', ascending=False)
-                sort_title = "(спадання)"
-
-            df1 = df1.head(20)
-
-            fig1 = px.bar(df1, x='name', y='total_stock',
-                          title=f"Видавництва: > {min_stock} книг {sort_title}",
-                          text='total_stock',
-                          labels={'total_stock': 'Кількість', 'name': 'Видавництво'})
-            charts.append(pio.to_html(fig1, full_html=False))
-        else:
-            charts.append("<div>Немає даних для Графіка 1</div>")
-
-
-        qs2 = AnalyticsRepository.get_highly_rated_authors()
-        df2 = pd.DataFrame(list(qs2.values('lastname', 'avg_rating', 'review_count')))
-
-        if not df2.empty:
-            df2 = df2[
-                (df2['avg_rating'] >= min_rating) &
-                (df2['avg_rating'] <= max_rating)
-                ]
-
-            df2 = df2.sort_values('avg_rating', ascending=False).head(40)
-
-            fig2 = px.scatter(df2, x='review_count', y='avg_rating',
-                              size='review_count', hover_name='lastname',
-                              title=f"Автори: Рейтинг {min_rating}-{max_rating} (Топ кращих)",
-                              range_y=[0, 5.5])
-            charts.append(pio.to_html(fig2, full_html=False))
-        else:
-            charts.append("<div>Немає даних для Графіка 2</div>")
-
-
-        qs3 = AnalyticsRepository.get_comics_release_activity()
-        df3 = pd.DataFrame(list(qs3.values('year', 'total_released')))
-
-        if not df3.empty:
-            df3 = df3.sort_values('year')
-            fig3 = px.line(df3, x='year', y='total_released', markers=True,
-                           title="Загальна динаміка випуску коміксів")
-            charts.append(pio.to_html(fig3, full_html=False))
-        else:
-            charts.append("<div>Немає даних для Графіка 3</div>")
-
-
-        qs4 = AnalyticsRepository.get_popular_genres()
-        df4 = pd.DataFrame(list(qs4.values('genrename', 'borrow_count')))
-        if not df4.empty:
-            fig4 = px.pie(df4, values='borrow_count', names='genrename', title="Частка жанрів у позичаннях")
-            charts.append(pio.to_html(fig4, full_html=False))
-
-
-        qs5 = AnalyticsRepository.get_active_readers()
-        df5 = pd.DataFrame(list(qs5.values('lastname', 'books_borrowed')))
-
-        if not df5.empty:
-            df5 = df5.sort_values('books_borrowed', ascending=True)
-            df5_top = df5.tail(20)
-
-            fig5 = px.bar(
-                df5_top,
-                x='books_borrowed',
-                y='lastname',
-                orientation='h',
-                title="Топ-20 Активних читачів",
-                text='books_borrowed',
-            )
-            charts.append(pio.to_html(fig5, full_html=False))
-
-
-        qs6 = AnalyticsRepository.get_most_reviewed_comics()
-        df6 = pd.DataFrame(list(qs6.values('title', 'rating_avg', 'reviews_total')))
-
-        if not df6.empty:
-            df6_top = df6.head(20)
-
-            fig6 = px.bar(
-                df6_top,
-                x='title',
-                y='rating_avg',
-                title="Рейтинг популярних коміксів",
-                labels={'rating_avg': 'Рейтинг', 'title': 'Комікс'}
-            )
-
-            charts.append(pio.to_html(fig6, full_html=False))
-        context_filters = {
-            'min_stock': min_stock,
-            'min_rating': min_rating,
-            'max_rating': max_rating,
-            'sort_by': sort_by
-        }
-
-        return render(request, 'comics/dashboard_plotly.html', {
-            'charts': charts,
-            'filters': context_filters
-        })
-        # return render(request, 'comics/dashboard_plotly.html', {
-        #     'charts': charts,
-        #     'filters': {'min_stock': min_stock}
-        # })
-
-
-
-from bokeh.plotting import figure
-from bokeh.embed import components
-from bokeh.models import ColumnDataSource, HoverTool
-from bokeh.resources import CDN
-from bokeh.transform import factor_cmap, cumsum, linear_cmap
-
-from math import pi
-
-
-class DashboardBokehView(APIView):
-    def get(self, request):
-        min_stock = int(request.GET.get('min_stock', 0))
-        script_divs = []
-
-        qs1 = AnalyticsRepository.get_top_publishers_by_inventory()
-        df1 = pd.DataFrame(list(qs1.values('name', 'total_stock')))
-        if not df1.empty:
-            df1 = df1[df1['total_stock'] >= min_stock]
-            source = ColumnDataSource(df1)
-            publishers = df1['name'].tolist()
-
-            p = figure(x_range=publishers, height=400, title="1. Видавництва (Inventory)",
-                       toolbar_location=None, tools="", sizing_mode='stretch_width')
-            p.vbar(x='name', top='total_stock', width=0.9, source=source,
-                   line_color='white')
-            script_divs.append(components(p))
-
-
-        qs2 = AnalyticsRepository.get_highly_rated_authors()
-        df2 = pd.DataFrame(list(qs2.values('lastname', 'avg_rating', 'review_count')))
-        if not df2.empty:
-            df2 = df2.head(20)
-            source = ColumnDataSource(df2)
-            p = figure(height=400, title="2. Автори (Rating vs Reviews)", sizing_mode='stretch_width')
-            p.circle(x='review_count', y='avg_rating', size=15, source=source)
-            script_divs.append(components(p))
-
-
-        qs3 = AnalyticsRepository.get_comics_release_activity()
-        df3 = pd.DataFrame(list(qs3.values('year', 'total_released')))
-        if not df3.empty:
-            df3 = df3.sort_values('year')
-            p = figure(height=400, title="3. Динаміка публікацій", sizing_mode='stretch_width')
-            p.line(df3['year'], df3['total_released'], line_width=3, color="navy")
-            p.circle(df3['year'], df3['total_released'], size=8, line_color="navy")
-            script_divs.append(components(p))
-
-
-        qs4 = AnalyticsRepository.get_popular_genres()
-        df4 = pd.DataFrame(list(qs4.values('genrename', 'borrow_count')))
-
-        if not df4.empty:
-            df4['angle'] = df4['borrow_count'] / df4['borrow_count'].sum() * 2 * pi
-
-            source = ColumnDataSource(df4)
-
-            p = figure(height=400, title="4. Популярні жанри (Pie Chart)", toolbar_location=None,
-                       tools="hover", tooltips="@genrename: @borrow_count", x_range=(-0.5, 1.0),
-                       sizing_mode='stretch_width')
-
-            p.wedge(x=0, y=1, radius=0.4,
-                    start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'),
-                    line_color="white", legend_field='genrename', source=source)
-
-            p.axis.axis_label = None
-            p.axis.visible = False
-            p.grid.grid_line_color = None
-
-            script_divs.append(components(p))
-
-        qs5 = AnalyticsRepository.get_active_readers()
-        df5 = pd.DataFrame(list(qs5.values('lastname', 'books_borrowed')))
-
-        if not df5.empty:
-            df5 = df5.sort_values('books_borrowed', ascending=True).tail(15)  # Топ-15
-            readers = df5['lastname'].tolist()
-            source = ColumnDataSource(df5)
-
-            p = figure(y_range=readers, height=400, title="5. Топ читачів (Horizontal)",
-                       toolbar_location=None, tools="", sizing_mode='stretch_width')
-
-            p.hbar(y='lastname', right='books_borrowed', height=0.8, source=source,
-                   line_color="white")
-
-            script_divs.append(components(p))
-
-
-        qs6 = AnalyticsRepository.get_most_reviewed_comics()
-        df6 = pd.DataFrame(list(qs6.values('title', 'rating_avg', 'reviews_total')))
-
-        if not df6.empty:
-            df6 = df6.head(20)
-            source = ColumnDataSource(df6)
-            titles = df6['title'].tolist()
-
-            p = figure(x_range=titles, height=400, title="6. Рейтинг популярних коміксів (Color Map)",
-                       toolbar_location=None, tools="", sizing_mode='stretch_width')
-
-            p.vbar(x='title', top='rating_avg', width=0.9, source=source)
-
-            p.xaxis.major_label_orientation = 0.785
-
-            script_divs.append(components(p))
-
-        resources = CDN.render()
-
-        return render(request, 'comics/dashboard_bokeh.html', {
-            'charts': script_divs,
-            'filters': {'min_stock': min_stock},
-            'resources': resources
-        })
-
-
-from .benchmark import DatabaseBenchmark
-
-
-class BenchmarkView(APIView):
-
-
-    def get(self, request):
-        return render(request, 'comics/benchmark.html', {'chart': None})
-
-    def post(self, request):
-        try:
-            total_requests = int(request.POST.get('total_requests', 200))
-        except ValueError:
-            total_requests = 200
-
-        data = DatabaseBenchmark.run_benchmark(
-            total_requests=total_requests,
-            max_workers_list=[1, 2, 4, 5, 8, 10, 16, 32]
-        )
-
-        df = pd.DataFrame(data)
-
-        fig = px.line(
-            df,
-            x='workers',
-            y='time',
-            markers=True,
-            title=f"Залежність часу виконання від кількості потоків ({total_requests} запитів)",
-            labels={'workers': 'Кількість потоків', 'time': 'Час виконання (сек)'}
-        )
-
-        fig.update_layout(
-            xaxis=dict(tickmode='linear'),
-            template="plotly_white"
-        )
-
-        chart_html = pio.to_html(fig, full_html=False)
-
-        return render(request, 'comics/benchmark.html', {
-            'chart': chart_html,
-            'last_requests': total_requests
-        })
\ No newline at end of file
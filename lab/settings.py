@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'comics.middleware.RequestMetricsMiddleware',
+    'comics.middleware.IdentityMapMiddleware',
+    'comics.middleware.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +68,43 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Розмір сторінки для списків /api/<resource>/ (keyset-пагінація, ?page_size=)
+COMICS_API_PAGE_SIZE = 50
+COMICS_API_MAX_PAGE_SIZE = 500
+
+# Кеш застосунку. LocMemCache живе в межах одного процесу; для кількох
+# воркерів версії даних мають бути спільними - використовуйте Redis/Memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'comics-default',
+    },
+    # Результати AnalyticsRepository: LRU на MAX_ENTRIES записів, TTL = TIMEOUT.
+    # Інші бекенди без змін у коді, напр.:
+    #   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/var/tmp/comics_analytics'
+    #   'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'comics-analytics',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+COMICS_CACHE_ALIAS = 'default'
+COMICS_ANALYTICS_CACHE_ALIAS = 'analytics'
+
+# TTL (сек) знімка /report/aggregated/; інвалідація також за змінами моделей
+COMICS_REPORT_CACHE_TTL = 60
+
+# TTL (сек) кешованих відповідей list/retrieve /api/; актуальність гарантує версія в ETag
+COMICS_API_CACHE_TTL = 300
+
+# Розмір порції серверного курсора для /api/<resource>/export/
+COMICS_EXPORT_CHUNK_SIZE = 2000
+
+# Розмір батча для bulk_create/bulk_update у /api/<resource>/bulk/
+COMICS_BULK_BATCH_SIZE = 500
+
 
 
 ROOT_URLCONF = 'lab.urls'
@@ -89,6 +130,20 @@ WSGI_APPLICATION = 'lab.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# COMICS_DB_POOL=1 - пул psycopg_pool на процес замість постійних підключень.
+# Django з пулом вимагає CONN_MAX_AGE=0: наприкінці запиту з'єднання повертається в пул
+COMICS_DB_POOL = os.environ.get('COMICS_DB_POOL', '0') == '1'
+COMICS_DB_POOL_OPTIONS = {
+    # Відкритих з'єднань завжди / максимум на процес (з урахуванням COMICS_DASHBOARD_CONCURRENCY)
+    'min_size': int(os.environ.get('COMICS_DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('COMICS_DB_POOL_MAX_SIZE', 10)),
+    # Скільки секунд запит чекає вільного з'єднання, перш ніж впасти з PoolTimeout
+    'timeout': float(os.environ.get('COMICS_DB_POOL_TIMEOUT', 10)),
+    # З'єднання старше max_lifetime або без діла довше max_idle секунд замінюється новим
+    'max_lifetime': float(os.environ.get('COMICS_DB_POOL_MAX_LIFETIME', 1800)),
+    'max_idle': float(os.environ.get('COMICS_DB_POOL_MAX_IDLE', 300)),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -97,9 +152,32 @@ DATABASES = {
         'PASSWORD': '17062007',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Без пулу: підключення потоку/процесу живе між запитами CONN_MAX_AGE секунд
+        # і перевіряється перед повторним використанням (CONN_HEALTH_CHECKS)
+        'CONN_MAX_AGE': 0 if COMICS_DB_POOL else int(os.environ.get('COMICS_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pool': COMICS_DB_POOL_OPTIONS} if COMICS_DB_POOL else {},
     }
 }
 
+# Репліки для читання (comics/routers.py): COMICS_DB_REPLICA_HOSTS="replica1:5432,replica2" -
+# та сама база і користувач, що й у primary. Без них усе читається з 'default'.
+# Локально реплікою може бути й інший екземпляр SQLite/PostgreSQL, доданий у DATABASES вручну.
+for _number, _host in enumerate(filter(None, os.environ.get('COMICS_DB_REPLICA_HOSTS', '').split(',')), 1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica{_number}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        # Тести не створюють окремої БД для репліки
+        'TEST': {'MIRROR': 'default'},
+    }
+COMICS_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['comics.routers.ReplicaRouter']
+# Скільки секунд після запису клієнт читає з primary (затримка реплікації з запасом)
+COMICS_READ_YOUR_WRITES_SECONDS = int(os.environ.get('COMICS_READ_YOUR_WRITES_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,4 +220,27 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-
+# Скільки графіків дашборду (і підключень до БД) обробляються паралельно; 1 - послідовно
+COMICS_DASHBOARD_CONCURRENCY = 4
+
+# Метрики запитів (comics.middleware.RequestMetricsMiddleware)
+COMICS_METRICS_SLOW_QUERIES = 3
+# скільки однакових запитів за один HTTP-запит вважати N+1
+COMICS_METRICS_N_PLUS_ONE_THRESHOLD = 5
+# /metrics/ доступний з цих адрес (або будь-звідки при DEBUG)
+COMICS_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Запити, довші за це (мс), логуються на INFO, N+1 - на WARNING, решта - на DEBUG
+COMICS_METRICS_SLOW_REQUEST_MS = 500
+# Рівень логу метрик: DEBUG - рядок на кожен запит, INFO - лише повільні і N+1
+COMICS_METRICS_LOG_LEVEL = os.environ.get('COMICS_METRICS_LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'level': COMICS_METRICS_LOG_LEVEL},
+    },
+    'loggers': {
+        'comics.metrics': {'handlers': ['console'], 'level': COMICS_METRICS_LOG_LEVEL, 'propagate': False},
+    },
+}